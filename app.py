@@ -1,33 +1,61 @@
+import asyncio
 import os
 import os
 import uuid
 from typing import Any, Dict, List, Optional
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import FileResponse, JSONResponse
 from pydantic import BaseModel
 import httpx
 from fastapi.staticfiles import StaticFiles
 
 
-RASA_REST_URL = os.getenv(
-    "RASA_REST_URL", "http://127.0.0.1:5005/webhooks/rest/webhook"
-)
-
 app = FastAPI(title="Rasa ↔ FastAPI Bridge")
 app.mount("/images", StaticFiles(directory="images"), name="images")
+
+from backend.services.rate_limit_service import RateLimitExceeded, enforce_rate_limit
+from backend.services import rasa_client
+from backend.services.pre_router import pre_route
+from backend.services.language_service import resolve_language
+from backend.services import warmup_service
+from backend.services import session_cache
+from backend.services import lease_service
+from backend.services import idempotency_service
+try:
+    # FAQ fast path needs numpy/scipy; without them every message goes to Rasa
+    from backend.services.faq_service import answer_faq, get_engine as get_faq_engine
+except ImportError:
+    answer_faq = None
+    get_faq_engine = None
+
+
+@app.exception_handler(RateLimitExceeded)
+async def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded):
+    return JSONResponse(
+        status_code=429,
+        content={"detail": "Too many requests. Please slow down."},
+        headers={"Retry-After": str(int(exc.retry_after))},
+    )
+
 # Conversations API routers
 try:
     from backend.routes.conversations import router as conversations_router
     from backend.routes.otp import router as otp_router
     from backend.routes.feedback import router as feedback_router
-    from backend.routes.consent import router as consent_router
+    from backend.routes.consent import router as consent_router, get_client_ip
     from backend.routes.pan import router as pan_router
     from backend.routes.tan import router as tan_router
+    from backend.routes.erasure import router as erasure_router
+    from backend.routes.stats import router as stats_router
+    from backend.services import erasure_service, ingestion_service, otp_service, sms_service, stats_service
+    from backend.core import security
     from backend.db.session import SessionLocal, Base, engine
+    from backend.db import session as db_session
+    from backend.db.pool import pool_status
     from backend.schemas.conversation import ConversationCreate
     from backend.services.conversation_service import save_conversation, get_conversations, ensure_phone_number
     from backend.services.otp_service import is_phone_verified, generate_otp, verify_otp
-    from backend.services.token_service import acquire_token, release_token
+    from backend.services.token_service import acquire_token, release_token, touch_token
     from backend.services.history_service import append_session_history, append_number_history
     from backend.models.history import SessionChatHistory
     from backend.schemas.otp import OTPGenerateRequest, OTPVerifyRequest
@@ -40,6 +68,8 @@ try:
     app.include_router(consent_router, prefix="/api")
     app.include_router(pan_router, prefix="/api")
     app.include_router(tan_router, prefix="/api")
+    app.include_router(erasure_router, prefix="/api")
+    app.include_router(stats_router, prefix="/api")
 
     @app.on_event("startup")
     def ensure_tables_created() -> None:
@@ -54,13 +84,68 @@ try:
         except Exception:
             # If DB not reachable or PAN DB missing, we ignore here; errors will surface on use.
             pass
+
+    @app.on_event("startup")
+    async def start_erasure_worker() -> None:
+        # Picks up queued erasure jobs, including ones interrupted by a restart
+        erasure_service.erasure_task = asyncio.create_task(erasure_service.run_erasure_worker())
+
+    @app.on_event("shutdown")
+    async def stop_erasure_worker() -> None:
+        if erasure_service.erasure_task is not None:
+            erasure_service.erasure_task.cancel()
+
+    @app.on_event("startup")
+    def check_secret_key() -> None:
+        # Fails startup when several workers would each hash personal data under their own random key
+        security.secret_key()
+
+    @app.on_event("startup")
+    def check_otp_store() -> None:
+        # Fails startup when several workers would each keep their own OTP challenges
+        otp_service.get_store()
+
+    @app.on_event("startup")
+    async def start_sms_outbox() -> None:
+        sms_service.outbox_task = asyncio.create_task(sms_service.get_outbox().run())
+
+    @app.on_event("shutdown")
+    async def stop_sms_outbox() -> None:
+        if sms_service.outbox_task is not None:
+            sms_service.outbox_task.cancel()
+        # Deliver whatever is still queued (e.g. OTPs requested just before shutdown)
+        await sms_service.get_outbox().flush()
+
+    @app.on_event("startup")
+    async def start_ingestion_worker() -> None:
+        ingestion_service.ingestion_task = asyncio.create_task(ingestion_service.run_ingestion_worker())
+
+    @app.on_event("shutdown")
+    async def stop_ingestion_worker() -> None:
+        if ingestion_service.ingestion_task is not None:
+            ingestion_service.ingestion_task.cancel()
+        # Acknowledged submissions must not be lost on a clean shutdown
+        await ingestion_service.flush()
+
+    @app.on_event("startup")
+    async def start_stats_worker() -> None:
+        stats_service.stats_task = asyncio.create_task(stats_service.run_stats_worker())
+
+    @app.on_event("shutdown")
+    async def stop_stats_worker() -> None:
+        if stats_service.stats_task is not None:
+            stats_service.stats_task.cancel()
+        await stats_service.flush()
 except Exception as _:
     SessionLocal = None
+    stats_service = None
+    pool_status = None
     save_conversation = None
     ConversationCreate = None
     is_phone_verified = None
     generate_otp = None
     verify_otp = None
+    get_client_ip = None
 
 def _normalize_phone(value: Optional[str]) -> Optional[str]:
     if not value:
@@ -76,6 +161,7 @@ class ChatIn(BaseModel):
     phone_number: Optional[str] = None  # when provided, will be used to persist messages
     session_id: Optional[str] = None  # for token/session control
     new_session: Optional[bool] = False  # force creation of a new session id
+    message_id: Optional[str] = None  # client-generated id; retries of the same message reuse it
 
 
 class ChatOut(BaseModel):
@@ -87,6 +173,10 @@ class ReleaseIn(BaseModel):
     session_id: str
 
 
+class HeartbeatIn(BaseModel):
+    session_id: str
+
+
 @app.get("/", response_class=FileResponse)
 def root():
     index_path = os.path.join(os.path.dirname(__file__), "chat.html")
@@ -106,11 +196,68 @@ async def health():
         raise HTTPException(status_code=502, detail=f"Rasa health check failed: {e!s}")
 
 
+@app.on_event("startup")
+def build_faq_engine() -> None:
+    # Index the NLU examples once so the first FAQ question does not pay for it
+    if get_faq_engine:
+        try:
+            get_faq_engine()
+        except Exception:
+            pass
+
+
+@app.on_event("startup")
+async def start_rasa_warmup() -> None:
+    # Runs in the background; /ready reports 503 until Rasa answers warm-up turns quickly
+    warmup_service.warmup_task = asyncio.create_task(warmup_service.run_warmup())
+
+
+@app.on_event("shutdown")
+async def close_rasa_client() -> None:
+    if warmup_service.warmup_task is not None:
+        warmup_service.warmup_task.cancel()
+    await rasa_client.close_client()
+
+
+@app.get("/ready")
+def ready():
+    """Readiness for load balancers: only true once the Rasa models have been warmed up."""
+    status = warmup_service.state.as_dict()
+    if not status["ready"]:
+        return JSONResponse(status_code=503, content=status)
+    return status
+
+
+@app.get("/metrics/db")
+def db_metrics():
+    """Connection pool occupancy, checkout wait times and hold times per engine, for sizing DB_POOL_SIZE."""
+    if not pool_status:
+        raise HTTPException(status_code=503, detail="Database not configured")
+    return {
+        "primary": pool_status(db_session.engine),
+        "replicas": [pool_status(replica) for replica in db_session.replica_engines],
+    }
+
+
 @app.post("/chat", response_model=ChatOut)
-async def chat(payload: ChatIn):
-    sender = payload.sender_id or str(uuid.uuid4())
+async def chat(payload: ChatIn, request: Request):
+    # Retries and double submits of one message run once; repeats get the same replies
+    message_id = (payload.message_id or request.headers.get("Idempotency-Key") or "").strip()
+    sender_id = (payload.sender_id or "").strip()
+    session_id = "" if payload.new_session else (payload.session_id or "").strip()
+    # Message ids are only unique per client: without a sender or session id there is nothing to scope them to
+    if not message_id or not (sender_id or session_id):
+        return await _handle_chat(payload, request)
+    key = f"chat:{sender_id}:{session_id}:{message_id}"
+    return await idempotency_service.single_flight(key, lambda: _handle_chat(payload, request))
+
+
+async def _handle_chat(payload: ChatIn, request: Request) -> Dict[str, Any]:
     # Normalize phone for storage
     normalized_phone = _normalize_phone(payload.phone_number)
+    # Reject floods before they cost a DB query or a Rasa round-trip
+    enforce_rate_limit("chat", sender=payload.sender_id, phone=normalized_phone, ip=get_client_ip(request) if get_client_ip else None)
+    sender = payload.sender_id or str(uuid.uuid4())
     # Session handling: if client requests new session or does not provide one, generate a new id.
     if payload.new_session or not (payload.session_id and payload.session_id.strip()):
         session_id = str(uuid.uuid4())
@@ -126,86 +273,135 @@ async def chat(payload: ChatIn):
     # Handle OTP flow first when phone number provided; only talk to Rasa after verification
     # TEMP: Skip OTP flow; proceed directly with chat when phone provided.
     # Keeping original OTP code commented for future re-enable.
+    # Computed once; a bare phone number as the message (re)starts the number acknowledgement
+    normalized_text = _normalize_phone(payload.text) if payload.text else None
+    looks_like_phone = bool(normalized_text and normalized_text.isdigit() and len(normalized_text) >= 10)
+    session_state = None
     if payload.phone_number and SessionLocal:
-        db = SessionLocal()
-        try:
-            phone = normalized_phone or payload.phone_number.strip()
-            # Ensure phone number stored in DB (without loading old history)
-            try:
-                ensure_phone_number(db, phone)
-            except Exception:
-                pass
-            # If user just sent a phone number and no session_id was provided, start a brand-new session automatically
-            normalized_text = _normalize_phone(payload.text) if payload.text else None
-            looks_like_phone = bool(normalized_text and normalized_text.isdigit() and len(normalized_text) >= 10)
-            if looks_like_phone and not (payload.session_id and payload.session_id.strip()):
-                session_id = str(uuid.uuid4())
-            # Acquire/verify session token before proceeding. If pool full, hold user.
+        phone = normalized_phone or payload.phone_number.strip()
+        # If user just sent a phone number and no session_id was provided, start a brand-new session automatically
+        if looks_like_phone and not (payload.session_id and payload.session_id.strip()):
+            session_id = str(uuid.uuid4())
+        session_state = session_cache.get_session(session_id)
+        known = session_state is not None and session_state.phone == phone
+        # Steady state (cached phone and acknowledgement, token lease still alive): no DB reads before the Rasa call.
+        # Per-process leases on several workers cannot prove the token is still ours, so acquire_token re-checks it.
+        steady = (
+            known and session_state.acknowledged and not looks_like_phone
+            and lease_service.leases_shared() and lease_service.has_lease(session_id)
+        )
+        if steady:
+            lease_service.renew_lease(session_id)
+        else:
+            db = SessionLocal()
             try:
-                token_value, is_waiting = acquire_token(db, session_id)
-            except Exception:
-                token_value, is_waiting = 0, False
-            if is_waiting:
-                # Do not error; keep user waiting politely
-                return {"sender_id": sender, "session_id": session_id, "replies": [{"text": "Please wait while we connect you..."}]}
+                # Ensure phone number stored in DB (without loading old history)
+                if not known:
+                    try:
+                        ensure_phone_number(db, phone)
+                    except Exception:
+                        pass
+                # Acquire/verify session token before proceeding. If pool full, hold user.
+                try:
+                    token_value, is_waiting = acquire_token(db, session_id)
+                except Exception:
+                    token_value, is_waiting = 0, False
+                if is_waiting:
+                    # Do not error; keep user waiting politely
+                    return {"sender_id": sender, "session_id": session_id, "replies": [{"text": "Please wait while we connect you..."}]}
 
-            # ORIGINAL OTP FLOW (DISABLED):
-            # If this is the first interaction after providing number, acknowledge and do not call Rasa yet
-            try:
-                existing_session = (
-                    db.query(SessionChatHistory)
-                    .filter(SessionChatHistory.session_id == session_id)
-                    .first()
+                # ORIGINAL OTP FLOW (DISABLED):
+                # If this is the first interaction after providing number, acknowledge and do not call Rasa yet
+                if known and session_state.acknowledged:
+                    is_first_message = False
+                else:
+                    try:
+                        existing_session = (
+                            db.query(SessionChatHistory)
+                            .filter(SessionChatHistory.session_id == session_id)
+                            .first()
+                        )
+                    except Exception:
+                        existing_session = None
+                    # Check if this is the first message after phone number (no session history yet)
+                    is_first_message = existing_session is None or not (existing_session.history or '').strip()
+
+                session_state = session_cache.SessionState(
+                    phone, token_value, acknowledged=True, language=session_state.language if known else None
                 )
-            except Exception:
-                existing_session = None
-            
-            # Check if this is the first message after phone number (no session history yet)
-            is_first_message = existing_session is None or not (existing_session.history or '').strip()
-            
-            # Also check if user just sent their phone number (10+ digits)
-            is_phone_number = payload.text and _normalize_phone(payload.text) and _normalize_phone(payload.text).isdigit() and len(_normalize_phone(payload.text)) >= 10
-            
-            if is_first_message or is_phone_number:
-                try:
-                    if payload.text:
-                        append_session_history(db, session_id, f"user: {payload.text}", phone_number=phone)
-                        append_number_history(db, phone, f"user: {payload.text}")
+                if token_value:
+                    session_cache.put_session(session_id, session_state)
+
+                if is_first_message or looks_like_phone:
                     ack = f"Got your number: {phone}."
-                    append_session_history(db, session_id, f"bot: {ack}", phone_number=phone)
-                    append_number_history(db, phone, f"bot: {ack}")
-                except Exception:
-                    pass
-                return {"sender_id": sender, "session_id": session_id, "replies": [{"text": ack}]}
-            # if not is_phone_verified(db, phone):
-            #     if payload.text and payload.text.strip().isdigit() and len(payload.text.strip()) == 6 and verify_otp and OTPVerifyRequest:
-            #         resp = verify_otp(db, OTPVerifyRequest(phone_number=phone, otp_code=payload.text.strip()))
-            #         if resp.success:
-            #             return {"sender_id": sender, "replies": [{"text": "OTP verified. You can continue chatting now."}]}
-            #         else:
-            #             return {"sender_id": sender, "replies": [{"text": resp.message}]}
-            #     if generate_otp and OTPGenerateRequest:
-            #         _ = generate_otp(db, OTPGenerateRequest(phone_number=phone))
-            #     return {"sender_id": sender, "replies": [{"text": "An OTP has been sent. Please enter the 6-digit code to proceed."}]}
-
-            # If verified: proceed to send to Rasa below; we will persist after reply
-        finally:
-            db.close()
+                    try:
+                        if payload.text:
+                            append_session_history(db, session_id, f"user: {payload.text}", phone_number=phone)
+                            append_number_history(db, phone, f"user: {payload.text}")
+                        append_session_history(db, session_id, f"bot: {ack}", phone_number=phone)
+                        append_number_history(db, phone, f"bot: {ack}")
+                    except Exception:
+                        pass
+                    return {"sender_id": sender, "session_id": session_id, "replies": [{"text": ack}]}
+                # if not is_phone_verified(phone):
+                #     if payload.text and payload.text.strip().isdigit() and len(payload.text.strip()) == 6 and verify_otp and OTPVerifyRequest:
+                #         resp = verify_otp(db, OTPVerifyRequest(phone_number=phone, otp_code=payload.text.strip()))
+                #         if resp.success:
+                #             return {"sender_id": sender, "replies": [{"text": "OTP verified. You can continue chatting now."}]}
+                #         else:
+                #             return {"sender_id": sender, "replies": [{"text": resp.message}]}
+                #     if generate_otp and OTPGenerateRequest:
+                #         _ = generate_otp(db, OTPGenerateRequest(phone_number=phone))
+                #     return {"sender_id": sender, "replies": [{"text": "An OTP has been sent. Please enter the 6-digit code to proceed."}]}
+
+                # If verified: proceed to send to Rasa below; we will persist after reply
+            finally:
+                db.close()
 
     # Only now talk to Rasa
     # Note: Removed special PAN/TAN handling to let Rasa manage the conversation flow properly
     # This ensures that context-aware processing happens through Rasa actions
 
     # Only now talk to Rasa
-    data = {"sender": sender, "message": payload.text}
+    # The turn's language picks the Hindi or English intents, FAQ answers and Rasa model
+    language = resolve_language(sender, payload.text, session_state.language if session_state is not None else None)
+    if session_state is not None:
+        session_state.language = language
+    # Structured input (PAN, TAN, DOB, menu digit) is classified locally and skips Rasa NLU
+    routed = pre_route(payload.text, language)
+    # High-confidence FAQ questions are answered from the indexed NLU examples
+    faq_replies = None
+    if routed is None and answer_faq:
+        try:
+            faq_replies = answer_faq(payload.text, language)
+        except Exception:
+            # The fast path is optional; any FAQ failure falls through to Rasa
+            faq_replies = None
     try:
-        async with httpx.AsyncClient(timeout=30) as c:
-            r = await c.post(RASA_REST_URL, json=data)
-            r.raise_for_status()
-            replies = r.json()
+        if routed is not None and routed.replies is not None:
+            replies = routed.replies
+            source = "pre_route"
+        elif faq_replies is not None:
+            replies = [dict(reply, recipient_id=sender) for reply in faq_replies]
+            source = "faq"
+        else:
+            source = "rasa"
+            message = routed.rasa_message() if routed is not None else payload.text
+            # English and Hindi can be served by separate, smaller Rasa models
+            rasa_url = rasa_client.url_for_language(language)
+            replies = await rasa_client.send_message(sender, message, url=rasa_url)
+    except rasa_client.RasaOverloaded:
+        if stats_service:
+            stats_service.record_turn("overloaded", routed.intent if routed is not None else None)
+        # Rasa is saturated; answer fast instead of queueing into the 30s timeout
+        return {"sender_id": sender, "session_id": session_id, "replies": [{"text": "We're handling a lot of requests right now. Please wait a moment and send your message again."}]}
     except httpx.HTTPError as e:
         raise HTTPException(status_code=502, detail=f"Rasa unreachable: {e!s}")
 
+    if stats_service:
+        intent = stats_service.reply_intent(replies) or (routed.intent if routed is not None else None)
+        stats_service.record_turn(source, intent)
+
     # Persist conversation for both session and number histories (OTP disabled)
     if payload.phone_number and SessionLocal:
         db = SessionLocal()
@@ -217,7 +413,7 @@ async def chat(payload: ChatIn):
                 save_conversation(
                     db,
                     ConversationCreate(
-                        phone_number=phone, role="user", message=payload.text
+                        phone_number=phone, role="user", message=payload.text, session_id=session_id
                     ),
                 )
             except Exception:
@@ -237,6 +433,7 @@ async def chat(payload: ChatIn):
                                 phone_number=phone,
                                 role="bot",
                                 message=reply["text"],
+                                session_id=session_id,
                             ),
                         )
                     except Exception:
@@ -263,9 +460,32 @@ async def chat_release(payload: ReleaseIn):
             return {"released": False}
         try:
             release_token(db, sid)
+            session_cache.drop_session(sid)
             return {"released": True}
         except Exception:
             return {"released": False}
     finally:
         db.close()
 
+
+@app.post("/chat/heartbeat")
+async def chat_heartbeat(payload: HeartbeatIn):
+    """Renew the session's token lease; no database access. alive=false means the token was given up."""
+    sid = (payload.session_id or "").strip()
+    if not sid:
+        return {"alive": False}
+    if lease_service.leases_shared():
+        if not lease_service.has_lease(sid):
+            return {"alive": False}
+        lease_service.renew_lease(sid)
+    else:
+        # The lease may be held by another worker; the token row is the shared record of liveness
+        if not SessionLocal:
+            return {"alive": False}
+        db = SessionLocal()
+        try:
+            if not touch_token(db, sid):
+                return {"alive": False}
+        finally:
+            db.close()
+    return {"alive": True, "lease_seconds": lease_service.SESSION_LEASE_SECONDS}
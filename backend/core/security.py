@@ -0,0 +1,22 @@
+import hashlib
+import hmac
+import secrets
+
+from backend.core.config import settings
+
+# Only used without SECRET_KEY: hashes made with it do not survive a restart
+_process_key = secrets.token_bytes(32)
+
+
+def secret_key() -> bytes:
+    if settings.secret_key:
+        return settings.secret_key.encode("utf-8")
+    if settings.web_concurrency > 1:
+        # Each worker would hash the same value differently
+        raise RuntimeError(f"WEB_CONCURRENCY={settings.web_concurrency} needs SECRET_KEY to be set")
+    return _process_key
+
+
+def keyed_hash(value: str) -> str:
+    """HMAC-SHA256 of a value under SECRET_KEY; unlike a plain hash, small spaces such as phone numbers cannot be enumerated."""
+    return hmac.new(secret_key(), value.encode("utf-8"), hashlib.sha256).hexdigest()
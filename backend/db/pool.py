@@ -0,0 +1,159 @@
+import threading
+import time
+from typing import Any, Dict
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import NullPool, QueuePool
+
+from backend.core.config import settings
+
+# Upper bounds (ms) of the checkout wait histogram; the last bucket counts everything slower
+WAIT_BUCKETS_MS = (1, 5, 20, 100, 500, 2000)
+
+
+class PoolMetrics:
+    """Checkout counts, time spent waiting for a connection and time connections are held."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self.held_count = 0
+        self.held_total = 0.0
+        self.held_max = 0.0
+
+    def record_wait(self, seconds: float, ok: bool) -> None:
+        ms = seconds * 1000
+        bucket = next((i for i, bound in enumerate(WAIT_BUCKETS_MS) if ms <= bound), len(WAIT_BUCKETS_MS))
+        with self._lock:
+            if ok:
+                self.checkouts += 1
+            else:
+                self.timeouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            self.wait_buckets[bucket] += 1
+
+    def record_held(self, seconds: float) -> None:
+        with self._lock:
+            self.held_count += 1
+            self.held_total += seconds
+            self.held_max = max(self.held_max, seconds)
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            waits = self.checkouts + self.timeouts
+            labels = [f"<={bound}" for bound in WAIT_BUCKETS_MS] + [f">{WAIT_BUCKETS_MS[-1]}"]
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_ms_avg": round(self.wait_total / waits * 1000, 3) if waits else 0.0,
+                "wait_ms_max": round(self.wait_max * 1000, 3),
+                "wait_ms_histogram": dict(zip(labels, self.wait_buckets)),
+                "held_ms_avg": round(self.held_total / self.held_count * 1000, 3) if self.held_count else 0.0,
+                "held_ms_max": round(self.held_max * 1000, 3),
+            }
+
+
+class _TimedCheckout:
+    """Times every connection request, including waits on a full pool (and connect time for NullPool)."""
+
+    metrics: PoolMetrics
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.record_wait(time.perf_counter() - started, ok=False)
+            raise
+        self.metrics.record_wait(time.perf_counter() - started, ok=True)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() replaces the pool; keep counting into the same metrics
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class InstrumentedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class InstrumentedNullPool(_TimedCheckout, NullPool):
+    pass
+
+
+def engine_options(url: str) -> Dict[str, Any]:
+    """create_engine() keyword arguments for the pool settings in Settings."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    options: Dict[str, Any] = {"pool_pre_ping": settings.db_pool_pre_ping}
+    if backend == "sqlite" and parsed.database in (None, "", ":memory:"):
+        # In-memory SQLite lives in one connection; keep SQLAlchemy's default single-connection pool
+        return options
+    if settings.db_pgbouncer and backend == "postgresql":
+        # PgBouncer owns the pool; a client-side pool per worker would pin server connections.
+        # Every checkout is a fresh connection to PgBouncer, so a pre-ping would only add a round-trip.
+        options.update(poolclass=InstrumentedNullPool, pool_pre_ping=False)
+        return options
+    options.update(
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+    )
+    if backend == "postgresql" and settings.db_statement_timeout_ms > 0:
+        options["connect_args"] = {"options": f"-c statement_timeout={settings.db_statement_timeout_ms}"}
+    return options
+
+
+def instrument(engine: Engine) -> Engine:
+    """Track how long connections are held and, under PgBouncer, apply the statement timeout per transaction."""
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, record, proxy) -> None:
+        record.info["checked_out_at"] = time.perf_counter()
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, record) -> None:
+        started = record.info.pop("checked_out_at", None)
+        metrics = getattr(engine.pool, "metrics", None)
+        if started is not None and metrics is not None:
+            metrics.record_held(time.perf_counter() - started)
+
+    if settings.db_pgbouncer and engine.dialect.name == "postgresql" and settings.db_statement_timeout_ms > 0:
+        # PgBouncer rejects startup options, and plain SET would leak onto other clients' server connections
+        @event.listens_for(engine, "begin")
+        def _set_statement_timeout(conn) -> None:
+            conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(settings.db_statement_timeout_ms)}")
+
+    return engine
+
+
+def pool_status(engine: Engine) -> Dict[str, Any]:
+    """Current pool occupancy plus the checkout metrics of an engine."""
+    pool = engine.pool
+    status: Dict[str, Any] = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            idle=pool.checkedin(),
+            overflow=pool.overflow(),
+            max_overflow=pool._max_overflow,
+        )
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        status.update(metrics.as_dict())
+    return status
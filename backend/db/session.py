@@ -1,7 +1,128 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 from backend.core.config import settings
+from backend.db.pool import engine_options, instrument
 
-engine = create_engine(settings.database_url, pool_pre_ping=True)
+engine = instrument(create_engine(settings.database_url, **engine_options(settings.database_url)))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
+
+# Read replicas: read-only endpoints use read_session(); writes always go through SessionLocal
+replica_engines = [instrument(create_engine(url, **engine_options(url))) for url in settings.database_replica_urls]
+_replica_sessions = [sessionmaker(autocommit=False, autoflush=False, bind=e) for e in replica_engines]
+REPLICA_LAG_CHECK_SECONDS = 5.0
+MAX_TRACKED_WRITES = 100000
+
+_lock = threading.Lock()
+# replica index -> (lag in seconds, monotonic time of the check)
+_replica_lag: Dict[int, Tuple[float, float]] = {}
+# sticky key (phone number) -> monotonic time of its last committed write
+_recent_writes: "OrderedDict[str, float]" = OrderedDict()
+_round_robin = itertools.count()
+
+
+def _measure_lag(replica) -> float:
+    with replica.connect() as conn:
+        if replica.dialect.name == "postgresql":
+            # Fully replayed standbys report 0 even when the primary has been idle for a while
+            lag = conn.execute(text(
+                "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+            )).scalar()
+            return float(lag or 0)
+        conn.execute(text("SELECT 1"))
+        return 0.0
+
+
+def _healthy_replicas() -> List[int]:
+    """Replicas within the lag tolerance; lag is re-measured at most every REPLICA_LAG_CHECK_SECONDS."""
+    now = time.monotonic()
+    healthy = []
+    for i, replica in enumerate(replica_engines):
+        with _lock:
+            lag, checked_at = _replica_lag.get(i, (float("inf"), float("-inf")))
+        if now - checked_at > REPLICA_LAG_CHECK_SECONDS:
+            try:
+                lag = _measure_lag(replica)
+            except Exception:
+                # Unreachable replicas are skipped until the next check
+                lag = float("inf")
+            with _lock:
+                _replica_lag[i] = (lag, now)
+        if lag <= settings.replica_max_lag_seconds:
+            healthy.append(i)
+    return healthy
+
+
+def sticky_key(phone: Optional[str]) -> Optional[str]:
+    """
+    Canonical form of a phone number for read-your-writes: its last 10 digits. Rows are written with
+    whatever form the caller used (/chat strips punctuation, other routes only whitespace), and reads
+    come from path parameters, so both sides must agree on one key.
+    """
+    digits = "".join(ch for ch in (phone or "") if ch.isdigit())
+    return digits[-10:] if digits else ((phone or "").strip() or None)
+
+
+def mark_written(*keys: Optional[str]) -> None:
+    """Pin reads for these keys to the primary until replicas within tolerance must have the write."""
+    now = time.monotonic()
+    with _lock:
+        for key in map(sticky_key, keys):
+            if key:
+                _recent_writes[key] = now
+                _recent_writes.move_to_end(key)
+        while _recent_writes:
+            key, written_at = next(iter(_recent_writes.items()))
+            if now - written_at <= settings.replica_max_lag_seconds and len(_recent_writes) <= MAX_TRACKED_WRITES:
+                break
+            del _recent_writes[key]
+
+
+def _wrote_recently(key: str) -> bool:
+    key = sticky_key(key)
+    with _lock:
+        written_at = _recent_writes.get(key)
+    return written_at is not None and time.monotonic() - written_at <= settings.replica_max_lag_seconds
+
+
+def read_session(phone: Optional[str] = None) -> Session:
+    """
+    Session for read-only work. Uses a replica within REPLICA_MAX_LAG_SECONDS (round robin), or the
+    primary when none is configured/healthy or `phone` was written recently.
+    Recent writes are tracked per worker process: a read served by another worker than the write
+    can still see a replica up to REPLICA_MAX_LAG_SECONDS behind.
+    """
+    if not replica_engines or (phone and _wrote_recently(phone)):
+        return SessionLocal()
+    healthy = _healthy_replicas()
+    if not healthy:
+        return SessionLocal()
+    return _replica_sessions[healthy[next(_round_robin) % len(healthy)]]()
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _collect_written_keys(session, flush_context) -> None:
+    # Every model keyed by a phone number counts as a write for that number
+    keys = session.info.setdefault("written_keys", set())
+    for obj in itertools.chain(session.new, session.dirty, session.deleted):
+        phone = getattr(obj, "phone_number", None)
+        if isinstance(phone, str):
+            keys.add(phone)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _mark_committed_writes(session) -> None:
+    keys = session.info.pop("written_keys", None)
+    if keys and replica_engines:
+        mark_written(*keys)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _drop_written_keys(session) -> None:
+    session.info.pop("written_keys", None)
@@ -14,8 +14,9 @@ class Consent(Base):
     granted_at = Column(DateTime, nullable=True)
     revoked_at = Column(DateTime, nullable=True)
     ip_address = Column(String(45), nullable=True)  # IPv4/IPv6 support
-    user_agent = Column(Text, nullable=True)
-    consent_text = Column(Text, nullable=False)  # Store exact consent text shown to user
+    # Exact text shown and the browser user agent live once each in content-hashed tables
+    user_agent_id = Column(Integer, ForeignKey("user_agents.id"), nullable=True)
+    consent_text_id = Column(Integer, ForeignKey("consent_texts.id"), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
@@ -25,12 +26,29 @@ class Consent(Base):
     
     # Relationships
     phone_owner = relationship("PhoneNumber", back_populates="consents")
+    text_ref = relationship("ConsentText", lazy="joined")
+    user_agent_ref = relationship("UserAgent", lazy="joined")
+
+    @property
+    def consent_text(self):
+        return self.text_ref.content if self.text_ref else None
+
+    @property
+    def user_agent(self):
+        return self.user_agent_ref.value if self.user_agent_ref else None
     
     # Indexes for performance
     __table_args__ = (
         Index('idx_consent_phone_purpose', 'phone_number', 'purpose'),
         Index('idx_consent_granted_at', 'granted_at'),
         Index('idx_consent_version', 'consent_version'),
+        # History pages: keyset over (created_at, id) per phone; filter columns included so
+        # purpose/date filtering is answered from the index before rows are fetched
+        Index(
+            'idx_consent_history',
+            'phone_number', 'created_at', 'id',
+            postgresql_include=['purpose', 'granted', 'revoked_at'],
+        ),
     )
 
 class ConsentPolicy(Base):
@@ -52,3 +70,18 @@ class ConsentPolicy(Base):
         Index('idx_policy_purpose_active', 'purpose', 'is_active'),
         Index('idx_policy_effective', 'effective_from', 'effective_until'),
     )
+
+class ConsentText(Base):
+    __tablename__ = "consent_texts"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    content_hash = Column(String(64), nullable=False, unique=True, index=True)  # sha256 of content
+    content = Column(Text, nullable=False)  # Exact consent text shown to the user
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+class UserAgent(Base):
+    __tablename__ = "user_agents"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    value_hash = Column(String(64), nullable=False, unique=True, index=True)  # sha256 of value
+    value = Column(Text, nullable=False)
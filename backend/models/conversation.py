@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, String, Integer, Text, DateTime, ForeignKey
+from sqlalchemy import Column, String, Integer, Text, DateTime, ForeignKey, DDL, event
 from sqlalchemy.orm import relationship
 from backend.db.session import Base
 
@@ -24,3 +24,30 @@ class Conversation(Base):
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
 
     owner = relationship("PhoneNumber", back_populates="conversations")
+
+class ConversationMessage(Base):
+    """
+    One row per chat message, written alongside the conversation blobs so history can be searched.
+    On PostgreSQL the table also gets a generated `search_vector` tsvector column with a GIN index
+    (created below); other databases use search_service's in-process inverted index.
+    """
+    __tablename__ = "conversation_messages"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    phone_number = Column(String(20), ForeignKey("phone_numbers.phone_number"), nullable=False, index=True)
+    session_id = Column(String(64), nullable=True, index=True)
+    role = Column(String(10), nullable=False)  # 'user' or 'bot'
+    message = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+# 'simple' configuration: no stemming or stop words, so PANs, English and Hindi tokens all match as typed
+event.listen(
+    ConversationMessage.__table__,
+    "after_create",
+    DDL(
+        "ALTER TABLE conversation_messages ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        "GENERATED ALWAYS AS (to_tsvector('simple', message)) STORED; "
+        "CREATE INDEX IF NOT EXISTS idx_conversation_messages_search "
+        "ON conversation_messages USING GIN (search_vector)"
+    ).execute_if(dialect="postgresql"),
+)
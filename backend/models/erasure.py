@@ -0,0 +1,24 @@
+from datetime import datetime
+from sqlalchemy import Column, String, Integer, Text, DateTime, Index
+from backend.db.session import Base
+
+
+class ErasureJob(Base):
+    __tablename__ = "erasure_jobs"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    # Cleared once the job completes; only the hash remains as proof of which number was erased
+    phone_number = Column(String(20), nullable=True)
+    phone_hash = Column(String(64), nullable=False, index=True)  # HMAC-SHA256 of the phone number under SECRET_KEY
+    mode = Column(String(20), nullable=False, default="delete")  # 'delete' or 'anonymize'
+    status = Column(String(20), nullable=False, default="pending")  # pending/running/completed/failed
+    current_step = Column(String(50), nullable=True)  # table being processed
+    progress = Column(Text, nullable=False, default="{}")  # JSON: rows erased per table
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)  # doubles as the worker heartbeat
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index('idx_erasure_status_updated', 'status', 'updated_at'),
+    )
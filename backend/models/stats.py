@@ -0,0 +1,22 @@
+from datetime import datetime
+from sqlalchemy import Column, String, BigInteger, DateTime, Index
+from backend.db.session import Base
+
+
+class StatsHourly(Base):
+    """
+    Hourly counters maintained incrementally by stats_service; dashboards read these
+    instead of scanning conversations/feedback.
+    """
+    __tablename__ = "stats_hourly"
+
+    hour = Column(DateTime, primary_key=True)  # UTC, truncated to the hour
+    metric = Column(String(32), primary_key=True)  # turns, intent, submissions, rating
+    dimension = Column(String(100), primary_key=True, default="")  # e.g. turn source, intent name, feedback kind
+    count = Column(BigInteger, nullable=False, default=0)
+    total = Column(BigInteger, nullable=False, default=0)  # sum of values (ratings); average = total / count
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index('idx_stats_metric_hour', 'metric', 'hour'),
+    )
@@ -1,14 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+import ipaddress
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
-from backend.db.session import SessionLocal
+from typing import List, Optional
+from backend.core.config import settings
+from backend.db.session import SessionLocal, read_session
 from backend.schemas.consent import (
     ConsentCreate, ConsentResponse, ConsentCheckRequest, ConsentCheckResponse,
-    ConsentRevokeRequest, ConsentBannerData, ConsentPurpose
+    ConsentRevokeRequest, ConsentBannerData, ConsentPurpose,
+    ConsentBatchCheckRequest, ConsentBatchCheckItem, ConsentBatchGrantRequest, ConsentBatchGrantResponse
 )
 from backend.services.consent_service import (
     create_consent, check_consent, get_consent_banner_data, 
-    revoke_consent, get_consent_history, seed_default_policies
+    revoke_consent, get_consent_history, seed_default_policies,
+    check_consent_batch, grant_consent_batch,
+    encode_history_cursor, decode_history_cursor
 )
 
 router = APIRouter(prefix="/consent", tags=["consent"])
@@ -20,34 +27,92 @@ def get_db():
     finally:
         db.close()
 
+def get_read_db(phone_number: str):
+    """Replica session for read-only endpoints keyed by a phone number path parameter."""
+    db = read_session(phone_number)
+    try:
+        yield db
+    finally:
+        db.close()
+
+TRUSTED_PROXY_NETWORKS = [ipaddress.ip_network(p, strict=False) for p in settings.trusted_proxies]
+
+def _is_trusted_proxy(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in TRUSTED_PROXY_NETWORKS)
+
 def get_client_ip(request: Request) -> str:
-    """Extract client IP address from request."""
+    """
+    Extract client IP address from request.
+    X-Forwarded-For is only honoured from a trusted proxy, and read right to left: the left-most
+    entries are whatever the client sent, so the first hop not added by a trusted proxy is the client.
+    """
+    peer = request.client.host if request.client else "unknown"
     forwarded = request.headers.get("X-Forwarded-For")
-    if forwarded:
-        return forwarded.split(",")[0].strip()
-    return request.client.host if request.client else "unknown"
+    if not forwarded or not _is_trusted_proxy(peer):
+        return peer
+    hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if not _is_trusted_proxy(hop):
+            return hop
+    return hops[0] if hops else peer
 
 @router.post("/check", response_model=ConsentCheckResponse)
 def check_user_consent(
     request: ConsentCheckRequest,
-    db: Session = Depends(get_db)
 ):
     """Check if user has valid consent for a specific purpose."""
+    db = read_session(request.phone_number)
     try:
         return check_consent(db, request.phone_number, request.purpose)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to check consent: {str(e)}")
+    finally:
+        db.close()
+
+# Batch checks larger than this are streamed as NDJSON instead of one JSON array
+BATCH_STREAM_THRESHOLD = 5000
+
+def _stream_batch_check(request: ConsentBatchCheckRequest):
+    # The request-scoped session is closed once the endpoint returns, so the stream owns its own
+    db = read_session()
+    try:
+        for item in check_consent_batch(db, request.phone_numbers, request.purpose):
+            yield item.json() + "\n"
+    finally:
+        db.close()
+
+@router.post("/check/batch", response_model=List[ConsentBatchCheckItem])
+def check_user_consent_batch(
+    request: ConsentBatchCheckRequest,
+    stream: bool = False,
+):
+    """Consent status for many phone numbers; NDJSON stream when `stream=true` or for very large inputs."""
+    if stream or len(request.phone_numbers) > BATCH_STREAM_THRESHOLD:
+        return StreamingResponse(_stream_batch_check(request), media_type="application/x-ndjson")
+    db = read_session()
+    try:
+        return list(check_consent_batch(db, request.phone_numbers, request.purpose))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to check consent: {str(e)}")
+    finally:
+        db.close()
 
 @router.post("/banner-data", response_model=ConsentBannerData)
 def get_banner_data(
     request: ConsentCheckRequest,
-    db: Session = Depends(get_db)
 ):
     """Get consent banner data for UI display."""
+    db = read_session(request.phone_number)
     try:
         return get_consent_banner_data(db, request.phone_number, request.purpose)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get banner data: {str(e)}")
+    finally:
+        db.close()
 
 @router.post("/grant", response_model=ConsentResponse)
 def grant_consent(
@@ -68,6 +133,25 @@ def grant_consent(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to grant consent: {str(e)}")
 
+@router.post("/grant/batch", response_model=ConsentBatchGrantResponse)
+def grant_consent_batch_endpoint(
+    request: ConsentBatchGrantRequest,
+    http_request: Request,
+    db: Session = Depends(get_db)
+):
+    """Record consent for many phone numbers at once (e.g. imported from a signed campaign list)."""
+    try:
+        return grant_consent_batch(
+            db,
+            request,
+            ip_address=get_client_ip(http_request),
+            user_agent=http_request.headers.get("User-Agent", "unknown"),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to grant consent: {str(e)}")
+
 @router.post("/revoke")
 def revoke_user_consent(
     request: ConsentRevokeRequest,
@@ -87,12 +171,28 @@ def revoke_user_consent(
 @router.get("/history/{phone_number}", response_model=List[ConsentResponse])
 def get_user_consent_history(
     phone_number: str,
+    response: Response,
     purpose: ConsentPurpose = None,
-    db: Session = Depends(get_db)
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db)
 ):
-    """Get consent history for a phone number."""
+    """
+    Get consent history for a phone number, newest first, one page at a time.
+    When more rows exist, the `X-Next-Cursor` header holds the `cursor` for the next page.
+    """
+    try:
+        after = decode_history_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     try:
-        history = get_consent_history(db, phone_number, purpose)
+        # One extra row tells whether another page exists
+        history = get_consent_history(db, phone_number, purpose, since, until, limit + 1, after)
+        if len(history) > limit:
+            history = history[:limit]
+            response.headers["X-Next-Cursor"] = encode_history_cursor(history[-1])
         return [ConsentResponse.from_orm(consent) for consent in history]
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get consent history: {str(e)}")
@@ -1,11 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy import text
 from sqlalchemy.orm import Session
-from backend.db.session import SessionLocal, Base, engine
+from backend.db.session import SessionLocal, Base, engine, read_session
 # Ensure all models are registered before creating tables
 from backend.models import history as _history_models  # noqa: F401
-from backend.schemas.conversation import ConversationCreate, ConversationOut, ConversationSingle, SavePANRequest, SaveTANRequest
+from backend.schemas.conversation import ConversationCreate, ConversationOut, ConversationSearchHit, ConversationSingle, SavePANRequest, SaveTANRequest
 from backend.services.conversation_service import save_conversation, get_conversations, ensure_phone_number, save_pan_number, save_tan_number
+from backend.services.search_service import search_conversations, encode_search_cursor, decode_search_cursor
 
 # Ensure tables exist (simple bootstrap). In production use Alembic.
 Base.metadata.create_all(bind=engine)
@@ -30,14 +33,51 @@ def get_db():
         db.close()
 
 
+def get_read_db(phone_number: Optional[str] = None):
+    """Replica session for read-only endpoints; reads for a recently written phone number stay on the primary."""
+    db = read_session(phone_number)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
 @router.post("/", response_model=ConversationOut)
 def api_save_conversation(payload: ConversationCreate, db: Session = Depends(get_db)):
     conv = save_conversation(db, payload)
     return ConversationOut.from_orm(conv)
 
 
+# Declared before /{phone_number} so "search" is not taken for a phone number
+@router.get("/search", response_model=List[ConversationSearchHit])
+def api_search_conversations(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    phone_number: Optional[str] = None,
+    role: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+):
+    """
+    Full-text search over chat messages, newest first, with matches highlighted.
+    When more hits exist, the `X-Next-Cursor` header holds the `cursor` for the next page.
+    """
+    try:
+        after = decode_search_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    hits = search_conversations(db, q, phone_number, role, since, until, limit + 1, after)
+    if len(hits) > limit:
+        hits = hits[:limit]
+        response.headers["X-Next-Cursor"] = encode_search_cursor(hits[-1])
+    return hits
+
+
 @router.get("/{phone_number}", response_model=ConversationSingle)
-def api_get_conversations(phone_number: str, db: Session = Depends(get_db)):
+def api_get_conversations(phone_number: str, db: Session = Depends(get_read_db)):
     row = get_conversations(db, phone_number)
     serialized = ConversationOut.from_orm(row) if row else None
     return ConversationSingle(phone_number=phone_number, conversation=serialized)
@@ -0,0 +1,43 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from backend.db.session import SessionLocal
+from backend.schemas.erasure import ErasureJobResponse, ErasureRequest
+from backend.services.erasure_service import create_erasure_job, get_erasure_job, to_response
+
+router = APIRouter(prefix="/erasure", tags=["erasure"])
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+@router.post("", response_model=ErasureJobResponse, status_code=202)
+def request_erasure(request: ErasureRequest, db: Session = Depends(get_db)):
+    """Queue erasure of every record linked to a phone number; runs in the background in chunks."""
+    try:
+        return to_response(create_erasure_job(db, request))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to queue erasure: {str(e)}")
+
+@router.get("/{job_id}", response_model=ErasureJobResponse)
+def get_erasure_status(job_id: int, db: Session = Depends(get_db)):
+    """Progress of an erasure job: current table and rows erased per table."""
+    job = get_erasure_job(db, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Erasure job not found")
+    return to_response(job)
+
+@router.post("/{job_id}/resume", response_model=ErasureJobResponse)
+def resume_erasure(job_id: int, db: Session = Depends(get_db)):
+    """Re-queue a failed job; it continues from the step and chunk where it stopped."""
+    job = get_erasure_job(db, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Erasure job not found")
+    if job.status == "failed":
+        job.status = "pending"
+        job.error = None
+        db.commit()
+        db.refresh(job)
+    return to_response(job)
@@ -1,7 +1,9 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from backend.db.session import SessionLocal, Base, engine
 from backend.models.history import Complaint, Feedback, Suggestion
+from backend.schemas.feedback import FeedbackBatchAck, FeedbackBatchRequest, FeedbackKind
+from backend.services import ingestion_service, stats_service
 
 
 Base.metadata.create_all(bind=engine)
@@ -23,6 +25,7 @@ def submit_complaint(message: str, phone_number: str | None = None, db: Session
     db.add(row)
     db.commit()
     db.refresh(row)
+    stats_service.record_submission("complaint")
     return {"id": row.id}
 
 
@@ -32,6 +35,7 @@ def submit_feedback(message: str, rating: int | None = None, phone_number: str |
     db.add(row)
     db.commit()
     db.refresh(row)
+    stats_service.record_submission("feedback", rating)
     return {"id": row.id}
 
 
@@ -41,6 +45,19 @@ def submit_suggestion(message: str, phone_number: str | None = None, db: Session
     db.add(row)
     db.commit()
     db.refresh(row)
+    stats_service.record_submission("suggestion")
     return {"id": row.id}
 
 
+@router.post("/{kind}/batch", response_model=FeedbackBatchAck, status_code=202)
+def submit_batch(kind: FeedbackKind, request: FeedbackBatchRequest):
+    """
+    Queue complaints, feedback or suggestions for a multi-row insert on the next flush.
+    The acknowledgement lists client ids; database ids are not returned.
+    """
+    if kind != FeedbackKind.FEEDBACK and any(item.rating is not None for item in request.items):
+        raise HTTPException(status_code=422, detail=f"rating is only accepted for feedback, not {kind.value}")
+    ack = ingestion_service.enqueue(kind, request.items)
+    if ack is None:
+        raise HTTPException(status_code=503, detail="Ingestion queue is full, please retry shortly")
+    return ack
@@ -1,5 +1,6 @@
 from fastapi import APIRouter
 from pydantic import BaseModel, constr
+from backend.services.status_service import get_pan_status as lookup_pan_status
 
 
 class PANStatusRequest(BaseModel):
@@ -17,11 +18,4 @@ router = APIRouter(prefix="/pan", tags=["pan"])
 
 @router.post("/status", response_model=PANStatusResponse)
 def get_pan_status(payload: PANStatusRequest) -> PANStatusResponse:
-    pan = (payload.pan_number or "").strip().upper()
-    # Static response for now as requested
-    return PANStatusResponse(
-        pan_number=pan,
-        status="in_progress",
-        message="Your PAN application is in progress. Please check back later.",
-    )
-
+    return PANStatusResponse(**lookup_pan_status(payload.pan_number))
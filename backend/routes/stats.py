@@ -0,0 +1,34 @@
+from datetime import datetime
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from backend.db.session import read_session
+from backend.schemas.stats import StatsBucket, StatsMetric, StatsPoint
+from backend.services.stats_service import query_stats
+
+router = APIRouter(prefix="/stats", tags=["stats"])
+
+def get_db():
+    # Rollups tolerate replica lag; they already trail live traffic by the flush interval
+    db = read_session()
+    try:
+        yield db
+    finally:
+        db.close()
+
+@router.get("/{metric}", response_model=List[StatsPoint])
+def get_stats(
+    metric: StatsMetric,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    bucket: StatsBucket = StatsBucket.HOUR,
+    dimension: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Rolled-up counters (default: last 7 days, hourly). Reads only the stats_hourly table;
+    the latest few seconds may not be included yet.
+    """
+    if since and until and since >= until:
+        raise HTTPException(status_code=400, detail="since must be before until")
+    return query_stats(db, metric, since=since, until=until, bucket=bucket, dimension=dimension)
@@ -1,5 +1,6 @@
 from fastapi import APIRouter
 from pydantic import BaseModel, constr
+from backend.services.status_service import get_tan_status as lookup_tan_status
 
 
 class TANStatusRequest(BaseModel):
@@ -17,10 +18,4 @@ router = APIRouter(prefix="/tan", tags=["tan"])
 
 @router.post("/status", response_model=TANStatusResponse)
 def get_tan_status(payload: TANStatusRequest) -> TANStatusResponse:
-    tan = (payload.tan_number or "").strip().upper()
-    # Static response for now as requested
-    return TANStatusResponse(
-        tan_number=tan,
-        status="in_progress",
-        message="Your TAN application is in progress. Please check back later.",
-    )
+    return TANStatusResponse(**lookup_tan_status(payload.tan_number))
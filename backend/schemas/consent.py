@@ -1,6 +1,6 @@
 from datetime import datetime
 from typing import Optional, List
-from pydantic import BaseModel, constr, validator
+from pydantic import BaseModel, conlist, constr, validator
 from enum import Enum
 
 PhoneNumberStr = constr(strip_whitespace=True, min_length=8, max_length=20)
@@ -80,3 +80,34 @@ class ConsentBannerData(BaseModel):
     has_existing_consent: bool
     existing_consent_version: Optional[str]
     requires_consent: bool
+
+# Batch endpoints accept up to this many phone numbers per request
+MAX_BATCH_PHONES = 100000
+
+class ConsentBatchCheckRequest(BaseModel):
+    phone_numbers: conlist(PhoneNumberStr, min_items=1, max_items=MAX_BATCH_PHONES)
+    purpose: ConsentPurpose
+
+class ConsentBatchCheckItem(BaseModel):
+    phone_number: str
+    has_consent: bool
+    consent_version: Optional[str]
+    granted_at: Optional[datetime]
+    requires_new_consent: bool
+
+class ConsentBatchGrantRequest(BaseModel):
+    phone_numbers: conlist(PhoneNumberStr, min_items=1, max_items=MAX_BATCH_PHONES)
+    purpose: ConsentPurpose
+    granted: bool
+    consent_text: str
+
+    @validator('consent_text')
+    def validate_consent_text(cls, v):
+        if not v or len(v.strip()) < 10:
+            raise ValueError('Consent text must be at least 10 characters')
+        return v.strip()
+
+class ConsentBatchGrantResponse(BaseModel):
+    consent_version: str
+    recorded: int
+    revoked_previous: int
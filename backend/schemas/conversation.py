@@ -8,6 +8,7 @@ class ConversationCreate(BaseModel):
     phone_number: PhoneNumberStr
     role: str  # 'user' or 'bot'
     message: str
+    session_id: Optional[str] = None  # recorded in the search index
 
 class SavePANRequest(BaseModel):
     phone_number: PhoneNumberStr
@@ -30,3 +31,12 @@ class ConversationOut(BaseModel):
 class ConversationSingle(BaseModel):
     phone_number: PhoneNumberStr
     conversation: Optional[ConversationOut]
+
+class ConversationSearchHit(BaseModel):
+    id: int
+    phone_number: str
+    session_id: Optional[str]
+    role: str
+    message: str  # raw text; escape before rendering
+    highlight: str  # HTML-escaped snippet, matched terms wrapped in <mark>…</mark>
+    created_at: datetime
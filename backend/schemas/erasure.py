@@ -0,0 +1,26 @@
+from datetime import datetime
+from enum import Enum
+from typing import Dict, Optional
+from pydantic import BaseModel, constr
+
+PhoneNumberStr = constr(strip_whitespace=True, min_length=8, max_length=20)
+
+class ErasureMode(str, Enum):
+    DELETE = "delete"  # remove every row linked to the number
+    ANONYMIZE = "anonymize"  # keep complaints/feedback/suggestions, unlinked from the number
+
+class ErasureRequest(BaseModel):
+    phone_number: PhoneNumberStr
+    mode: ErasureMode = ErasureMode.DELETE
+
+class ErasureJobResponse(BaseModel):
+    id: int
+    phone_hash: str
+    mode: str
+    status: str
+    current_step: Optional[str]
+    progress: Dict[str, int]
+    error: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+    finished_at: Optional[datetime]
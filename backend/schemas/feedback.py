@@ -0,0 +1,26 @@
+from enum import Enum
+from typing import List, Optional
+from pydantic import BaseModel, conlist, constr
+
+PhoneNumberStr = constr(strip_whitespace=True, min_length=8, max_length=20)
+ClientIdStr = constr(strip_whitespace=True, min_length=1, max_length=64)
+
+MAX_BATCH_ITEMS = 1000
+
+class FeedbackKind(str, Enum):
+    COMPLAINT = "complaint"
+    FEEDBACK = "feedback"
+    SUGGESTION = "suggestion"
+
+class FeedbackItem(BaseModel):
+    client_id: ClientIdStr  # chosen by the client; echoed in the acknowledgement and used to drop resubmissions
+    message: constr(strip_whitespace=True, min_length=1)
+    rating: Optional[int] = None  # only for kind=feedback
+    phone_number: Optional[PhoneNumberStr] = None
+
+class FeedbackBatchRequest(BaseModel):
+    items: conlist(FeedbackItem, min_items=1, max_items=MAX_BATCH_ITEMS)
+
+class FeedbackBatchAck(BaseModel):
+    accepted: List[str]
+    duplicates: List[str]  # client ids already received recently; not queued again
@@ -18,6 +18,13 @@ class OTPResponse(BaseModel):
     phone_number: Optional[PhoneNumberStr] = None
     expires_at: Optional[datetime] = None
 
+class OTPStatusOut(BaseModel):
+    phone_number: PhoneNumberStr
+    status: str  # pending | locked | verified
+    attempts: int
+    expires_at: Optional[datetime] = None
+    verified_at: Optional[datetime] = None
+
 class OTPVerificationOut(BaseModel):
     id: int
     phone_number: PhoneNumberStr
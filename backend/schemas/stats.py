@@ -0,0 +1,21 @@
+from datetime import datetime
+from enum import Enum
+from typing import Optional
+from pydantic import BaseModel
+
+class StatsMetric(str, Enum):
+    TURNS = "turns"  # chat turns, by source: rasa, faq, pre_route
+    INTENT = "intent"  # chat turns, by intent
+    SUBMISSIONS = "submissions"  # complaints/feedback/suggestions, by kind
+    RATING = "rating"  # rated feedback; total is the sum of ratings
+
+class StatsBucket(str, Enum):
+    HOUR = "hour"
+    DAY = "day"
+
+class StatsPoint(BaseModel):
+    bucket: datetime
+    dimension: str
+    count: int
+    total: int
+    average: Optional[float]
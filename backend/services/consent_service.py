@@ -1,14 +1,65 @@
+import base64
+import hashlib
 from datetime import datetime, timedelta
-from typing import Optional, List, Tuple
+from typing import Dict, Iterable, Iterator, Optional, List, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
-from backend.models.consent import Consent, ConsentPolicy
+from sqlalchemy import and_, event, or_, func, tuple_
+from sqlalchemy.exc import IntegrityError
+from backend.db.session import mark_written
+from backend.models.consent import Consent, ConsentPolicy, ConsentText, UserAgent
 from backend.models.conversation import PhoneNumber
 from backend.schemas.consent import (
     ConsentCreate, ConsentPurpose, ConsentStatus, 
-    ConsentCheckResponse, ConsentPolicyResponse, ConsentBannerData
+    ConsentCheckResponse, ConsentPolicyResponse, ConsentBannerData,
+    ConsentBatchCheckItem, ConsentBatchGrantRequest, ConsentBatchGrantResponse
 )
 
+# Phone numbers per set-based query in the batch functions (keeps IN lists and memory bounded)
+BATCH_QUERY_CHUNK = 1000
+
+# (table, sha256) -> id of committed interned rows; they are never updated or deleted
+_interned_ids: Dict[Tuple[str, str], int] = {}
+
+def _intern(db: Session, model, hash_column, value_column, value: str) -> int:
+    """Id of the row holding `value`, inserting it once; identical strings share one row."""
+    digest = hashlib.sha256(value.encode("utf-8")).hexdigest()
+    key = (model.__tablename__, digest)
+    if key in _interned_ids:
+        return _interned_ids[key]
+    existing_id = db.query(model.id).filter(hash_column == digest).scalar()
+    if existing_id is not None:
+        # May be this transaction's own uncommitted insert; cached only once the session commits
+        db.info.setdefault("interned_ids", {})[key] = existing_id
+        return existing_id
+    try:
+        with db.begin_nested():
+            row = model(**{hash_column.key: digest, value_column.key: value})
+            db.add(row)
+        db.info.setdefault("interned_ids", {})[key] = row.id
+        return row.id
+    except IntegrityError:
+        # Inserted concurrently by another request
+        return db.query(model.id).filter(hash_column == digest).scalar()
+
+@event.listens_for(Session, "after_commit")
+def _publish_interned_ids(session) -> None:
+    pending = session.info.pop("interned_ids", None)
+    if pending:
+        _interned_ids.update(pending)
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_interned_ids(session, previous_transaction) -> None:
+    # Any rollback (savepoints included) may have undone an insert; those ids are simply looked up again
+    session.info.pop("interned_ids", None)
+
+def intern_consent_text(db: Session, text: str) -> int:
+    return _intern(db, ConsentText, ConsentText.content_hash, ConsentText.content, text)
+
+def intern_user_agent(db: Session, user_agent: Optional[str]) -> Optional[int]:
+    if not user_agent:
+        return None
+    return _intern(db, UserAgent, UserAgent.value_hash, UserAgent.value, user_agent)
+
 def get_active_policy(db: Session, purpose: ConsentPurpose) -> Optional[ConsentPolicy]:
     """Get the currently active consent policy for a given purpose."""
     now = datetime.utcnow()
@@ -114,8 +165,8 @@ def create_consent(db: Session, consent_data: ConsentCreate) -> Consent:
         granted=consent_data.granted,
         granted_at=datetime.utcnow() if consent_data.granted else None,
         ip_address=consent_data.ip_address,
-        user_agent=consent_data.user_agent,
-        consent_text=consent_data.consent_text,
+        user_agent_id=intern_user_agent(db, consent_data.user_agent),
+        consent_text_id=intern_consent_text(db, consent_data.consent_text),
         created_by="system",
         updated_by="system"
     )
@@ -125,6 +176,111 @@ def create_consent(db: Session, consent_data: ConsentCreate) -> Consent:
     db.refresh(consent)
     return consent
 
+def _chunks(values: List[str], size: int = BATCH_QUERY_CHUNK) -> Iterator[List[str]]:
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+def check_consent_batch(db: Session, phone_numbers: Iterable[str], purpose: ConsentPurpose) -> Iterator[ConsentBatchCheckItem]:
+    """
+    Consent status for many phone numbers, one set-based query per chunk: the latest
+    granted, non-revoked consent per phone is picked with ROW_NUMBER() OVER (PARTITION BY phone).
+    Yields one item per distinct phone number, in input order.
+    """
+    policy = get_active_policy(db, purpose)
+    phones = list(dict.fromkeys(phone_numbers))
+    for chunk in _chunks(phones):
+        ranked = (
+            db.query(
+                Consent.phone_number,
+                Consent.consent_version,
+                Consent.granted_at,
+                func.row_number().over(
+                    partition_by=Consent.phone_number,
+                    order_by=(Consent.created_at.desc(), Consent.id.desc()),
+                ).label("rn"),
+            )
+            .filter(
+                Consent.phone_number.in_(chunk),
+                Consent.purpose == purpose.value,
+                Consent.granted == True,
+                Consent.revoked_at.is_(None)
+            )
+            .subquery()
+        )
+        latest = {
+            row.phone_number: row
+            for row in db.query(ranked.c.phone_number, ranked.c.consent_version, ranked.c.granted_at)
+            .filter(ranked.c.rn == 1)
+        }
+        for phone in chunk:
+            row = latest.get(phone)
+            current = bool(row and policy and row.consent_version == policy.version)
+            yield ConsentBatchCheckItem(
+                phone_number=phone,
+                has_consent=current,
+                consent_version=row.consent_version if row else None,
+                granted_at=row.granted_at if row else None,
+                requires_new_consent=not current,
+            )
+
+def grant_consent_batch(
+    db: Session,
+    request: ConsentBatchGrantRequest,
+    ip_address: Optional[str] = None,
+    user_agent: Optional[str] = None,
+) -> ConsentBatchGrantResponse:
+    """Record one consent per phone with bulk statements: ensure phones, revoke previous, insert new."""
+    policy = get_active_policy(db, request.purpose)
+    if not policy:
+        raise ValueError(f"No active policy found for purpose: {request.purpose}")
+    text_id = intern_consent_text(db, request.consent_text)
+    agent_id = intern_user_agent(db, user_agent)
+    now = datetime.utcnow()
+    recorded = revoked = 0
+    for chunk in _chunks(list(dict.fromkeys(request.phone_numbers))):
+        known = {
+            row.phone_number
+            for row in db.query(PhoneNumber.phone_number).filter(PhoneNumber.phone_number.in_(chunk))
+        }
+        db.bulk_insert_mappings(
+            PhoneNumber, [{"phone_number": phone, "created_at": now} for phone in chunk if phone not in known]
+        )
+        revoked += (
+            db.query(Consent)
+            .filter(
+                Consent.phone_number.in_(chunk),
+                Consent.purpose == request.purpose.value,
+                Consent.revoked_at.is_(None)
+            )
+            .update({"revoked_at": now, "updated_at": now, "updated_by": "system"}, synchronize_session=False)
+        )
+        db.bulk_insert_mappings(
+            Consent,
+            [
+                {
+                    "phone_number": phone,
+                    "consent_version": policy.version,
+                    "purpose": request.purpose.value,
+                    "granted": request.granted,
+                    "granted_at": now if request.granted else None,
+                    "ip_address": ip_address,
+                    "user_agent_id": agent_id,
+                    "consent_text_id": text_id,
+                    "created_at": now,
+                    "updated_at": now,
+                    "created_by": "system",
+                    "updated_by": "system",
+                }
+                for phone in chunk
+            ],
+        )
+        # Commit per chunk so a very large batch does not hold one huge transaction
+        db.commit()
+        # Bulk statements bypass the session's write tracking; keep these numbers' reads on the primary
+        mark_written(*chunk)
+        recorded += len(chunk)
+    return ConsentBatchGrantResponse(consent_version=policy.version, recorded=recorded, revoked_previous=revoked)
+
 def get_consent_banner_data(db: Session, phone_number: str, purpose: ConsentPurpose) -> ConsentBannerData:
     """Get data needed for consent banner display."""
     policy = get_active_policy(db, purpose)
@@ -166,14 +322,48 @@ def revoke_consent(db: Session, phone_number: str, purpose: ConsentPurpose, reas
     db.commit()
     return True
 
-def get_consent_history(db: Session, phone_number: str, purpose: Optional[ConsentPurpose] = None) -> List[Consent]:
-    """Get consent history for a phone number."""
+def encode_history_cursor(consent: Consent) -> str:
+    """Opaque cursor pointing just after `consent` in history order."""
+    raw = f"{consent.created_at.isoformat()}|{consent.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_history_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, consent_id = raw.split("|")
+        return datetime.fromisoformat(created_at), int(consent_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid history cursor")
+
+def get_consent_history(
+    db: Session,
+    phone_number: str,
+    purpose: Optional[ConsentPurpose] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: Optional[int] = None,
+    after: Optional[Tuple[datetime, int]] = None,
+) -> List[Consent]:
+    """
+    Get consent history for a phone number, newest first.
+    With `limit`, returns one page; pass the (created_at, id) of its last row as `after`
+    for the next one (keyset pagination, constant cost per page).
+    """
     query = db.query(Consent).filter(Consent.phone_number == phone_number)
     
     if purpose:
         query = query.filter(Consent.purpose == purpose.value)
+    if since:
+        query = query.filter(Consent.created_at >= since)
+    if until:
+        query = query.filter(Consent.created_at < until)
+    if after:
+        query = query.filter(tuple_(Consent.created_at, Consent.id) < tuple_(*after))
     
-    return query.order_by(Consent.created_at.desc()).all()
+    query = query.order_by(Consent.created_at.desc(), Consent.id.desc())
+    if limit:
+        query = query.limit(limit)
+    return query.all()
 
 def seed_default_policies(db: Session) -> None:
     """Seed default consent policies for the system."""
@@ -4,6 +4,7 @@ from sqlalchemy.orm import Session
 from backend.models.conversation import PhoneNumber, Conversation
 from backend.models.history import NumberChatHistory, SessionChatHistory
 from backend.schemas.conversation import ConversationCreate
+from backend.services.search_service import index_message
 
 
 def ensure_phone_number(db: Session, phone_number: str) -> PhoneNumber:
@@ -90,6 +91,9 @@ def save_conversation(db: Session, payload: ConversationCreate) -> Conversation:
         for extra in extras:
             db.delete(extra)
 
+    # One row per message for full-text search (committed together with the conversation)
+    index_message(db, payload.phone_number, payload.role, payload.message, session_id=payload.session_id)
+
     # If user message contains a PAN/TAN, persist it on the phone_numbers row
     try:
         if payload.role.lower() == "user":
@@ -0,0 +1,212 @@
+import asyncio
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from backend.core.security import keyed_hash
+from backend.db.session import SessionLocal, mark_written
+from backend.models.consent import Consent
+from backend.models.conversation import Conversation, ConversationMessage, PhoneNumber
+from backend.models.erasure import ErasureJob
+from backend.models.history import Complaint, Feedback, NumberChatHistory, SessionChatHistory, SessionToken, Suggestion
+from backend.models.otp import OTPVerification
+from backend.schemas.erasure import ErasureJobResponse, ErasureMode, ErasureRequest
+from backend.services import lease_service, otp_service, session_cache
+
+
+# Rows deleted/updated per statement; each chunk is its own short transaction
+ERASURE_CHUNK_SIZE = int(os.getenv("ERASURE_CHUNK_SIZE", "500"))
+# Pause between chunks so live chat writes are never queued behind an erasure
+ERASURE_CHUNK_PAUSE_SECONDS = float(os.getenv("ERASURE_CHUNK_PAUSE_SECONDS", "0.05"))
+ERASURE_POLL_SECONDS = 5.0
+# A running job whose heartbeat (updated_at) is older than this is taken over by another worker
+ERASURE_STALE_SECONDS = 300
+
+# (step, model, what "anonymize" mode does) in foreign-key order; the phone row goes last
+ERASURE_STEPS = [
+    ("conversations", Conversation, "delete"),
+    ("conversation_messages", ConversationMessage, "delete"),
+    ("consents", Consent, "delete"),
+    ("otp_verifications", OTPVerification, "delete"),
+    ("session_chathistory", SessionChatHistory, "delete"),
+    ("number_chathistory", NumberChatHistory, "delete"),
+    ("complaint", Complaint, "unlink"),
+    ("feedback", Feedback, "unlink"),
+    ("suggestion", Suggestion, "unlink"),
+    ("phone_numbers", PhoneNumber, "delete"),
+]
+
+erasure_task: Optional["asyncio.Task[None]"] = None
+
+
+def hash_phone(phone_number: str) -> str:
+    """Audit id of an erased number: keyed, so the log cannot be matched against all phone numbers."""
+    return keyed_hash(phone_number)
+
+
+def to_response(job: ErasureJob) -> ErasureJobResponse:
+    return ErasureJobResponse(
+        id=job.id,
+        phone_hash=job.phone_hash,
+        mode=job.mode,
+        status=job.status,
+        current_step=job.current_step,
+        progress=json.loads(job.progress or "{}"),
+        error=job.error,
+        created_at=job.created_at,
+        updated_at=job.updated_at,
+        finished_at=job.finished_at,
+    )
+
+
+def create_erasure_job(db: Session, request: ErasureRequest) -> ErasureJob:
+    """Queue an erasure; an unfinished job for the same number is returned instead of a duplicate."""
+    phone_hash = hash_phone(request.phone_number)
+    existing = (
+        db.query(ErasureJob)
+        .filter(ErasureJob.phone_hash == phone_hash, ErasureJob.status.in_(("pending", "running")))
+        .first()
+    )
+    if existing:
+        return existing
+    job = ErasureJob(
+        phone_number=request.phone_number,
+        phone_hash=phone_hash,
+        mode=request.mode.value,
+        status="pending",
+        current_step=ERASURE_STEPS[0][0],
+        progress="{}",
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def get_erasure_job(db: Session, job_id: int) -> Optional[ErasureJob]:
+    return db.get(ErasureJob, job_id)
+
+
+def claim_next_job(db: Session) -> Optional[int]:
+    """Mark the oldest pending (or abandoned) job as running for this worker; None when idle."""
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=ERASURE_STALE_SECONDS)
+    job = (
+        db.query(ErasureJob)
+        .filter(or_(ErasureJob.status == "pending", and_(ErasureJob.status == "running", ErasureJob.updated_at < stale)))
+        .order_by(ErasureJob.id.asc())
+        .first()
+    )
+    if job is None:
+        return None
+    # Conditional update: only one worker wins a job
+    claimed = (
+        db.query(ErasureJob)
+        .filter(ErasureJob.id == job.id, ErasureJob.status == job.status, ErasureJob.updated_at == job.updated_at)
+        .update({"status": "running", "updated_at": now}, synchronize_session=False)
+    )
+    db.commit()
+    return job.id if claimed else None
+
+
+def _remaining_linked_rows(db: Session, phone: str) -> bool:
+    return any(
+        db.query(model).filter(model.phone_number == phone).first() is not None
+        for _, model, _ in ERASURE_STEPS[:-1]
+    )
+
+
+def process_chunk(db: Session, job_id: int) -> bool:
+    """Erase one chunk of the job's current step. Returns True when the job is finished."""
+    job = db.get(ErasureJob, job_id)
+    if job is None or job.status != "running":
+        return True
+    phone = job.phone_number
+    progress = json.loads(job.progress or "{}")
+    names = [name for name, _, _ in ERASURE_STEPS]
+    step = names.index(job.current_step) if job.current_step in names else 0
+    name, model, anonymize_action = ERASURE_STEPS[step]
+
+    if name == "phone_numbers" and _remaining_linked_rows(db, phone):
+        # Live chat wrote new rows while earlier steps ran; sweep them before removing the phone row
+        job.current_step = names[0]
+        job.updated_at = datetime.utcnow()
+        db.commit()
+        return False
+
+    pk = model.__mapper__.primary_key[0]
+    ids = [row[0] for row in db.query(pk).filter(model.phone_number == phone).limit(ERASURE_CHUNK_SIZE)]
+    ended_sessions = set()
+    if ids:
+        query = db.query(model).filter(pk.in_(ids))
+        if hasattr(model, "session_id"):
+            # The number's chat sessions end with it: free their tokens (leases are revoked after the commit)
+            ended_sessions = {sid for (sid,) in db.query(model.session_id).filter(pk.in_(ids)) if sid}
+            if ended_sessions:
+                db.query(SessionToken).filter(SessionToken.session_id.in_(ended_sessions)).update(
+                    {"is_busy": False, "session_id": None, "assigned_at": None}, synchronize_session=False
+                )
+        if job.mode == ErasureMode.ANONYMIZE.value and anonymize_action == "unlink":
+            affected = query.update({"phone_number": None}, synchronize_session=False)
+        else:
+            affected = query.delete(synchronize_session=False)
+        progress[name] = progress.get(name, 0) + affected
+    elif step + 1 < len(ERASURE_STEPS):
+        job.current_step = names[step + 1]
+    else:
+        job.status = "completed"
+        job.current_step = None
+        job.phone_number = None
+        job.finished_at = datetime.utcnow()
+    job.progress = json.dumps(progress)
+    job.updated_at = datetime.utcnow()
+    db.commit()
+    for session_id in ended_sessions:
+        lease_service.revoke_lease(session_id)
+        session_cache.drop_session(session_id)
+    if job.status == "completed":
+        # In-memory state outside the database; search postings are rebuilt by search_service on its next query
+        session_cache.drop_phone(phone)
+        otp_service.forget_phone(phone)
+        mark_written(phone)
+        return True
+    return False
+
+
+def fail_job(db: Session, job_id: int, error: str) -> None:
+    job = db.get(ErasureJob, job_id)
+    if job is not None:
+        job.status = "failed"
+        job.error = error[:2000]
+        job.updated_at = datetime.utcnow()
+        db.commit()
+
+
+def _with_session(fn, *args):
+    db = SessionLocal()
+    try:
+        return fn(db, *args)
+    finally:
+        db.close()
+
+
+async def run_erasure_worker() -> None:
+    """Background loop: claim a job, erase it chunk by chunk (DB work in a thread), repeat."""
+    while True:
+        try:
+            job_id = await asyncio.to_thread(_with_session, claim_next_job)
+        except Exception:
+            job_id = None
+        if job_id is None:
+            await asyncio.sleep(ERASURE_POLL_SECONDS)
+            continue
+        try:
+            while not await asyncio.to_thread(_with_session, process_chunk, job_id):
+                await asyncio.sleep(ERASURE_CHUNK_PAUSE_SECONDS)
+        except Exception as e:
+            # Failed jobs keep their step and progress; re-queue by setting status back to 'pending'
+            await asyncio.to_thread(_with_session, fail_job, job_id, f"{type(e).__name__}: {e!s}")
@@ -0,0 +1,282 @@
+import logging
+import math
+import os
+import re
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import yaml
+from scipy import sparse
+
+logger = logging.getLogger(__name__)
+
+RASA_BOT_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "rasa_bot")
+NLU_FILES = ("data/nlu.yml", "data/nlu_hi.yml")
+DIALOGUE_FILES = ("data/rules.yml", "data/stories.yml")
+DOMAIN_FILE = "domain.yml"
+
+FAQ_ENABLED = os.getenv("FAQ_ENABLED", "1") not in ("0", "false", "False")
+# Centroid match: cosine similarity to the mean of an intent's examples, and lead over the runner-up.
+# Tuned with scripts/benchmark_faq.py: no wrong answers on held-out examples (every 3rd/4th/5th);
+# a margin of 0.2 answered more but was only 88-96% precise.
+FAQ_MIN_SCORE = float(os.getenv("FAQ_MIN_SCORE", "0.5"))
+FAQ_MIN_MARGIN = float(os.getenv("FAQ_MIN_MARGIN", "0.35"))
+# Near-duplicate of a single training example is always accepted
+FAQ_DUPLICATE_SCORE = 0.98
+CHAR_NGRAM_RANGE = (2, 4)
+
+# Small-talk intents have too little signal to be answered safely outside Rasa
+EXCLUDED_INTENTS = {"greet", "goodbye", "affirm", "deny", "mood_great", "mood_unhappy", "bot_challenge"}
+# Intents that move the conversation (menus, language choice, prompts for a PAN/TAN/DOB) always go
+# to Rasa, even with a fixed reply: the tracker has to record the turn, e.g. ActionCheckTANStatus
+# finds the TAN flow by the utter_ask_tan_number it follows. Their `_hindi` variants are excluded too.
+DIALOGUE_INTENTS = {
+    "check_pan_status", "check_tan_status",
+    "select_pan_assistance", "select_tan_assistance", "select_general_assistance",
+    "select_callback_assistance", "select_feedback_assistance",
+    "select_language_english", "select_language_hindi",
+    "invalid_selection", "provide_dob", "provide_phone_number",
+}
+# Responses that ask the user for input start a flow and are never answered by the bridge
+PROMPT_RESPONSE_PREFIX = "utter_ask_"
+
+_ENTITY_ANNOTATION = re.compile(r"\[([^\]]+)\](?:\([^)]*\)|\{[^}]*\})")
+
+
+def _load_yaml(relative_path: str, base_dir: str) -> Dict[str, Any]:
+    with open(os.path.join(base_dir, relative_path), encoding="utf-8") as fh:
+        return yaml.safe_load(fh) or {}
+
+
+def load_nlu_examples(base_dir: str = RASA_BOT_DIR, files: Sequence[str] = NLU_FILES) -> Dict[str, List[str]]:
+    """Training examples per intent, with entity annotations reduced to their text."""
+    examples: Dict[str, List[str]] = defaultdict(list)
+    for relative_path in files:
+        for block in _load_yaml(relative_path, base_dir).get("nlu") or []:
+            intent = block.get("intent")
+            if not intent:
+                continue
+            for line in (block.get("examples") or "").splitlines():
+                line = line.strip()
+                if line.startswith("- "):
+                    text = _ENTITY_ANNOTATION.sub(r"\1", line[2:]).strip()
+                    if text:
+                        examples[intent].append(text)
+    return dict(examples)
+
+
+def load_faq_responses(base_dir: str = RASA_BOT_DIR) -> Dict[str, Dict[str, Any]]:
+    """
+    Informational intents that Rasa always answers with one fixed `utter_*` response, mapped to that response.
+    An intent qualifies only if every rule and story step following it is that same utterance, and it is
+    neither a dialogue intent (DIALOGUE_INTENTS) nor answered with a prompt for more input.
+    """
+    next_actions: Dict[str, set] = defaultdict(set)
+    for relative_path in DIALOGUE_FILES:
+        data = _load_yaml(relative_path, base_dir)
+        for flow in (data.get("rules") or []) + (data.get("stories") or []):
+            if flow.get("condition") or flow.get("conversation_start"):
+                continue
+            steps = flow.get("steps") or []
+            for i, step in enumerate(steps):
+                if "intent" not in step:
+                    continue
+                following = []
+                for nxt in steps[i + 1:]:
+                    if "action" not in nxt:
+                        break
+                    following.append(nxt["action"])
+                next_actions[step["intent"]].add(tuple(following))
+
+    responses = _load_yaml(DOMAIN_FILE, base_dir).get("responses") or {}
+    faq: Dict[str, Dict[str, Any]] = {}
+    for intent, sequences in next_actions.items():
+        base_intent = intent[:-len("_hindi")] if intent.endswith("_hindi") else intent
+        if intent in EXCLUDED_INTENTS or DIALOGUE_INTENTS & {intent, base_intent} or len(sequences) != 1:
+            continue
+        (sequence,) = sequences
+        if len(sequence) != 1 or not sequence[0].startswith("utter_") or sequence[0].startswith(PROMPT_RESPONSE_PREFIX):
+            continue
+        variants = responses.get(sequence[0]) or []
+        if variants:
+            faq[intent] = {k: v for k, v in variants[0].items() if k in ("text", "image", "buttons")}
+    return faq
+
+
+def _tokens(text: str) -> List[str]:
+    """Word unigrams plus char n-grams inside word boundaries (like CountVectorsFeaturizer char_wb)."""
+    lo, hi = CHAR_NGRAM_RANGE
+    features = []
+    for word in text.lower().split():
+        features.append("w:" + word)
+        padded = f" {word} "
+        for n in range(lo, hi + 1):
+            features.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+    return features
+
+
+class TfidfIndex:
+    """Sparse, L2-normalised TF-IDF matrix over a fixed set of documents."""
+
+    def __init__(self, documents: Sequence[str]):
+        counts = [Counter(_tokens(doc)) for doc in documents]
+        self.vocabulary: Dict[str, int] = {}
+        df: Counter = Counter()
+        for c in counts:
+            df.update(c.keys())
+            for feature in c:
+                self.vocabulary.setdefault(feature, len(self.vocabulary))
+        n_docs = len(documents)
+        self.idf = np.ones(len(self.vocabulary), dtype=np.float32)
+        for feature, idx in self.vocabulary.items():
+            self.idf[idx] = math.log((1 + n_docs) / (1 + df[feature])) + 1.0
+        self.matrix = self._to_matrix(counts)
+
+    def _to_matrix(self, counts: Sequence[Counter]) -> sparse.csr_matrix:
+        indptr, indices, data = [0], [], []
+        for c in counts:
+            row_indices, row_data = [], []
+            for feature, tf in c.items():
+                idx = self.vocabulary.get(feature)
+                if idx is not None:
+                    row_indices.append(idx)
+                    row_data.append((1.0 + math.log(tf)) * self.idf[idx])
+            norm = math.sqrt(sum(v * v for v in row_data)) or 1.0
+            indices.extend(row_indices)
+            data.extend(v / norm for v in row_data)
+            indptr.append(len(indices))
+        return sparse.csr_matrix(
+            (np.asarray(data, dtype=np.float32), np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int32)),
+            shape=(len(counts), len(self.vocabulary)),
+        )
+
+    def transform(self, texts: Sequence[str]) -> sparse.csr_matrix:
+        return self._to_matrix([Counter(_tokens(t)) for t in texts])
+
+
+class FAQEngine:
+    """
+    Retrieval over the NLU examples of fixed-answer FAQ intents.
+    Examples of every intent (FAQ or not) are indexed so that a message closer to a
+    non-FAQ intent is left to Rasa instead of being forced onto the nearest FAQ.
+    """
+
+    def __init__(self, examples: Dict[str, List[str]], responses: Dict[str, Dict[str, Any]]):
+        self.responses = responses
+        self.intents = [intent for intent, texts in examples.items() if texts]
+        documents: List[str] = []
+        offsets: List[int] = []
+        for intent in self.intents:
+            offsets.append(len(documents))
+            documents.extend(examples[intent])
+        self._offsets = np.asarray(offsets, dtype=np.int64)
+        self.index = TfidfIndex(documents)
+
+        # Intent centroids as a dense (features, intents) matrix: one sparse x dense product per batch
+        sizes = np.diff(np.append(self._offsets, len(documents)))
+        owner = np.repeat(np.arange(len(self.intents)), sizes)
+        averaging = sparse.csr_matrix(
+            (1.0 / sizes[owner], (owner, np.arange(len(documents)))), shape=(len(self.intents), len(documents))
+        )
+        centroids = averaging.dot(self.index.matrix).toarray().astype(np.float32)
+        centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+        self._centroids_t = np.ascontiguousarray(centroids.T)
+        self._examples_t = self.index.matrix.T.tocsr()
+
+    @classmethod
+    def from_rasa_project(cls, base_dir: str = RASA_BOT_DIR) -> "FAQEngine":
+        return cls(load_nlu_examples(base_dir), load_faq_responses(base_dir))
+
+    @staticmethod
+    def _top_two(scores: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Best column, its score and its lead over the second best, per row."""
+        if scores.shape[1] == 1:
+            return np.zeros(len(scores), dtype=np.int64), scores[:, 0], scores[:, 0]
+        top = np.argpartition(-scores, 1, axis=1)[:, :2]
+        rows = np.arange(len(scores))
+        first, second = scores[rows, top[:, 0]], scores[rows, top[:, 1]]
+        swap = second > first
+        best = np.where(swap, top[:, 1], top[:, 0])
+        return best, np.maximum(first, second), np.abs(first - second)
+
+    def rank(self, texts: Sequence[str]) -> List[Tuple[str, float, float]]:
+        """Best intent by centroid similarity, its score and its margin over the runner-up."""
+        if not texts:
+            return []
+        best, score, margin = self._top_two(np.asarray(self.index.transform(texts).dot(self._centroids_t)))
+        return [(self.intents[b], float(s), float(m)) for b, s, m in zip(best, score, margin)]
+
+    def match_batch(self, texts: Sequence[str]) -> List[Optional[Dict[str, Any]]]:
+        """Canned response for each confidently matched FAQ, else None (hand off to Rasa)."""
+        if not texts:
+            return []
+        queries = self.index.transform(texts)
+        c_best, c_score, c_margin = self._top_two(np.asarray(queries.dot(self._centroids_t)))
+        # Best single example per intent; examples are grouped by intent, so reduce over offsets
+        nearest = np.maximum.reduceat(queries.dot(self._examples_t).toarray(), self._offsets, axis=1)
+        n_best, n_score, n_margin = self._top_two(nearest)
+
+        results: List[Optional[Dict[str, Any]]] = []
+        for k in range(len(texts)):
+            if n_score[k] >= FAQ_DUPLICATE_SCORE and n_margin[k] > 0:
+                intent, score = self.intents[n_best[k]], n_score[k]
+            elif c_score[k] >= FAQ_MIN_SCORE and c_margin[k] >= FAQ_MIN_MARGIN:
+                intent, score = self.intents[c_best[k]], c_score[k]
+            else:
+                intent = None
+            if intent in self.responses:
+                results.append({"intent": intent, "score": float(score), "response": dict(self.responses[intent])})
+            else:
+                results.append(None)
+        return results
+
+    def match(self, text: str) -> Optional[Dict[str, Any]]:
+        return self.match_batch([text])[0]
+
+
+_engine: Optional[FAQEngine] = None
+# Set once building the engine failed; the fast path stays off instead of rebuilding on every message
+_engine_failed = False
+
+
+def get_engine() -> Optional[FAQEngine]:
+    global _engine, _engine_failed
+    if _engine is None and FAQ_ENABLED and not _engine_failed:
+        try:
+            _engine = FAQEngine.from_rasa_project()
+        except Exception:
+            _engine_failed = True
+            logger.exception("FAQ engine could not be built; all messages go to Rasa")
+    return _engine
+
+
+def localize_intent(intent: str, language: Optional[str], known: Dict[str, Any]) -> str:
+    """The `_hindi` variant of an intent for Hindi conversations (and the base intent for English), if known."""
+    if language == "hi" and not intent.endswith("_hindi") and f"{intent}_hindi" in known:
+        return f"{intent}_hindi"
+    if language == "en" and intent.endswith("_hindi") and intent[:-len("_hindi")] in known:
+        return intent[:-len("_hindi")]
+    return intent
+
+
+def answer_faq(text: Optional[str], language: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+    """
+    Replies for a high-confidence FAQ match in Rasa REST format, or None.
+    The answer follows the conversation language: a Hindi user typing in English gets the Hindi response.
+    """
+    engine = get_engine()
+    if engine is None or not text or not text.strip():
+        return None
+    try:
+        hit = engine.match(text.strip())
+    except Exception:
+        # A lookup error must not fail the turn; Rasa answers instead
+        logger.exception("FAQ lookup failed")
+        return None
+    if not hit:
+        return None
+    intent = localize_intent(hit["intent"], language, engine.responses)
+    # The matched intent travels in the reply metadata, like Rasa replies that carry one
+    return [dict(engine.responses[intent], metadata={"intent": intent})]
+
@@ -0,0 +1,51 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Tuple
+
+
+# Replies are replayed for repeats of the same key within this window
+IDEMPOTENCY_WINDOW_SECONDS = float(os.getenv("IDEMPOTENCY_WINDOW_SECONDS", "120"))
+MAX_TRACKED_KEYS = 50000
+
+# key -> (task computing the response, expiry; +inf while the task is still running)
+_entries: "OrderedDict[str, Tuple[asyncio.Task, float]]" = OrderedDict()
+
+
+def _prune(now: float) -> None:
+    while _entries:
+        key, (_, expires_at) = next(iter(_entries.items()))
+        if expires_at > now and len(_entries) <= MAX_TRACKED_KEYS:
+            break
+        del _entries[key]
+
+
+def _on_done(key: str, task: asyncio.Task) -> None:
+    entry = _entries.get(key)
+    if entry is None or entry[0] is not task:
+        return
+    if task.cancelled() or task.exception() is not None:
+        # Failures are not cached: a retry with the same key runs again
+        del _entries[key]
+    else:
+        _entries[key] = (task, time.monotonic() + IDEMPOTENCY_WINDOW_SECONDS)
+
+
+async def single_flight(key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Run `factory` at most once per key within the window.
+    Concurrent callers with the same key await the same run; later callers get its cached result.
+    The run is shielded, so a disconnecting first caller does not cancel it for the others.
+    """
+    now = time.monotonic()
+    _prune(now)
+    entry = _entries.get(key)
+    if entry is not None and entry[1] > now:
+        task = entry[0]
+    else:
+        task = asyncio.ensure_future(factory())
+        _entries[key] = (task, float("inf"))
+        task.add_done_callback(lambda t: _on_done(key, t))
+    _entries.move_to_end(key)
+    return await asyncio.shield(task)
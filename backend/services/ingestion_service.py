@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import exc, insert
+
+from backend.db.session import SessionLocal
+from backend.models.conversation import PhoneNumber
+from backend.models.history import Complaint, Feedback, Suggestion
+from backend.schemas.feedback import FeedbackBatchAck, FeedbackItem, FeedbackKind
+from backend.services import stats_service
+
+logger = logging.getLogger(__name__)
+
+# Queued submissions are written as one multi-row INSERT per table every INGEST_FLUSH_SECONDS
+INGEST_FLUSH_SECONDS = float(os.getenv("INGEST_FLUSH_SECONDS", "0.5"))
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "1000"))
+# Submissions beyond this are refused (503) instead of growing memory without bound
+INGEST_MAX_QUEUE = int(os.getenv("INGEST_MAX_QUEUE", "100000"))
+INGEST_MAX_RETRIES = 3
+# Client ids are remembered this long so retried submissions are not stored twice
+CLIENT_ID_WINDOW_SECONDS = 600
+MAX_TRACKED_CLIENT_IDS = 200000
+
+MODELS = {
+    FeedbackKind.COMPLAINT: Complaint,
+    FeedbackKind.FEEDBACK: Feedback,
+    FeedbackKind.SUGGESTION: Suggestion,
+}
+
+# (kind, client id, row values, tries)
+Entry = Tuple[FeedbackKind, str, Dict, int]
+_pending: Deque[Entry] = deque()
+_lock = threading.Lock()
+# (kind, client_id) -> time first seen
+_seen: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+
+ingestion_task: Optional["asyncio.Task[None]"] = None
+
+
+def pending_count() -> int:
+    return len(_pending)
+
+
+def _prune_seen(now: float) -> None:
+    while _seen:
+        key, seen_at = next(iter(_seen.items()))
+        if seen_at > now - CLIENT_ID_WINDOW_SECONDS and len(_seen) <= MAX_TRACKED_CLIENT_IDS:
+            break
+        del _seen[key]
+
+
+def enqueue(kind: FeedbackKind, items: List[FeedbackItem]) -> Optional[FeedbackBatchAck]:
+    """
+    Queue submissions for the next flush and acknowledge them by client id.
+    Returns None when the queue is full; nothing from the batch is queued in that case.
+    """
+    now = time.time()
+    created_at = datetime.utcnow()
+    accepted: List[str] = []
+    duplicates: List[str] = []
+    with _lock:
+        if len(_pending) + len(items) > INGEST_MAX_QUEUE:
+            return None
+        _prune_seen(now)
+        for item in items:
+            key = (kind.value, item.client_id)
+            if key in _seen:
+                duplicates.append(item.client_id)
+                continue
+            _seen[key] = now
+            row = {"message": item.message, "phone_number": item.phone_number or None, "created_at": created_at}
+            if kind == FeedbackKind.FEEDBACK:
+                row["rating"] = item.rating
+            _pending.append((kind, item.client_id, row, 0))
+            accepted.append(item.client_id)
+    return FeedbackBatchAck(accepted=accepted, duplicates=duplicates)
+
+
+def _take_batch() -> List[Entry]:
+    with _lock:
+        return [_pending.popleft() for _ in range(min(INGEST_BATCH_SIZE, len(_pending)))]
+
+
+def write_batch(batch: List[Entry]) -> None:
+    """One transaction: create missing phone rows, then one multi-row INSERT per table."""
+    db = SessionLocal()
+    try:
+        phones = {row["phone_number"] for _, _, row, _ in batch if row["phone_number"]}
+        if phones:
+            known = {p for (p,) in db.query(PhoneNumber.phone_number).filter(PhoneNumber.phone_number.in_(phones))}
+            missing = [{"phone_number": p, "created_at": datetime.utcnow()} for p in phones - known]
+            if missing:
+                db.execute(insert(PhoneNumber), missing)
+        for kind, model in MODELS.items():
+            rows = [row for k, _, row, _ in batch if k == kind]
+            if rows:
+                db.execute(insert(model), rows)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    for kind, _, row, _ in batch:
+        stats_service.record_submission(kind.value, row.get("rating"), at=row["created_at"])
+
+
+def write_isolating(batch: List[Entry]) -> List[Entry]:
+    """
+    Write a batch, bisecting it when a row is rejected so the other rows still go in.
+    Returns the rejected entries. Connection-level errors are raised: every row would fail alike.
+    """
+    try:
+        write_batch(batch)
+        return []
+    except exc.OperationalError:
+        raise
+    except Exception:
+        if len(batch) == 1:
+            kind, client_id, _, _ = batch[0]
+            logger.exception("Rejected %s submission %s", kind.value, client_id)
+            return batch
+    middle = len(batch) // 2
+    return write_isolating(batch[:middle]) + write_isolating(batch[middle:])
+
+
+def _requeue(entries: List[Entry]) -> None:
+    with _lock:
+        for kind, client_id, row, tries in reversed(entries):
+            if tries + 1 < INGEST_MAX_RETRIES:
+                _pending.appendleft((kind, client_id, row, tries + 1))
+            else:
+                logger.error("Dropping %s submission %s after %d attempts", kind.value, client_id, INGEST_MAX_RETRIES)
+                # Forget the client id so the client can submit it again
+                _seen.pop((kind.value, client_id), None)
+
+
+async def flush() -> None:
+    while True:
+        batch = _take_batch()
+        if not batch:
+            return
+        try:
+            failed = await asyncio.to_thread(write_isolating, batch)
+        except Exception:
+            logger.exception("Ingestion batch of %d failed", len(batch))
+            failed = batch
+        if failed:
+            _requeue(failed)
+            return
+
+
+async def run_ingestion_worker() -> None:
+    while True:
+        await asyncio.sleep(INGEST_FLUSH_SECONDS)
+        await flush()
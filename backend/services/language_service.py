@@ -0,0 +1,73 @@
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+
+DEFAULT_LANGUAGE = "en"
+MAX_TRACKED_SENDERS = 50000
+# Share of letters in Devanagari above which a message is treated as Hindi
+DEVANAGARI_THRESHOLD = 0.3
+
+# Explicit language choices from the language menu (see select_language_* in nlu.yml / nlu_hi.yml)
+LANGUAGE_SELECTIONS = {
+    "hi": {"hindi", "hindi language", "i want hindi", "hindi please", "in hindi", "hindi mein", "हिंदी", "हिंदी में", "हिंदी भाषा"},
+    "en": {"english", "english language", "i want english", "english please", "in english", "english mein", "angrezi", "अंग्रेजी"},
+}
+
+_sender_languages: "OrderedDict[str, str]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def detect_script_language(text: Optional[str]) -> Optional[str]:
+    """'hi' for mostly-Devanagari text, 'en' for Latin text, None when there are no letters (digits, IDs)."""
+    letters = [ch for ch in (text or "") if ch.isalpha()]
+    if not letters:
+        return None
+    devanagari = sum(1 for ch in letters if "ऀ" <= ch <= "ॿ")
+    return "hi" if devanagari / len(letters) >= DEVANAGARI_THRESHOLD else "en"
+
+
+def detect_language_selection(text: Optional[str]) -> Optional[str]:
+    normalized = " ".join((text or "").lower().split())
+    for language, phrases in LANGUAGE_SELECTIONS.items():
+        if normalized in phrases:
+            return language
+    return None
+
+
+def get_sender_language(sender_id: str) -> Optional[str]:
+    with _lock:
+        return _sender_languages.get(sender_id)
+
+
+def set_sender_language(sender_id: str, language: str) -> None:
+    with _lock:
+        _sender_languages[sender_id] = language
+        _sender_languages.move_to_end(sender_id)
+        while len(_sender_languages) > MAX_TRACKED_SENDERS:
+            _sender_languages.popitem(last=False)
+
+
+def resolve_language(sender_id: str, text: Optional[str], session_language: Optional[str] = None) -> str:
+    """
+    Language of this turn (FAQ answers, pre-routed intents and the Rasa model).
+    Priority: explicit language selection > Devanagari script > the sender's earlier
+    language > the session's cached language > script of this message > default.
+    Selections and Devanagari turns are remembered.
+    """
+    selected = detect_language_selection(text)
+    if selected:
+        set_sender_language(sender_id, selected)
+        return selected
+    script = detect_script_language(text)
+    if script == "hi":
+        set_sender_language(sender_id, "hi")
+        return "hi"
+    remembered = get_sender_language(sender_id)
+    if remembered:
+        return remembered
+    if session_language:
+        # A reconnecting client may come back with a new sender id but the same session
+        set_sender_language(sender_id, session_language)
+        return session_language
+    return script or DEFAULT_LANGUAGE
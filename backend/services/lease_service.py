@@ -0,0 +1,111 @@
+import abc
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from backend.core.config import settings
+
+
+# A session keeps its token only while its lease is renewed (chat turns and /chat/heartbeat).
+# chat.html sends a heartbeat every SESSION_HEARTBEAT_SECONDS while the tab is visible and in use.
+SESSION_LEASE_SECONDS = float(os.getenv("SESSION_LEASE_SECONDS", "60"))
+SESSION_HEARTBEAT_SECONDS = 20
+
+
+class LeaseStore(abc.ABC):
+    """Storage for session leases. Leases expire on their own; nothing has to sweep them."""
+
+    @abc.abstractmethod
+    def renew(self, session_id: str, ttl: float) -> None:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def is_alive(self, session_id: str) -> bool:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def revoke(self, session_id: str) -> None:
+        raise NotImplementedError
+
+
+class InMemoryLeaseStore(LeaseStore):
+    """Per-process leases; fine for a single worker."""
+
+    def __init__(self):
+        self._expires: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def renew(self, session_id: str, ttl: float) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._expires[session_id] = now + ttl
+            if len(self._expires) > 10000:
+                # Expired leases are dead either way; drop them so the dict tracks real concurrency
+                self._expires = {sid: exp for sid, exp in self._expires.items() if exp > now}
+
+    def is_alive(self, session_id: str) -> bool:
+        with self._lock:
+            return self._expires.get(session_id, 0.0) > time.monotonic()
+
+    def revoke(self, session_id: str) -> None:
+        with self._lock:
+            self._expires.pop(session_id, None)
+
+
+class RedisLeaseStore(LeaseStore):
+    """Leases shared by all workers as Redis keys with an expiry."""
+
+    def __init__(self, url: str, prefix: str = "lease:"):
+        import redis  # optional dependency, only needed for shared deployments
+
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+
+    def renew(self, session_id: str, ttl: float) -> None:
+        self._client.set(self.prefix + session_id, 1, px=int(ttl * 1000))
+
+    def is_alive(self, session_id: str) -> bool:
+        return bool(self._client.exists(self.prefix + session_id))
+
+    def revoke(self, session_id: str) -> None:
+        self._client.delete(self.prefix + session_id)
+
+
+_store: Optional[LeaseStore] = None
+
+
+def get_store() -> LeaseStore:
+    global _store
+    if _store is None:
+        url = settings.session_lease_backend_url
+        if url and url.startswith(("redis://", "rediss://")):
+            _store = RedisLeaseStore(url)
+        else:
+            _store = InMemoryLeaseStore()
+    return _store
+
+
+def set_store(store: LeaseStore) -> None:
+    global _store
+    _store = store
+
+
+def renew_lease(session_id: str) -> None:
+    get_store().renew(session_id, SESSION_LEASE_SECONDS)
+
+
+def has_lease(session_id: str) -> bool:
+    return get_store().is_alive(session_id)
+
+
+def leases_shared() -> bool:
+    """
+    Whether a missing lease means the session is gone: true with the Redis store or a single worker.
+    With per-process leases and several workers, the lease may simply live in another worker.
+    """
+    return isinstance(get_store(), RedisLeaseStore) or settings.web_concurrency <= 1
+
+
+def revoke_lease(session_id: str) -> None:
+    get_store().revoke(session_id)
@@ -1,136 +1,332 @@
-from datetime import datetime, timedelta
-from typing import Optional
+import abc
+import hmac
+import os
+import secrets
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional, Tuple
 from sqlalchemy.orm import Session
+from backend.core.config import settings
+from backend.core.security import keyed_hash
 from backend.models.otp import OTPVerification
-from backend.models.conversation import PhoneNumber
-from backend.schemas.otp import OTPGenerateRequest, OTPVerifyRequest, OTPResponse
+from backend.schemas.otp import OTPGenerateRequest, OTPVerifyRequest, OTPResponse, OTPStatusOut
 from backend.services.conversation_service import ensure_phone_number
+from backend.services.rate_limit_service import phone_key
+from backend.services.sms_service import get_outbox, send_sms
 
-# Static OTP for now as requested
-STATIC_OTP = "000000"
-OTP_EXPIRY_MINUTES = 5
+OTP_LENGTH = 6
+OTP_EXPIRY_MINUTES = float(os.getenv("OTP_EXPIRY_MINUTES", "5"))
+# How long a successful verification counts for is_phone_verified
+OTP_VERIFIED_TTL_MINUTES = float(os.getenv("OTP_VERIFIED_TTL_MINUTES", str(OTP_EXPIRY_MINUTES)))
 MAX_ATTEMPTS = 3
+LOCKED_MESSAGE = "Maximum verification attempts exceeded. Please request a new OTP after the current one expires."
+# Local development only: return the code in the /generate response when no SMS gateway is configured
+OTP_DEBUG_ECHO = os.getenv("OTP_DEBUG_ECHO", "0") in ("1", "true", "True")
 
-def generate_otp(db: Session, request: OTPGenerateRequest) -> OTPResponse:
+
+class OTPStore(abc.ABC):
     """
-    Generate OTP for phone number verification.
-    For now, uses static OTP '000000' as requested.
+    Storage for active OTP challenges and verification markers. Everything expires on its own;
+    only outcomes (verified / locked out) are written to otp_verifications.
+    A challenge is a dict with code_hash, issued_at, expires_at (epoch seconds) and attempts.
+    Phone numbers arrive normalized (phone_key), so every spelling of a number shares one challenge.
+    All workers must share one store, or codes issued by one worker fail verification on another.
     """
-    try:
-        # Ensure phone number exists
-        ensure_phone_number(db, request.phone_number)
-        
-        # Check if there's an existing unverified OTP
-        existing_otp = (
-            db.query(OTPVerification)
-            .filter(
-                OTPVerification.phone_number == request.phone_number,
-                OTPVerification.is_verified == False,
-                OTPVerification.expires_at > datetime.utcnow()
-            )
-            .first()
-        )
-        
-        if existing_otp:
-            return OTPResponse(
-                success=True,
-                message="OTP already sent. Please check your messages or wait for expiry.",
-                phone_number=request.phone_number,
-                expires_at=existing_otp.expires_at
+
+    @abc.abstractmethod
+    def put_challenge(self, phone: str, challenge: Dict, ttl: float) -> None:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_challenge(self, phone: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def add_attempt(self, phone: str) -> int:
+        """Count one verification attempt; returns the new count (0 when there is no challenge)."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def delete_challenge(self, phone: str) -> None:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def mark_verified(self, phone: str, verified_at: float, ttl: float) -> None:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def verified_at(self, phone: str) -> Optional[float]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def forget(self, phone: str) -> None:
+        """Drop the challenge and verification marker of a phone number (right to erasure)."""
+        raise NotImplementedError
+
+
+class InMemoryOTPStore(OTPStore):
+    """Per-process challenges; only valid with a single worker (get_store refuses more)."""
+
+    def __init__(self):
+        self._challenges: Dict[str, Tuple[float, Dict]] = {}
+        self._verified: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def _prune(self, now: float) -> None:
+        if len(self._challenges) > 10000:
+            self._challenges = {p: e for p, e in self._challenges.items() if e[0] > now}
+        if len(self._verified) > 10000:
+            self._verified = {p: e for p, e in self._verified.items() if e[0] > now}
+
+    def put_challenge(self, phone: str, challenge: Dict, ttl: float) -> None:
+        now = time.time()
+        with self._lock:
+            self._challenges[phone] = (now + ttl, dict(challenge))
+            self._prune(now)
+
+    def get_challenge(self, phone: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._challenges.get(phone)
+            if entry is None or entry[0] <= time.time():
+                return None
+            return dict(entry[1])
+
+    def add_attempt(self, phone: str) -> int:
+        with self._lock:
+            entry = self._challenges.get(phone)
+            if entry is None or entry[0] <= time.time():
+                return 0
+            entry[1]["attempts"] += 1
+            return entry[1]["attempts"]
+
+    def delete_challenge(self, phone: str) -> None:
+        with self._lock:
+            self._challenges.pop(phone, None)
+
+    def mark_verified(self, phone: str, verified_at: float, ttl: float) -> None:
+        now = time.time()
+        with self._lock:
+            self._verified[phone] = (now + ttl, verified_at)
+            self._prune(now)
+
+    def verified_at(self, phone: str) -> Optional[float]:
+        with self._lock:
+            entry = self._verified.get(phone)
+            if entry is None or entry[0] <= time.time():
+                return None
+            return entry[1]
+
+    def forget(self, phone: str) -> None:
+        with self._lock:
+            self._challenges.pop(phone, None)
+            self._verified.pop(phone, None)
+
+
+# Counts an attempt only while the challenge exists; a bare HINCRBY on an expired key would
+# recreate it as a hash without code_hash or TTL
+_REDIS_ADD_ATTEMPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+  return 0
+end
+return redis.call('HINCRBY', KEYS[1], 'attempts', 1)
+"""
+
+
+class RedisOTPStore(OTPStore):
+    """Challenges shared by all workers as Redis hashes with an expiry."""
+
+    def __init__(self, url: str, prefix: str = "otp:"):
+        import redis  # optional dependency, only needed for shared deployments
+
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+        self._add_attempt = self._client.register_script(_REDIS_ADD_ATTEMPT)
+
+    def put_challenge(self, phone: str, challenge: Dict, ttl: float) -> None:
+        key = self.prefix + "challenge:" + phone
+        pipe = self._client.pipeline()
+        pipe.delete(key)
+        pipe.hset(key, mapping=challenge)
+        pipe.pexpire(key, int(ttl * 1000))
+        pipe.execute()
+
+    def get_challenge(self, phone: str) -> Optional[Dict]:
+        raw = self._client.hgetall(self.prefix + "challenge:" + phone)
+        if not raw:
+            return None
+        raw = {k.decode(): v.decode() for k, v in raw.items()}
+        return {
+            "code_hash": raw["code_hash"],
+            "issued_at": float(raw["issued_at"]),
+            "expires_at": float(raw["expires_at"]),
+            "attempts": int(raw["attempts"]),
+        }
+
+    def add_attempt(self, phone: str) -> int:
+        # One script call is atomic, so concurrent guesses across workers are all counted
+        return int(self._add_attempt(keys=[self.prefix + "challenge:" + phone]))
+
+    def delete_challenge(self, phone: str) -> None:
+        self._client.delete(self.prefix + "challenge:" + phone)
+
+    def mark_verified(self, phone: str, verified_at: float, ttl: float) -> None:
+        self._client.set(self.prefix + "verified:" + phone, verified_at, px=int(ttl * 1000))
+
+    def verified_at(self, phone: str) -> Optional[float]:
+        value = self._client.get(self.prefix + "verified:" + phone)
+        return float(value) if value is not None else None
+
+    def forget(self, phone: str) -> None:
+        self._client.delete(self.prefix + "challenge:" + phone, self.prefix + "verified:" + phone)
+
+
+_store: Optional[OTPStore] = None
+
+
+def get_store() -> OTPStore:
+    global _store
+    if _store is None:
+        url = settings.otp_backend_url
+        if url and url.startswith(("redis://", "rediss://")):
+            _store = RedisOTPStore(url)
+        elif settings.web_concurrency > 1:
+            # Each worker would hold its own challenges and attempt counters
+            raise RuntimeError(
+                f"WEB_CONCURRENCY={settings.web_concurrency} needs a shared OTP store: "
+                "set OTP_BACKEND_URL (or RATE_LIMIT_BACKEND_URL) to a redis:// URL"
             )
-        
-        # Create new OTP verification record
-        expires_at = datetime.utcnow() + timedelta(minutes=OTP_EXPIRY_MINUTES)
-        
-        otp_record = OTPVerification(
+        else:
+            _store = InMemoryOTPStore()
+    return _store
+
+
+def set_store(store: OTPStore) -> None:
+    global _store
+    _store = store
+
+
+def forget_phone(phone_number: str) -> None:
+    """Remove everything the OTP store holds for a phone number."""
+    get_store().forget(phone_key(phone_number))
+
+
+def _hash_code(phone: str, code: str) -> str:
+    # Codes are never stored in clear, not even in the challenge store; keyed, because a
+    # plain hash of a 6-digit code is reversed by trying all 10^6 codes
+    return keyed_hash(f"{phone}:{code}")
+
+
+def _record_outcome(db: Session, phone_number: str, challenge: Dict, attempts: int, verified_at: Optional[float]) -> None:
+    """Persist a finished challenge (verified or locked out); the code itself is not kept."""
+    ensure_phone_number(db, phone_number)
+    db.add(OTPVerification(
+        phone_number=phone_number,
+        otp_code="",
+        is_verified=verified_at is not None,
+        attempts=attempts,
+        created_at=datetime.utcfromtimestamp(challenge["issued_at"]),
+        expires_at=datetime.utcfromtimestamp(challenge["expires_at"]),
+        verified_at=datetime.utcfromtimestamp(verified_at) if verified_at is not None else None,
+    ))
+    db.commit()
+
+
+def generate_otp(db: Session, request: OTPGenerateRequest) -> OTPResponse:
+    """
+    Create a random OTP challenge and queue the SMS. Nothing is written to the database.
+    """
+    store = get_store()
+    phone = phone_key(request.phone_number)
+    existing = store.get_challenge(phone)
+    if existing and existing["attempts"] >= MAX_ATTEMPTS:
+        # A locked-out challenge blocks new codes until it expires, otherwise guessing could just continue
+        return OTPResponse(
+            success=False,
+            message=LOCKED_MESSAGE,
             phone_number=request.phone_number,
-            otp_code=STATIC_OTP,
-            expires_at=expires_at
+            expires_at=datetime.utcfromtimestamp(existing["expires_at"])
         )
-        
-        db.add(otp_record)
-        db.commit()
-        db.refresh(otp_record)
-        
+    if existing:
         return OTPResponse(
             success=True,
-            message=f"OTP sent successfully. Please enter the 6-digit code. (For testing: {STATIC_OTP})",
+            message="OTP already sent. Please check your messages or wait for expiry.",
             phone_number=request.phone_number,
-            expires_at=expires_at
-        )
-        
-    except Exception as e:
-        db.rollback()
-        return OTPResponse(
-            success=False,
-            message=f"Failed to generate OTP: {str(e)}"
+            expires_at=datetime.utcfromtimestamp(existing["expires_at"])
         )
 
+    code = f"{secrets.randbelow(10 ** OTP_LENGTH):0{OTP_LENGTH}d}"
+    now = time.time()
+    ttl = OTP_EXPIRY_MINUTES * 60
+    store.put_challenge(phone, {
+        "code_hash": _hash_code(phone, code),
+        "issued_at": now,
+        "expires_at": now + ttl,
+        "attempts": 0,
+    }, ttl)
+    send_sms(request.phone_number, f"Your verification code is {code}. It expires in {OTP_EXPIRY_MINUTES:g} minutes.")
+
+    message = f"OTP sent successfully. Please enter the {OTP_LENGTH}-digit code."
+    if OTP_DEBUG_ECHO and get_outbox().gateway.is_stub:
+        # Explicit opt-in and no SMS gateway configured: hand the code back for testing
+        message += f" (For testing: {code})"
+    return OTPResponse(
+        success=True,
+        message=message,
+        phone_number=request.phone_number,
+        expires_at=datetime.utcfromtimestamp(now + ttl)
+    )
+
+
 def verify_otp(db: Session, request: OTPVerifyRequest) -> OTPResponse:
     """
-    Verify OTP for phone number.
+    Verify OTP for phone number against the active challenge.
     """
-    try:
-        # Find the most recent unverified OTP for this phone number
-        otp_record = (
-            db.query(OTPVerification)
-            .filter(
-                OTPVerification.phone_number == request.phone_number,
-                OTPVerification.is_verified == False
-            )
-            .order_by(OTPVerification.created_at.desc())
-            .first()
+    store = get_store()
+    phone = phone_key(request.phone_number)
+    challenge = store.get_challenge(phone)
+    if not challenge:
+        return OTPResponse(
+            success=False,
+            message="No OTP found for this phone number. Please request a new OTP."
         )
-        
-        if not otp_record:
-            return OTPResponse(
-                success=False,
-                message="No OTP found for this phone number. Please request a new OTP."
-            )
-        
-        # Check if OTP has expired
-        if datetime.utcnow() > otp_record.expires_at:
-            return OTPResponse(
-                success=False,
-                message="OTP has expired. Please request a new OTP."
-            )
-        
-        # Check if max attempts exceeded
-        if otp_record.attempts >= MAX_ATTEMPTS:
-            return OTPResponse(
-                success=False,
-                message="Maximum verification attempts exceeded. Please request a new OTP."
-            )
-        
-        # Increment attempts
-        otp_record.attempts += 1
-        
-        # Verify OTP
-        if otp_record.otp_code == request.otp_code:
-            otp_record.is_verified = True
-            otp_record.verified_at = datetime.utcnow()
-            db.commit()
-            
+
+    attempts = store.add_attempt(phone)
+    if attempts == 0:
+        # Expired between the two reads
+        return OTPResponse(
+            success=False,
+            message="OTP has expired. Please request a new OTP."
+        )
+    if attempts > MAX_ATTEMPTS:
+        return OTPResponse(
+            success=False,
+            message=LOCKED_MESSAGE
+        )
+
+    try:
+        if hmac.compare_digest(challenge["code_hash"], _hash_code(phone, request.otp_code)):
+            verified_at = time.time()
+            store.delete_challenge(phone)
+            store.mark_verified(phone, verified_at, OTP_VERIFIED_TTL_MINUTES * 60)
+            _record_outcome(db, request.phone_number, challenge, attempts, verified_at)
             return OTPResponse(
                 success=True,
                 message="OTP verified successfully! You can now access your chat history.",
                 phone_number=request.phone_number
             )
-        else:
-            db.commit()
-            remaining_attempts = MAX_ATTEMPTS - otp_record.attempts
-            
-            if remaining_attempts > 0:
-                return OTPResponse(
-                    success=False,
-                    message=f"Invalid OTP. {remaining_attempts} attempts remaining."
-                )
-            else:
-                return OTPResponse(
-                    success=False,
-                    message="Maximum verification attempts exceeded. Please request a new OTP."
-                )
-                
+
+        remaining_attempts = MAX_ATTEMPTS - attempts
+        if remaining_attempts > 0:
+            return OTPResponse(
+                success=False,
+                message=f"Invalid OTP. {remaining_attempts} attempts remaining."
+            )
+        _record_outcome(db, request.phone_number, challenge, attempts, None)
+        return OTPResponse(
+            success=False,
+            message=LOCKED_MESSAGE
+        )
     except Exception as e:
         db.rollback()
         return OTPResponse(
@@ -138,30 +334,42 @@ def verify_otp(db: Session, request: OTPVerifyRequest) -> OTPResponse:
             message=f"Failed to verify OTP: {str(e)}"
         )
 
-def get_otp_status(db: Session, phone_number: str) -> Optional[OTPVerification]:
+
+def get_otp_status(phone_number: str) -> Optional[OTPStatusOut]:
     """
-    Get the current OTP verification status for a phone number.
+    Current OTP state for a phone number, from the challenge store (no database access).
     """
-    return (
-        db.query(OTPVerification)
-        .filter(OTPVerification.phone_number == phone_number)
-        .order_by(OTPVerification.created_at.desc())
-        .first()
-    )
+    store = get_store()
+    phone = phone_key(phone_number)
+    verified_at = store.verified_at(phone)
+    challenge = store.get_challenge(phone)
+    if challenge:
+        return OTPStatusOut(
+            phone_number=phone_number,
+            status="locked" if challenge["attempts"] >= MAX_ATTEMPTS else "pending",
+            attempts=challenge["attempts"],
+            expires_at=datetime.utcfromtimestamp(challenge["expires_at"]),
+            verified_at=datetime.utcfromtimestamp(verified_at) if verified_at is not None else None,
+        )
+    if verified_at is not None:
+        return OTPStatusOut(
+            phone_number=phone_number,
+            status="verified",
+            attempts=0,
+            verified_at=datetime.utcfromtimestamp(verified_at),
+        )
+    return None
 
-def is_phone_verified(db: Session, phone_number: str) -> bool:
+
+def is_phone_verified(phone_number: str) -> bool:
     """
-    Check if the MOST RECENT OTP for this phone number is verified and not expired.
-    This enforces OTP per-session: older verifications are ignored.
+    Check if the MOST RECENT OTP for this phone number was verified within OTP_VERIFIED_TTL_MINUTES.
+    This enforces OTP per-session: a newer pending challenge supersedes an older verification.
     """
-    latest = (
-        db.query(OTPVerification)
-        .filter(OTPVerification.phone_number == phone_number)
-        .order_by(OTPVerification.created_at.desc())
-        .first()
-    )
-    if latest is None:
-        return False
-    if latest.expires_at and datetime.utcnow() > latest.expires_at:
+    store = get_store()
+    phone = phone_key(phone_number)
+    verified_at = store.verified_at(phone)
+    if verified_at is None:
         return False
-    return bool(latest.is_verified)
+    challenge = store.get_challenge(phone)
+    return challenge is None or challenge["issued_at"] < verified_at
@@ -0,0 +1,146 @@
+# Deterministic pre-routing for structured chat input.
+# PANs, TANs, dates of birth and menu digits do not need DIET to be classified (bare phone
+# numbers never get here: /chat acknowledges them first). Each route recognises one of these
+# shapes and either answers the turn itself or turns it into a Rasa intent trigger
+# (`/intent{"entity": "value"}`), which the Rasa REST channel handles without running the NLU pipeline.
+import json
+import os
+import re
+from typing import Any, Callable, Dict, List, Optional
+
+from backend.services.status_service import get_pan_status, get_tan_status
+
+
+PRE_ROUTER_ENABLED = os.getenv("PRE_ROUTER_ENABLED", "1") not in ("0", "false", "False")
+# Answer PAN/TAN status in the bridge instead of injecting provide_*_number into Rasa.
+# Off by default: Rasa's rules also use the tracker (e.g. a TAN typed while the PAN flow
+# is active, or the DOB prompt that follows a PAN), which the bridge cannot see.
+PRE_ROUTER_ANSWER_STATUS = os.getenv("PRE_ROUTER_ANSWER_STATUS", "0") in ("1", "true", "True")
+
+# Patterns mirror rasa_bot/data/regex.yml, anchored to the whole message
+PAN_RE = re.compile(r"[A-Za-z]{5}\d{4}[A-Za-z]")
+TAN_RE = re.compile(r"[A-Za-z]{4}\d{5}[A-Za-z]")
+DOB_RES = (
+    re.compile(r"\d{4}-\d{2}-\d{2}"),
+    re.compile(r"\d{2}-\d{2}-\d{4}"),
+    re.compile(r"\d{2}/\d{2}/\d{4}"),
+)
+
+# Main menu options as trained in nlu.yml (ASCII digits) and nlu_hi.yml (Devanagari digits)
+MENU_INTENTS = {
+    "1": "select_pan_assistance",
+    "2": "select_tan_assistance",
+    "3": "select_general_assistance",
+    "4": "select_callback_assistance",
+    "5": "select_feedback_assistance",
+}
+MENU_INTENTS_HINDI = {
+    "१": "select_pan_assistance_hindi",
+    "२": "select_tan_assistance_hindi",
+    "३": "select_general_assistance_hindi",
+    "४": "select_callback_assistance_hindi",
+    "५": "select_feedback_assistance_hindi",
+}
+
+# Pre-routed intents that have a `<intent>_hindi` counterpart in domain.yml
+HINDI_VARIANTS = {
+    "provide_pan_number", "provide_tan_number", "provide_dob", "invalid_selection",
+    *MENU_INTENTS.values(),
+}
+
+
+class PreRouteResult:
+    """
+    Outcome of a pre-route.
+    - `replies`: answer the user directly; Rasa is not called
+    - otherwise `intent`/`entities` are sent to Rasa as an intent trigger
+    """
+
+    def __init__(
+        self,
+        route: str,
+        intent: Optional[str] = None,
+        entities: Optional[Dict[str, str]] = None,
+        replies: Optional[List[Dict[str, Any]]] = None,
+    ):
+        self.route = route
+        self.intent = intent
+        self.entities = entities or {}
+        self.replies = replies
+
+    def rasa_message(self) -> str:
+        """Intent trigger understood by Rasa's RegexMessageHandler."""
+        if not self.entities:
+            return f"/{self.intent}"
+        return f"/{self.intent}{json.dumps(self.entities, ensure_ascii=False)}"
+
+
+PreRoute = Callable[[str], Optional[PreRouteResult]]
+_routes: List[PreRoute] = []
+
+
+def register_route(route: PreRoute) -> PreRoute:
+    """Add a route; routes are tried in registration order and the first match wins."""
+    _routes.append(route)
+    return route
+
+
+def pre_route(text: Optional[str], language: Optional[str] = None) -> Optional[PreRouteResult]:
+    """
+    Classify a user message locally. Returns None when Rasa NLU should handle it.
+    For Hindi conversations (`language="hi"`) intents with a `_hindi` variant are sent as that variant,
+    so a PAN or an ASCII menu digit typed by a Hindi user gets the Hindi flow.
+    """
+    if not PRE_ROUTER_ENABLED or not text:
+        return None
+    stripped = text.strip()
+    if not stripped or stripped.startswith("/"):
+        return None
+    for route in _routes:
+        result = route(stripped)
+        if result is not None:
+            if language == "hi" and result.intent in HINDI_VARIANTS:
+                result.intent = f"{result.intent}_hindi"
+            return result
+    return None
+
+
+@register_route
+def route_pan_number(text: str) -> Optional[PreRouteResult]:
+    if not PAN_RE.fullmatch(text):
+        return None
+    pan = text.upper()
+    if PRE_ROUTER_ANSWER_STATUS:
+        return PreRouteResult("pan", replies=[{"text": get_pan_status(pan)["message"]}])
+    return PreRouteResult("pan", intent="provide_pan_number", entities={"pan_number": pan})
+
+
+@register_route
+def route_tan_number(text: str) -> Optional[PreRouteResult]:
+    if not TAN_RE.fullmatch(text):
+        return None
+    tan = text.upper()
+    if PRE_ROUTER_ANSWER_STATUS:
+        return PreRouteResult("tan", replies=[{"text": get_tan_status(tan)["message"]}])
+    return PreRouteResult("tan", intent="provide_tan_number", entities={"tan_number": tan})
+
+
+@register_route
+def route_dob(text: str) -> Optional[PreRouteResult]:
+    if not any(pattern.fullmatch(text) for pattern in DOB_RES):
+        return None
+    return PreRouteResult("dob", intent="provide_dob", entities={"dob": text})
+
+
+@register_route
+def route_menu_digit(text: str) -> Optional[PreRouteResult]:
+    if len(text) != 1:
+        return None
+    if text in MENU_INTENTS:
+        return PreRouteResult("menu", intent=MENU_INTENTS[text])
+    if text in MENU_INTENTS_HINDI:
+        return PreRouteResult("menu", intent=MENU_INTENTS_HINDI[text])
+    if text.isdigit():
+        hindi = not text.isascii()
+        return PreRouteResult("menu", intent="invalid_selection_hindi" if hindi else "invalid_selection")
+    return None
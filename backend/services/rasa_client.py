@@ -0,0 +1,184 @@
+import asyncio
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+
+RASA_REST_URL = os.getenv(
+    "RASA_REST_URL", "http://127.0.0.1:5005/webhooks/rest/webhook"
+)
+# Language-specific Rasa servers (see rasa_bot/config_en.yml and config_hi.yml).
+# Both default to RASA_REST_URL, i.e. one combined model.
+RASA_REST_URLS = {
+    "en": os.getenv("RASA_REST_URL_EN", RASA_REST_URL),
+    "hi": os.getenv("RASA_REST_URL_HI", RASA_REST_URL),
+}
+RASA_TIMEOUT_SECONDS = 30
+
+# Adaptive concurrency (AIMD) tuning for outbound Rasa calls
+RASA_TARGET_LATENCY_SECONDS = float(os.getenv("RASA_TARGET_LATENCY_SECONDS", "1.5"))
+RASA_MIN_CONCURRENCY = 2
+RASA_MAX_CONCURRENCY = int(os.getenv("RASA_MAX_CONCURRENCY", "64"))
+RASA_INITIAL_CONCURRENCY = 8
+RASA_BACKOFF_FACTOR = 0.75  # multiplicative decrease on slow or failed calls
+RASA_MAX_QUEUE = int(os.getenv("RASA_MAX_QUEUE", "100"))
+RASA_QUEUE_TIMEOUT_SECONDS = 5.0
+
+
+class RasaOverloaded(Exception):
+    """Raised when the wait queue for Rasa is full or a queued request waited too long."""
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD concurrency limit around a downstream service.
+    - Calls faster than the target latency grow the limit by ~1 per limit's worth of calls
+    - Slow calls, timeouts and errors shrink it multiplicatively, at most once per round trip: calls that
+      were already in flight when the limit last shrank do not shrink it again
+    - Callers beyond the limit wait in a bounded queue; when it is full they are rejected at once
+    """
+
+    def __init__(
+        self,
+        target_latency: float = RASA_TARGET_LATENCY_SECONDS,
+        min_limit: int = RASA_MIN_CONCURRENCY,
+        max_limit: int = RASA_MAX_CONCURRENCY,
+        initial_limit: int = RASA_INITIAL_CONCURRENCY,
+        backoff: float = RASA_BACKOFF_FACTOR,
+        max_queue: int = RASA_MAX_QUEUE,
+        queue_timeout: float = RASA_QUEUE_TIMEOUT_SECONDS,
+    ):
+        self.target_latency = target_latency
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(initial_limit)
+        self.backoff = backoff
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.waiting = 0
+        self._last_decrease = float("-inf")
+        self._cond: Optional[asyncio.Condition] = None
+
+    def _condition(self) -> asyncio.Condition:
+        # Created lazily so the condition binds to the running event loop
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        return self._cond
+
+    async def acquire(self) -> None:
+        cond = self._condition()
+        async with cond:
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return
+            if self.waiting >= self.max_queue:
+                raise RasaOverloaded("Rasa wait queue is full")
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(
+                    cond.wait_for(lambda: self.in_flight < int(self.limit)),
+                    timeout=self.queue_timeout,
+                )
+            except asyncio.TimeoutError:
+                raise RasaOverloaded("Timed out waiting for a Rasa slot")
+            finally:
+                self.waiting -= 1
+            self.in_flight += 1
+
+    async def release(self, latency: Optional[float], ok: bool) -> None:
+        cond = self._condition()
+        async with cond:
+            self.in_flight -= 1
+            if not ok or latency is None or latency > self.target_latency:
+                now = time.monotonic()
+                started = now - (latency if latency is not None else self.target_latency)
+                # One overload episode fails every call in flight; back off once for all of them
+                if started >= self._last_decrease:
+                    self.limit = max(float(self.min_limit), self.limit * self.backoff)
+                    self._last_decrease = now
+            elif self.in_flight + 1 >= int(self.limit):
+                # Only grow when the current limit is actually being used
+                self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+            cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_queue": self.max_queue,
+        }
+
+
+# One limiter per Rasa server so a slow model does not throttle the other language
+_limiters: Dict[str, AdaptiveConcurrencyLimiter] = {}
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Shared pooled client so Rasa calls reuse keep-alive connections."""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=RASA_TIMEOUT_SECONDS,
+            limits=httpx.Limits(max_connections=RASA_MAX_CONCURRENCY, max_keepalive_connections=RASA_MAX_CONCURRENCY),
+        )
+    return _client
+
+
+async def close_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_limiter(url: str) -> AdaptiveConcurrencyLimiter:
+    limiter = _limiters.get(url)
+    if limiter is None:
+        limiter = _limiters[url] = AdaptiveConcurrencyLimiter()
+    return limiter
+
+
+def url_for_language(language: Optional[str]) -> str:
+    return RASA_REST_URLS.get(language or "", RASA_REST_URL)
+
+
+def lift_intent(replies: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Custom actions report the classified intent as a `{"custom": {"intent": ...}}` message (the REST
+    channel returns no intent otherwise). Move it into the `metadata` of the first visible reply.
+    """
+    intent = None
+    visible = []
+    for reply in replies:
+        custom = reply.get("custom") if isinstance(reply, dict) else None
+        if isinstance(custom, dict) and set(custom) == {"intent"}:
+            intent = intent or custom["intent"]
+        else:
+            visible.append(reply)
+    if intent and visible:
+        visible[0] = dict(visible[0], metadata=dict(visible[0].get("metadata") or {}, intent=intent))
+    return visible
+
+
+async def send_message(sender: str, message: str, url: str = RASA_REST_URL) -> List[Dict[str, Any]]:
+    """
+    Post a user message to the Rasa REST channel through the adaptive limiter.
+    Raises RasaOverloaded when no slot is available and httpx.HTTPError on transport/HTTP errors.
+    """
+    limiter = get_limiter(url)
+    await limiter.acquire()
+    started = time.monotonic()
+    ok = False
+    try:
+        r = await get_client().post(url, json={"sender": sender, "message": message})
+        r.raise_for_status()
+        replies = r.json()
+        ok = True
+        return lift_intent(replies)
+    finally:
+        await limiter.release(time.monotonic() - started, ok)
@@ -0,0 +1,165 @@
+import abc
+import math
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from backend.core.config import settings
+
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") not in ("0", "false", "False")
+MAX_TRACKED_KEYS = 50000  # in-memory buckets kept before idle ones are pruned
+IDLE_BUCKET_SECONDS = 600  # longer than any bucket below needs to refill
+
+# (requests per minute, burst) for every scope and key kind.
+# A request is rejected as soon as any one of its buckets is empty.
+RATE_LIMITS: Dict[str, Dict[str, Tuple[float, int]]] = {
+    "chat": {"sender": (30, 10), "phone": (30, 10), "ip": (120, 40)},
+    "otp_generate": {"phone": (3, 3), "ip": (20, 10)},
+    "otp_verify": {"phone": (10, 5), "ip": (60, 20)},
+}
+
+
+class RateLimitExceeded(Exception):
+    def __init__(self, scope: str, retry_after: float):
+        super().__init__(f"Rate limit exceeded for {scope}")
+        self.scope = scope
+        self.retry_after = retry_after
+
+
+class RateLimitBackend(abc.ABC):
+    """Storage for token buckets. Implementations must make `take` atomic per key."""
+
+    @abc.abstractmethod
+    def take(self, key: str, rate: float, burst: int, cost: float = 1.0) -> Tuple[bool, float]:
+        """Consume `cost` tokens. Returns (allowed, seconds until enough tokens refill)."""
+        raise NotImplementedError
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """Per-process buckets; fine for a single worker."""
+
+    def __init__(self, max_keys: int = MAX_TRACKED_KEYS):
+        self.max_keys = max_keys
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, burst: int, cost: float = 1.0) -> Tuple[bool, float]:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (float(burst), now))
+            tokens = min(float(burst), tokens + (now - updated) * rate)
+            if tokens >= cost:
+                self._buckets[key] = (tokens - cost, now)
+                allowed, retry_after = True, 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                allowed, retry_after = False, (cost - tokens) / rate
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+        return allowed, retry_after
+
+    def _prune(self, now: float) -> None:
+        # A bucket idle long enough to have refilled carries no state worth keeping
+        stale = [k for k, (_, updated) in self._buckets.items() if now - updated > IDLE_BUCKET_SECONDS]
+        for k in stale:
+            del self._buckets[k]
+
+
+_REDIS_TOKEN_BUCKET = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local data = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(data[1]) or burst
+local ts = tonumber(data[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry = 0
+if tokens >= cost then
+  tokens = tokens - cost
+  allowed = 1
+else
+  retry = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return {allowed, tostring(retry)}
+"""
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """Buckets shared by all workers, evaluated atomically with a Lua script."""
+
+    def __init__(self, url: str, prefix: str = "ratelimit:"):
+        import redis  # optional dependency, only needed for shared deployments
+
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+        self._script = self._client.register_script(_REDIS_TOKEN_BUCKET)
+
+    def take(self, key: str, rate: float, burst: int, cost: float = 1.0) -> Tuple[bool, float]:
+        allowed, retry = self._script(keys=[self.prefix + key], args=[rate, burst, time.time(), cost])
+        return bool(int(allowed)), float(retry)
+
+
+_backend: Optional[RateLimitBackend] = None
+
+
+def get_backend() -> RateLimitBackend:
+    global _backend
+    if _backend is None:
+        url = settings.rate_limit_backend_url
+        if url and url.startswith(("redis://", "rediss://")):
+            _backend = RedisRateLimitBackend(url)
+        else:
+            _backend = InMemoryRateLimitBackend()
+    return _backend
+
+
+def set_backend(backend: RateLimitBackend) -> None:
+    global _backend
+    _backend = backend
+
+
+def phone_key(value: Optional[str]) -> str:
+    """
+    Bucket key for a phone number: its last 10 digits, so "+91 98765-43210", "09876543210" and
+    "9876543210" share one bucket instead of each getting a fresh allowance.
+    """
+    digits = "".join(ch for ch in (value or "") if ch.isdigit())
+    return digits[-10:] if digits else (value or "").strip()
+
+
+def check_rate_limit(scope: str, **keys: Optional[str]) -> Optional[float]:
+    """
+    Take one token from every bucket of `scope` whose key is provided.
+    Returns None when allowed, otherwise the number of seconds to wait.
+    """
+    if not RATE_LIMIT_ENABLED:
+        return None
+    limits = RATE_LIMITS.get(scope, {})
+    backend = get_backend()
+    retry_after = 0.0
+    for kind, value in keys.items():
+        value = phone_key(value) if kind == "phone" else (value or "").strip()
+        if not value or kind not in limits:
+            continue
+        per_minute, burst = limits[kind]
+        try:
+            allowed, wait = backend.take(f"{scope}:{kind}:{value}", per_minute / 60.0, burst)
+        except Exception:
+            # A broken shared backend must not take the chat down with it
+            continue
+        if not allowed:
+            retry_after = max(retry_after, wait)
+    return retry_after or None
+
+
+def enforce_rate_limit(scope: str, **keys: Optional[str]) -> None:
+    """Raise RateLimitExceeded (rendered as HTTP 429 with Retry-After) when over the limit."""
+    retry_after = check_rate_limit(scope, **keys)
+    if retry_after is not None:
+        raise RateLimitExceeded(scope, math.ceil(retry_after))
@@ -0,0 +1,228 @@
+import base64
+import html
+import re
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import func, literal_column, tuple_
+from sqlalchemy.orm import Session
+
+from backend.models.conversation import ConversationMessage
+from backend.models.erasure import ErasureJob
+from backend.schemas.conversation import ConversationSearchHit
+
+# Letters/digits plus Devanagari (vowel signs are not \w, so Hindi words would otherwise be split)
+TOKEN_RE = re.compile(r"[\wऀ-ॿ]+")
+QUERY_RE = re.compile(r'"([^"]+)"|(\S+)')
+# ts_headline marks matches with sentinels (stripped from the input first); the result is then
+# HTML-escaped and the sentinels become <mark> tags, so message text can never inject markup
+MARK_START, MARK_END = "⟦", "⟧"
+HEADLINE_OPTIONS = f"StartSel={MARK_START}, StopSel={MARK_END}, MaxWords=35, MinWords=15, MaxFragments=2"
+SNIPPET_CHARS = 160
+CANDIDATE_CHUNK = 500
+
+
+def tokenize(text: str) -> List[str]:
+    return [token.lower() for token in TOKEN_RE.findall(text or "")]
+
+
+def parse_query(q: str) -> Tuple[List[str], List[List[str]]]:
+    """Split a query into single terms and "quoted phrases" (as token lists)."""
+    terms: List[str] = []
+    phrases: List[List[str]] = []
+    for phrase, word in QUERY_RE.findall(q or ""):
+        if phrase:
+            tokens = tokenize(phrase)
+            if len(tokens) > 1:
+                phrases.append(tokens)
+            else:
+                terms.extend(tokens)
+        else:
+            terms.extend(tokenize(word))
+    return terms, phrases
+
+
+def encode_search_cursor(hit: ConversationSearchHit) -> str:
+    """Opaque cursor pointing just after `hit` in (created_at, id) descending order."""
+    raw = f"{hit.created_at.isoformat()}|{hit.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_search_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, hit_id = raw.split("|")
+        return datetime.fromisoformat(created_at), int(hit_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid search cursor")
+
+
+def index_message(db: Session, phone_number: str, role: str, message: str, session_id: Optional[str] = None) -> None:
+    """Add a message to the search table; committed with the caller's transaction."""
+    if message and message.strip():
+        db.add(ConversationMessage(phone_number=phone_number, session_id=session_id, role=role, message=message))
+
+
+class InvertedIndex:
+    """
+    In-process token -> message id postings, for databases without full-text search (SQLite).
+    Rows written by any process are picked up incrementally (ids above the last one seen) at query time;
+    deleted rows drop out because every candidate is re-read from the table. After an erasure job completes
+    (in any process) the postings are rebuilt, so no tokens of erased messages stay in memory.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Set[int]] = defaultdict(set)
+        self._last_id = 0
+        self._last_erasure: Optional[datetime] = None
+        self._lock = threading.Lock()
+
+    def catch_up(self, db: Session) -> None:
+        with self._lock:
+            erased = db.query(func.max(ErasureJob.finished_at)).filter(ErasureJob.status == "completed").scalar()
+            if erased is not None and (self._last_erasure is None or erased > self._last_erasure):
+                self._last_erasure = erased
+                self._postings.clear()
+                self._last_id = 0
+            rows = (
+                db.query(ConversationMessage.id, ConversationMessage.message)
+                .filter(ConversationMessage.id > self._last_id)
+                .order_by(ConversationMessage.id.asc())
+                .yield_per(1000)
+            )
+            for row_id, message in rows:
+                for token in set(tokenize(message)):
+                    self._postings[token].add(row_id)
+                self._last_id = row_id
+
+    def candidates(self, tokens: List[str]) -> Set[int]:
+        with self._lock:
+            postings = sorted((self._postings.get(token, set()) for token in set(tokens)), key=len)
+            if not postings:
+                return set()
+            result = set(postings[0])
+            for posting in postings[1:]:
+                result &= posting
+            return result
+
+
+_index = InvertedIndex()
+
+
+def _contains_phrase(tokens: List[str], phrase: List[str]) -> bool:
+    n = len(phrase)
+    return any(tokens[i:i + n] == phrase for i in range(len(tokens) - n + 1))
+
+
+def _marked_to_html(marked: str) -> str:
+    return html.escape(marked).replace(MARK_START, "<mark>").replace(MARK_END, "</mark>")
+
+
+def highlight(message: str, tokens: Set[str]) -> str:
+    """HTML-escaped snippet around the first match with matched tokens wrapped in <mark>…</mark>."""
+    spans = [m.span() for m in TOKEN_RE.finditer(message) if m.group(0).lower() in tokens]
+    if not spans:
+        return html.escape(message[:SNIPPET_CHARS])
+    start = max(0, spans[0][0] - SNIPPET_CHARS // 2)
+    end = min(len(message), start + SNIPPET_CHARS)
+    parts, pos = [], start
+    for s, e in spans:
+        if s < start or e > end:
+            continue
+        parts.append(html.escape(message[pos:s]))
+        parts.append(f"<mark>{html.escape(message[s:e])}</mark>")
+        pos = e
+    parts.append(html.escape(message[pos:end]))
+    return ("…" if start > 0 else "") + "".join(parts) + ("…" if end < len(message) else "")
+
+
+def _filtered(query, after, phone_number, role, since, until):
+    if phone_number:
+        query = query.filter(ConversationMessage.phone_number == phone_number)
+    if role:
+        query = query.filter(ConversationMessage.role == role)
+    if since:
+        query = query.filter(ConversationMessage.created_at >= since)
+    if until:
+        query = query.filter(ConversationMessage.created_at < until)
+    if after:
+        query = query.filter(tuple_(ConversationMessage.created_at, ConversationMessage.id) < tuple_(*after))
+    return query
+
+
+NEWEST_FIRST = (ConversationMessage.created_at.desc(), ConversationMessage.id.desc())
+
+
+def _to_hit(row: ConversationMessage, snippet: str) -> ConversationSearchHit:
+    return ConversationSearchHit(
+        id=row.id,
+        phone_number=row.phone_number,
+        session_id=row.session_id,
+        role=row.role,
+        message=row.message,
+        highlight=snippet,
+        created_at=row.created_at,
+    )
+
+
+def _search_postgres(db: Session, q: str, limit: int, **filters) -> List[ConversationSearchHit]:
+    tsquery = func.websearch_to_tsquery("simple", q)
+    unmarked = func.replace(func.replace(ConversationMessage.message, MARK_START, ""), MARK_END, "")
+    query = db.query(
+        ConversationMessage,
+        func.ts_headline("simple", unmarked, tsquery, HEADLINE_OPTIONS),
+    ).filter(literal_column("conversation_messages.search_vector").op("@@")(tsquery))
+    query = _filtered(query, **filters)
+    return [_to_hit(row, _marked_to_html(snippet)) for row, snippet in query.order_by(*NEWEST_FIRST).limit(limit)]
+
+
+def _search_fallback(db: Session, q: str, limit: int, **filters) -> List[ConversationSearchHit]:
+    terms, phrases = parse_query(q)
+    tokens = terms + [token for phrase in phrases for token in phrase]
+    if not tokens:
+        return []
+    _index.catch_up(db)
+    ids = list(_index.candidates(tokens))
+    # Ids do not follow created_at (backfilled history is inserted late), so order the keys first
+    keys: List[Tuple[datetime, int]] = []
+    for offset in range(0, len(ids), CANDIDATE_CHUNK):
+        chunk = ids[offset:offset + CANDIDATE_CHUNK]
+        query = db.query(ConversationMessage.created_at, ConversationMessage.id).filter(ConversationMessage.id.in_(chunk))
+        keys.extend(tuple(key) for key in _filtered(query, **filters))
+    keys.sort(reverse=True)
+    hits: List[ConversationSearchHit] = []
+    for offset in range(0, len(keys), CANDIDATE_CHUNK):
+        chunk = [row_id for _, row_id in keys[offset:offset + CANDIDATE_CHUNK]]
+        query = db.query(ConversationMessage).filter(ConversationMessage.id.in_(chunk))
+        for row in query.order_by(*NEWEST_FIRST):
+            if phrases:
+                message_tokens = tokenize(row.message)
+                if not all(_contains_phrase(message_tokens, phrase) for phrase in phrases):
+                    continue
+            hits.append(_to_hit(row, highlight(row.message, set(tokens))))
+            if len(hits) >= limit:
+                return hits
+    return hits
+
+
+def search_conversations(
+    db: Session,
+    q: str,
+    phone_number: Optional[str] = None,
+    role: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = 20,
+    after: Optional[Tuple[datetime, int]] = None,
+) -> List[ConversationSearchHit]:
+    """
+    Messages matching all terms of `q` ("quoted phrases" must match in order), newest first
+    by (created_at, id); `after` is a decoded cursor. Uses the tsvector/GIN index on PostgreSQL
+    and the in-process inverted index elsewhere.
+    """
+    filters = dict(after=after, phone_number=phone_number, role=role, since=since, until=until)
+    if db.get_bind().dialect.name == "postgresql":
+        return _search_postgres(db, q, limit, **filters)
+    return _search_fallback(db, q, limit, **filters)
@@ -0,0 +1,62 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+MAX_CACHED_SESSIONS = int(os.getenv("SESSION_CACHE_MAX_SESSIONS", "50000"))
+# Entries are re-validated against the database (phone row, token, history) after this long.
+# The token itself is only trusted while the session's lease is alive (see lease_service).
+SESSION_CACHE_TTL_SECONDS = float(os.getenv("SESSION_CACHE_TTL_SECONDS", "300"))
+
+
+class SessionState:
+    def __init__(self, phone: str, token: int, acknowledged: bool = False, language: Optional[str] = None):
+        self.phone = phone
+        self.token = token
+        # True once the "Got your number" acknowledgement was sent, i.e. the session has history
+        self.acknowledged = acknowledged
+        self.language = language
+        self.expires_at = time.monotonic() + SESSION_CACHE_TTL_SECONDS
+
+
+_sessions: "OrderedDict[str, SessionState]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def get_session(session_id: str) -> Optional[SessionState]:
+    with _lock:
+        state = _sessions.get(session_id)
+        if state is None:
+            return None
+        if state.expires_at <= time.monotonic():
+            del _sessions[session_id]
+            return None
+        _sessions.move_to_end(session_id)
+        return state
+
+
+def put_session(session_id: str, state: SessionState) -> None:
+    with _lock:
+        _sessions[session_id] = state
+        _sessions.move_to_end(session_id)
+        now = time.monotonic()
+        # Drop expired entries from the cold end, then enforce the size bound
+        while _sessions:
+            oldest_id, oldest = next(iter(_sessions.items()))
+            if oldest.expires_at > now and len(_sessions) <= MAX_CACHED_SESSIONS:
+                break
+            del _sessions[oldest_id]
+
+
+def drop_session(session_id: str) -> None:
+    with _lock:
+        _sessions.pop(session_id, None)
+
+
+def drop_phone(phone: str) -> None:
+    """Forget every session of a phone number (after it was erased)."""
+    with _lock:
+        for session_id in [sid for sid, state in _sessions.items() if state.phone == phone]:
+            del _sessions[session_id]
@@ -0,0 +1,134 @@
+import abc
+import asyncio
+import logging
+import os
+import threading
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+
+import httpx
+
+from backend.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Messages are sent in batches of up to SMS_BATCH_SIZE, waiting at most SMS_FLUSH_SECONDS for a batch to fill
+SMS_BATCH_SIZE = int(os.getenv("SMS_BATCH_SIZE", "50"))
+SMS_FLUSH_SECONDS = float(os.getenv("SMS_FLUSH_SECONDS", "0.2"))
+SMS_MAX_RETRIES = 3
+SMS_TIMEOUT_SECONDS = 10
+
+SMSMessage = Tuple[str, str]  # (phone number, text)
+
+
+class SMSGateway(abc.ABC):
+    """Delivers batches of SMS. Implementations may raise; the outbox retries the batch."""
+
+    is_stub = False
+
+    @abc.abstractmethod
+    async def send_batch(self, messages: List[SMSMessage]) -> None:
+        raise NotImplementedError
+
+
+class StubSMSGateway(SMSGateway):
+    """Local development: drops messages (logging only recipient and length) and keeps the most recent ones."""
+
+    is_stub = True
+
+    def __init__(self):
+        self.sent: Deque[SMSMessage] = deque(maxlen=1000)
+
+    async def send_batch(self, messages: List[SMSMessage]) -> None:
+        for phone, text in messages:
+            # Message bodies carry OTP codes; never write them to the logs
+            logger.info("SMS to %s (%d chars) not sent: no SMS_GATEWAY_URL configured", phone, len(text))
+            self.sent.append((phone, text))
+
+
+class HTTPSMSGateway(SMSGateway):
+    """Posts each batch as JSON ({"messages": [{"to": ..., "text": ...}]}) to a provider or relay endpoint."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self._client = httpx.AsyncClient(timeout=SMS_TIMEOUT_SECONDS)
+
+    async def send_batch(self, messages: List[SMSMessage]) -> None:
+        r = await self._client.post(self.url, json={"messages": [{"to": p, "text": t} for p, t in messages]})
+        r.raise_for_status()
+
+
+class SMSOutbox:
+    """
+    Queue between request handlers (sync or async) and the gateway. `enqueue` never blocks;
+    `run` drains the queue in batches on the event loop.
+    """
+
+    def __init__(self, gateway: SMSGateway):
+        self.gateway = gateway
+        self._pending: Deque[Tuple[SMSMessage, int]] = deque()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self.sent = 0
+        self.failed = 0
+
+    def enqueue(self, phone: str, text: str) -> None:
+        with self._lock:
+            self._pending.append(((phone, text), 0))
+        if self._loop is not None and self._wakeup is not None:
+            # May be called from a threadpool worker (sync FastAPI routes)
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _take_batch(self) -> List[Tuple[SMSMessage, int]]:
+        with self._lock:
+            return [self._pending.popleft() for _ in range(min(SMS_BATCH_SIZE, len(self._pending)))]
+
+    async def flush(self) -> None:
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                return
+            try:
+                await self.gateway.send_batch([message for message, _ in batch])
+                self.sent += len(batch)
+            except Exception:
+                logger.exception("SMS batch of %d failed", len(batch))
+                with self._lock:
+                    for message, tries in reversed(batch):
+                        if tries + 1 < SMS_MAX_RETRIES:
+                            self._pending.appendleft((message, tries + 1))
+                        else:
+                            self.failed += 1
+                return
+
+    async def run(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        while True:
+            if not self._pending:
+                await self._wakeup.wait()
+            self._wakeup.clear()
+            if len(self._pending) < SMS_BATCH_SIZE:
+                # Let concurrent requests join this batch
+                await asyncio.sleep(SMS_FLUSH_SECONDS)
+            await self.flush()
+            if self._pending:
+                # A failed batch stays queued; back off before retrying
+                await asyncio.sleep(1.0)
+
+
+_outbox: Optional[SMSOutbox] = None
+outbox_task: Optional["asyncio.Task[None]"] = None
+
+
+def get_outbox() -> SMSOutbox:
+    global _outbox
+    if _outbox is None:
+        url = settings.sms_gateway_url
+        _outbox = SMSOutbox(HTTPSMSGateway(url) if url else StubSMSGateway())
+    return _outbox
+
+
+def send_sms(phone: str, text: str) -> None:
+    get_outbox().enqueue(phone, text)
@@ -0,0 +1,171 @@
+import asyncio
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from backend.db.session import SessionLocal
+from backend.models.stats import StatsHourly
+from backend.schemas.stats import StatsBucket, StatsMetric, StatsPoint
+
+logger = logging.getLogger(__name__)
+
+# Counters are accumulated in memory and added to stats_hourly every STATS_FLUSH_SECONDS.
+# Flushes are additive upserts, so any number of workers can write the same hour.
+STATS_FLUSH_SECONDS = float(os.getenv("STATS_FLUSH_SECONDS", "10"))
+MAX_QUERY_DAYS = 400
+
+# (hour, metric, dimension) -> [count, total]
+_counters: Dict[Tuple[datetime, str, str], List[int]] = {}
+_lock = threading.Lock()
+
+stats_task: Optional["asyncio.Task[None]"] = None
+
+
+def _hour(at: Optional[datetime] = None) -> datetime:
+    return (at or datetime.utcnow()).replace(minute=0, second=0, microsecond=0)
+
+
+def record(metric: StatsMetric, dimension: str = "", value: Optional[int] = None, at: Optional[datetime] = None) -> None:
+    key = (_hour(at), metric.value, (dimension or "")[:100])
+    with _lock:
+        counter = _counters.setdefault(key, [0, 0])
+        counter[0] += 1
+        if value is not None:
+            counter[1] += value
+
+
+def reply_intent(replies: List[Dict[str, Any]]) -> Optional[str]:
+    """Intent attached to the replies, if any (`metadata` or `custom` payload with an `intent` key)."""
+    for reply in replies:
+        if not isinstance(reply, dict):
+            continue
+        for field in ("metadata", "custom"):
+            payload = reply.get(field)
+            if isinstance(payload, dict) and payload.get("intent"):
+                return str(payload["intent"])
+    return None
+
+
+def record_turn(source: str, intent: Optional[str]) -> None:
+    """One chat turn; source is how it was answered (rasa, faq, pre_route, overloaded)."""
+    record(StatsMetric.TURNS, source)
+    record(StatsMetric.INTENT, intent or "unknown")
+
+
+def record_submission(kind: str, rating: Optional[int] = None, at: Optional[datetime] = None) -> None:
+    record(StatsMetric.SUBMISSIONS, kind, at=at)
+    if rating is not None:
+        record(StatsMetric.RATING, kind, value=rating, at=at)
+
+
+def _upsert(db: Session, rows: List[Dict[str, Any]]) -> None:
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(StatsHourly).values(rows)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=["hour", "metric", "dimension"],
+            set_={
+                "count": StatsHourly.count + stmt.excluded.count,
+                "total": StatsHourly.total + stmt.excluded.total,
+                "updated_at": stmt.excluded.updated_at,
+            },
+        ))
+        return
+    for row in rows:
+        existing = db.get(StatsHourly, (row["hour"], row["metric"], row["dimension"]), with_for_update=True)
+        if existing is None:
+            db.add(StatsHourly(**row))
+        else:
+            existing.count += row["count"]
+            existing.total += row["total"]
+            existing.updated_at = row["updated_at"]
+
+
+def write_counters(snapshot: Dict[Tuple[datetime, str, str], List[int]]) -> None:
+    now = datetime.utcnow()
+    rows = [
+        {"hour": hour, "metric": metric, "dimension": dimension, "count": c[0], "total": c[1], "updated_at": now}
+        for (hour, metric, dimension), c in snapshot.items()
+    ]
+    db = SessionLocal()
+    try:
+        _upsert(db, rows)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+async def flush() -> None:
+    global _counters
+    with _lock:
+        snapshot, _counters = _counters, {}
+    if not snapshot:
+        return
+    try:
+        await asyncio.to_thread(write_counters, snapshot)
+    except Exception:
+        logger.exception("Stats flush of %d counters failed", len(snapshot))
+        # Keep the counts for the next flush
+        with _lock:
+            for key, (count, total) in snapshot.items():
+                counter = _counters.setdefault(key, [0, 0])
+                counter[0] += count
+                counter[1] += total
+
+
+async def run_stats_worker() -> None:
+    while True:
+        await asyncio.sleep(STATS_FLUSH_SECONDS)
+        await flush()
+
+
+def query_stats(
+    db: Session,
+    metric: StatsMetric,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    bucket: StatsBucket = StatsBucket.HOUR,
+    dimension: Optional[str] = None,
+) -> List[StatsPoint]:
+    """
+    Counters for [since, until) in hourly or daily buckets, read only from stats_hourly.
+    Defaults to the last 7 days; ranges are capped at MAX_QUERY_DAYS.
+    """
+    until = until or datetime.utcnow()
+    since = since or until - timedelta(days=7)
+    since = max(since, until - timedelta(days=MAX_QUERY_DAYS))
+    query = db.query(StatsHourly).filter(
+        StatsHourly.metric == metric.value,
+        StatsHourly.hour >= _hour(since),
+        StatsHourly.hour < until,
+    )
+    if dimension is not None:
+        query = query.filter(StatsHourly.dimension == dimension)
+
+    buckets: Dict[Tuple[datetime, str], List[int]] = {}
+    for row in query.order_by(StatsHourly.hour.asc()):
+        start = row.hour if bucket == StatsBucket.HOUR else row.hour.replace(hour=0)
+        counter = buckets.setdefault((start, row.dimension), [0, 0])
+        counter[0] += row.count
+        counter[1] += row.total
+    return [
+        StatsPoint(
+            bucket=start,
+            dimension=dim,
+            count=count,
+            total=total,
+            average=(total / count) if metric == StatsMetric.RATING and count else None,
+        )
+        for (start, dim), (count, total) in sorted(buckets.items())
+    ]
@@ -0,0 +1,21 @@
+from typing import Dict
+
+
+def get_pan_status(pan_number: str) -> Dict[str, str]:
+    """Application status for a PAN. Static response for now as requested."""
+    pan = (pan_number or "").strip().upper()
+    return {
+        "pan_number": pan,
+        "status": "in_progress",
+        "message": "Your PAN application is in progress. Please check back later.",
+    }
+
+
+def get_tan_status(tan_number: str) -> Dict[str, str]:
+    """Application status for a TAN. Static response for now as requested."""
+    tan = (tan_number or "").strip().upper()
+    return {
+        "tan_number": tan,
+        "status": "in_progress",
+        "message": "Your TAN application is in progress. Please check back later.",
+    }
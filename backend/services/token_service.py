@@ -2,11 +2,11 @@ from datetime import datetime, timedelta
 from typing import Tuple
 from sqlalchemy.orm import Session
 from backend.models.history import SessionToken
-from backend.models.history import SessionChatHistory
+from backend.services.lease_service import SESSION_LEASE_SECONDS, has_lease, leases_shared, renew_lease, revoke_lease
 
 
 MAX_TOKENS = 10
-TOKEN_TTL_MINUTES = 15  # consider a session inactive after 15 minutes of no updates
+TOKEN_TTL_MINUTES = 15  # conversation idle time
 
 
 def initialize_token_pool(db: Session) -> None:
@@ -21,34 +21,27 @@ def initialize_token_pool(db: Session) -> None:
 
 
 def _release_stale_tokens(db: Session) -> None:
-    """Free tokens whose sessions have gone inactive or are invalid."""
-    cutoff = datetime.utcnow() - timedelta(minutes=TOKEN_TTL_MINUTES)
+    """
+    Free tokens whose sessions no longer hold a lease (no chat turn or heartbeat recently).
+    When leases are per process and there are several workers, another worker's session would look
+    lease-less here, so tokens are only freed TOKEN_TTL_MINUTES after the session was last seen
+    (`assigned_at` is refreshed by every turn and heartbeat, see touch_token).
+    """
+    shared = leases_shared()
+    # A token assigned just now may not have been leased yet (or leases were lost in a restart)
+    grace = timedelta(seconds=SESSION_LEASE_SECONDS) if shared else timedelta(minutes=TOKEN_TTL_MINUTES)
+    grace_cutoff = datetime.utcnow() - grace
     busy_tokens = db.query(SessionToken).filter(SessionToken.is_busy == True).all()
+    released = False
     for tok in busy_tokens:
-        should_release = False
-        # No session id or assigned long ago
-        if not tok.session_id:
-            should_release = True
-        elif tok.assigned_at and tok.assigned_at < cutoff:
-            should_release = True
-        else:
-            # If there is no chat history for this session_id or it's stale, release
-            hist = (
-                db.query(SessionChatHistory)
-                .filter(SessionChatHistory.session_id == tok.session_id)
-                .first()
-            )
-            if hist is None:
-                should_release = True
-            else:
-                # If no updates in a while, consider session closed
-                if (hist.updated_at or hist.created_at) < cutoff:
-                    should_release = True
-        if should_release:
-            tok.is_busy = False
-            tok.session_id = None
-            tok.assigned_at = None
-    db.commit()
+        if tok.session_id and ((shared and has_lease(tok.session_id)) or (tok.assigned_at and tok.assigned_at >= grace_cutoff)):
+            continue
+        tok.is_busy = False
+        tok.session_id = None
+        tok.assigned_at = None
+        released = True
+    if released:
+        db.commit()
 
 
 def acquire_token(db: Session, session_id: str) -> Tuple[int, bool]:
@@ -70,6 +63,10 @@ def acquire_token(db: Session, session_id: str) -> Tuple[int, bool]:
         .first()
     )
     if existing:
+        if not leases_shared():
+            existing.assigned_at = datetime.utcnow()
+            db.commit()
+        renew_lease(session_id)
         return existing.token, False
 
     free_row = (
@@ -86,10 +83,30 @@ def acquire_token(db: Session, session_id: str) -> Tuple[int, bool]:
     free_row.assigned_at = datetime.utcnow()
     db.commit()
     db.refresh(free_row)
+    renew_lease(session_id)
     return free_row.token, False
 
 
+def touch_token(db: Session, session_id: str) -> bool:
+    """
+    Mark the session's token as in use now; False when the session no longer holds one.
+    Only needed when leases are not shared, where assigned_at is the token's liveness.
+    """
+    row = (
+        db.query(SessionToken)
+        .filter(SessionToken.session_id == session_id, SessionToken.is_busy == True)
+        .first()
+    )
+    if not row:
+        return False
+    row.assigned_at = datetime.utcnow()
+    db.commit()
+    renew_lease(session_id)
+    return True
+
+
 def release_token(db: Session, session_id: str) -> None:
+    revoke_lease(session_id)
     row = (
         db.query(SessionToken)
         .filter(SessionToken.session_id == session_id, SessionToken.is_busy == True)
@@ -0,0 +1,117 @@
+import asyncio
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from backend.services import rasa_client
+
+
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "1") not in ("0", "false", "False")
+# A round counts as warm when every utterance is answered within this many seconds
+WARMUP_FAST_SECONDS = float(os.getenv("WARMUP_FAST_SECONDS", "0.5"))
+WARMUP_RETRY_SECONDS = 2.0
+WARMUP_MAX_ROUNDS = 20  # give up waiting for "fast" after this many successful rounds
+
+# Canned turns covering the main intents so DIET, ResponseSelector, TED and the
+# action server are all traced and loaded before real users arrive
+WARMUP_UTTERANCES = {
+    "en": [
+        "hello",
+        "english",
+        "pan assistance",
+        "what is pan",
+        "what are the pan charges",
+        "check my pan status",
+        "ABCDE1234F",
+        "tan assistance",
+        "how to apply for tan",
+        "check tan status",
+        "ABCD12345E",
+        "bye",
+    ],
+    "hi": [
+        "हिंदी",
+        "पैन सहायता",
+        "पैन क्या है",
+        "पैन स्टेटस चेक करो",
+        "टैन सहायता",
+        "टैन क्या है",
+        "टैन स्टेटस",
+    ],
+}
+
+
+class WarmupState:
+    def __init__(self):
+        self.ready = not WARMUP_ENABLED
+        self.started_at = time.monotonic()
+        self.rounds = 0
+        self.last_round_seconds: Optional[float] = None
+        self.slowest_reply_seconds: Optional[float] = None
+        self.time_to_first_fast_response: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "rounds": self.rounds,
+            "last_round_seconds": self.last_round_seconds,
+            "slowest_reply_seconds": self.slowest_reply_seconds,
+            "time_to_first_fast_response": self.time_to_first_fast_response,
+            "last_error": self.last_error,
+        }
+
+
+state = WarmupState()
+warmup_task: Optional["asyncio.Task[None]"] = None
+
+
+def _targets() -> Dict[str, List[str]]:
+    """Warm-up utterances per Rasa server; a combined model gets both languages."""
+    targets: Dict[str, List[str]] = {}
+    for language, utterances in WARMUP_UTTERANCES.items():
+        targets.setdefault(rasa_client.url_for_language(language), []).extend(utterances)
+    return targets
+
+
+async def _warm_round() -> float:
+    """Replay the canned turns on every server; returns the slowest single reply time."""
+    client = rasa_client.get_client()
+    slowest = 0.0
+    for url, utterances in _targets().items():
+        sender = f"__warmup__{state.rounds}"
+        for text in utterances:
+            began = time.monotonic()
+            r = await client.post(url, json={"sender": sender, "message": text})
+            r.raise_for_status()
+            slowest = max(slowest, time.monotonic() - began)
+    return slowest
+
+
+async def run_warmup() -> None:
+    """Repeat warm-up rounds until replies are fast, then mark the bridge ready."""
+    if not WARMUP_ENABLED:
+        return
+    state.started_at = time.monotonic()
+    successful = 0
+    while not state.ready:
+        began = time.monotonic()
+        try:
+            slowest = await _warm_round()
+        except httpx.HTTPError as e:
+            state.last_error = f"{e!s}" or type(e).__name__
+            await asyncio.sleep(WARMUP_RETRY_SECONDS)
+            continue
+        state.rounds += 1
+        successful += 1
+        state.last_error = None
+        state.last_round_seconds = time.monotonic() - began
+        state.slowest_reply_seconds = slowest
+        if slowest <= WARMUP_FAST_SECONDS:
+            state.time_to_first_fast_response = time.monotonic() - state.started_at
+            state.ready = True
+        elif successful >= WARMUP_MAX_ROUNDS:
+            # Rasa answers but never gets under the target on this hardware; do not block forever
+            state.ready = True
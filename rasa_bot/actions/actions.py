@@ -30,11 +30,55 @@
 
 
 # D:\PAN2.o\ChatBot_PAN2.o\actions.py
-from typing import Any, Text, Dict, List
+from typing import Any, Text, Dict, List, Optional
 from rasa_sdk import Action, Tracker
 from rasa_sdk.executor import CollectingDispatcher
+import asyncio
 import os
-import requests
+import httpx
+
+# Backend calls share one pooled async client so a slow call never blocks the action server's event loop
+BACKEND_TIMEOUT_SECONDS = float(os.getenv("ACTION_BACKEND_TIMEOUT_SECONDS", "5"))
+BACKEND_MAX_CONCURRENCY = int(os.getenv("ACTION_BACKEND_MAX_CONCURRENCY", "20"))
+
+_http_client: Optional[httpx.AsyncClient] = None
+_backend_slots: Optional[asyncio.Semaphore] = None
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            base_url=os.getenv("FASTAPI_BASE_URL", "http://127.0.0.1:8000"),
+            limits=httpx.Limits(max_connections=BACKEND_MAX_CONCURRENCY, max_keepalive_connections=BACKEND_MAX_CONCURRENCY),
+        )
+    return _http_client
+
+
+async def _post_backend(path: Text, payload: Dict[Text, Any]) -> Optional[Dict[Text, Any]]:
+    """POST to the FastAPI backend; None on error, timeout or when too many calls are already waiting."""
+    global _backend_slots
+    if _backend_slots is None:
+        _backend_slots = asyncio.Semaphore(BACKEND_MAX_CONCURRENCY)
+
+    async def call() -> Optional[Dict[Text, Any]]:
+        async with _backend_slots:
+            resp = await _get_http_client().post(path, json=payload)
+            return resp.json() if resp.is_success else None
+
+    try:
+        # The timeout covers waiting for a slot as well as the request itself
+        return await asyncio.wait_for(call(), timeout=BACKEND_TIMEOUT_SECONDS)
+    except Exception:
+        return None
+
+
+def _report_intent(dispatcher: CollectingDispatcher, tracker: Tracker) -> None:
+    """Pass the classified intent to the bridge for its stats; it strips this message before replying."""
+    intent = (tracker.latest_message.get("intent") or {}).get("name")
+    if intent:
+        dispatcher.utter_message(json_message={"intent": intent})
+
 
 class ActionHelloWorld(Action):
     def name(self) -> Text:
@@ -51,7 +95,7 @@ class ActionCheckPANStatus(Action):
     def name(self) -> Text:
         return "action_check_pan_status"
 
-    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    async def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         # Check if we're in a TAN status flow context
         events = tracker.events
         is_tan_context = False
@@ -79,7 +123,8 @@ class ActionCheckPANStatus(Action):
         # If we're in TAN context and got a PAN-formatted input, redirect to TAN action
         if is_tan_context and pan:
             # This is a PAN format in TAN context, redirect to TAN action
-            return ActionCheckTANStatus().run(dispatcher, tracker, domain)
+            return await ActionCheckTANStatus().run(dispatcher, tracker, domain)
+        _report_intent(dispatcher, tracker)
         
         if not pan:
             # If not a valid PAN format, provide helpful error message
@@ -103,16 +148,11 @@ class ActionCheckPANStatus(Action):
             return []
         
         # Call backend API
-        base_url = os.getenv("FASTAPI_BASE_URL", "http://127.0.0.1:8000")
-        try:
-            resp = requests.post(f"{base_url}/api/pan/status", json={"pan_number": pan}, timeout=5)
-            if resp.ok:
-                data = resp.json()
-                message = data.get("message") or f"Your PAN {data.get('pan_number','')} status is in progress."
-                dispatcher.utter_message(text=message)
-                return []
-        except Exception:
-            pass
+        data = await _post_backend("/api/pan/status", {"pan_number": pan})
+        if data is not None:
+            message = data.get("message") or f"Your PAN {data.get('pan_number','')} status is in progress."
+            dispatcher.utter_message(text=message)
+            return []
         # Fallback friendly message if API is unreachable
         dispatcher.utter_message(text="Your PAN application is in progress. Please check back later.")
         return []
@@ -122,7 +162,7 @@ class ActionCheckTANStatus(Action):
     def name(self) -> Text:
         return "action_check_tan_status"
 
-    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    async def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         # Check if we're in a PAN status flow context
         events = tracker.events
         is_pan_context = False
@@ -155,7 +195,8 @@ class ActionCheckTANStatus(Action):
         # If we're in PAN context and got a TAN-formatted input, redirect to PAN action
         if is_pan_context and tan:
             # This is a TAN format in PAN context, redirect to PAN action
-            return ActionCheckPANStatus().run(dispatcher, tracker, domain)
+            return await ActionCheckPANStatus().run(dispatcher, tracker, domain)
+        _report_intent(dispatcher, tracker)
         
         if not tan:
             # If not a valid TAN format, provide helpful error message
@@ -179,16 +220,11 @@ class ActionCheckTANStatus(Action):
             return []
         
         # Call backend API
-        base_url = os.getenv("FASTAPI_BASE_URL", "http://127.0.0.1:8000")
-        try:
-            resp = requests.post(f"{base_url}/api/tan/status", json={"tan_number": tan}, timeout=5)
-            if resp.ok:
-                data = resp.json()
-                message = data.get("message") or f"Your TAN {data.get('tan_number','')} status is in progress."
-                dispatcher.utter_message(text=message)
-                return []
-        except Exception:
-            pass
+        data = await _post_backend("/api/tan/status", {"tan_number": tan})
+        if data is not None:
+            message = data.get("message") or f"Your TAN {data.get('tan_number','')} status is in progress."
+            dispatcher.utter_message(text=message)
+            return []
         # Fallback friendly message if API is unreachable
         dispatcher.utter_message(text="Your TAN application is in progress. Please check back later.")
         return []
\ No newline at end of file
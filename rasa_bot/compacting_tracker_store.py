@@ -0,0 +1,169 @@
+# Tracker store that keeps Rasa's memory and database bounded.
+# Configured in endpoints.yml; works with the existing Postgres database or a local SQLite file.
+import logging
+import os
+import tempfile
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import func
+
+from rasa.core.tracker_store import SQLTrackerStore
+from rasa.shared.core.events import ActiveLoop, SessionStarted, SlotSet
+from rasa.shared.core.trackers import DialogueStateTracker
+
+logger = logging.getLogger(__name__)
+
+# Event types that must survive compaction: they define slot values, the active form and session boundaries
+PRESERVED_EVENT_TYPES = (SlotSet.type_name, SessionStarted.type_name, ActiveLoop.type_name)
+
+
+class CompactingSQLTrackerStore(SQLTrackerStore):
+    """
+    SQLTrackerStore that, after every save:
+    - drops the sender's events from sessions before the current one
+    - keeps only the newest `max_events` events of the current session (plus slot/session/loop events);
+      policies only look at `max_history: 5` turns, so the default window is generous
+    and every `maintenance_interval_seconds`:
+    - deletes senders idle for more than `idle_minutes`, never less than the domain's
+      session_expiration_time (a sender must not lose a session Rasa would still resume)
+    - writes tracker count, event count, stored bytes and the compaction counters to `metrics_file`
+      in Prometheus text format (for node_exporter's textfile collector or any file scraper)
+    """
+
+    def __init__(
+        self,
+        *args: Any,
+        max_events: int = 200,
+        idle_minutes: float = 60,
+        maintenance_interval_seconds: float = 60,
+        metrics_file: Optional[str] = None,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.max_events = int(max_events)
+        self.idle_minutes = float(idle_minutes)
+        self.maintenance_interval_seconds = float(maintenance_interval_seconds)
+        self.metrics_file = metrics_file
+        self._last_maintenance = time.monotonic()
+        self.last_stats: Dict[str, Any] = {}
+        self.counters: Dict[str, int] = {"events_compacted": 0, "senders_expired": 0, "compaction_errors": 0}
+
+    @property
+    def effective_idle_minutes(self) -> float:
+        session_config = getattr(self.domain, "session_config", None)
+        expiration = getattr(session_config, "session_expiration_time", 0) or 0
+        return max(self.idle_minutes, float(expiration))
+
+    async def save(self, tracker: DialogueStateTracker) -> None:
+        await super().save(tracker)
+        maintenance = False
+        try:
+            with self.session_scope() as session:
+                compacted = self._compact_sender(session, tracker.sender_id)
+                expired = 0
+                if time.monotonic() - self._last_maintenance >= self.maintenance_interval_seconds:
+                    self._last_maintenance = time.monotonic()
+                    maintenance = True
+                    expired = self._expire_idle_senders(session)
+                    self.last_stats = self._collect_stats(session)
+                    logger.info("Tracker store stats: %s", self.last_stats)
+                session.commit()
+            self.counters["events_compacted"] += compacted
+            self.counters["senders_expired"] += expired
+        except Exception:
+            # Compaction is housekeeping; never fail the conversation because of it
+            self.counters["compaction_errors"] += 1
+            logger.exception("Tracker store compaction failed for sender '%s'", tracker.sender_id)
+        if maintenance:
+            self._export_metrics()
+
+    def _compact_sender(self, session: Any, sender_id: str) -> int:
+        event = self.SQLEvent
+        deleted = 0
+        last_session_start: Optional[int] = (
+            session.query(func.max(event.id))
+            .filter(event.sender_id == sender_id, event.type_name == SessionStarted.type_name)
+            .scalar()
+        )
+        if last_session_start is not None:
+            deleted += (
+                session.query(event)
+                .filter(event.sender_id == sender_id, event.id < last_session_start)
+                .delete(synchronize_session=False)
+            )
+
+        # Id of the newest event that falls outside the window
+        cutoff_id: Optional[int] = (
+            session.query(event.id)
+            .filter(event.sender_id == sender_id)
+            .order_by(event.id.desc())
+            .offset(self.max_events)
+            .limit(1)
+            .scalar()
+        )
+        if cutoff_id is not None:
+            deleted += (
+                session.query(event)
+                .filter(
+                    event.sender_id == sender_id,
+                    event.id <= cutoff_id,
+                    event.type_name.notin_(PRESERVED_EVENT_TYPES),
+                )
+                .delete(synchronize_session=False)
+            )
+        return deleted
+
+    def _expire_idle_senders(self, session: Any) -> int:
+        event = self.SQLEvent
+        cutoff = time.time() - self.effective_idle_minutes * 60
+        idle = (
+            session.query(event.sender_id)
+            .group_by(event.sender_id)
+            .having(func.max(event.timestamp) < cutoff)
+            .subquery()
+        )
+        return (
+            session.query(event)
+            .filter(event.sender_id.in_(session.query(idle.c.sender_id)))
+            .delete(synchronize_session=False)
+        )
+
+    def _collect_stats(self, session: Any) -> Dict[str, Any]:
+        event = self.SQLEvent
+        senders, events, stored_bytes = session.query(
+            func.count(func.distinct(event.sender_id)),
+            func.count(event.id),
+            func.coalesce(func.sum(func.length(event.data)), 0),
+        ).one()
+        return {
+            "senders": int(senders),
+            "events": int(events),
+            "stored_bytes": int(stored_bytes),
+            "events_per_sender": round(events / senders, 1) if senders else 0.0,
+        }
+
+    def metrics_text(self) -> str:
+        """Gauges from the last maintenance run and counters since start, in Prometheus text format."""
+        lines = []
+        for name in ("senders", "events", "stored_bytes", "events_per_sender"):
+            if name in self.last_stats:
+                lines.append(f"# TYPE rasa_tracker_store_{name} gauge")
+                lines.append(f"rasa_tracker_store_{name} {self.last_stats[name]}")
+        for name, value in self.counters.items():
+            lines.append(f"# TYPE rasa_tracker_store_{name}_total counter")
+            lines.append(f"rasa_tracker_store_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+    def _export_metrics(self) -> None:
+        if not self.metrics_file:
+            return
+        try:
+            # Written to a temp file and renamed, so scrapers never read a partial file
+            directory = os.path.dirname(os.path.abspath(self.metrics_file))
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w") as fh:
+                fh.write(self.metrics_text())
+            os.replace(tmp_path, self.metrics_file)
+        except OSError:
+            logger.exception("Could not write tracker store metrics to '%s'", self.metrics_file)
@@ -0,0 +1,91 @@
+"""
+Benchmark: action-server throughput for action_check_pan_status with concurrent trackers.
+
+The FastAPI backend is replaced by an in-process mock with a fixed latency, so the
+numbers show how many actions per second one action-server event loop sustains.
+The "blocking" baseline reproduces the previous implementation, where a synchronous
+HTTP call inside `run` held the event loop for the whole backend round-trip.
+
+Usage:
+    python scripts/benchmark_actions.py [--trackers 200] [--backend-latency 0.05]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+from rasa_sdk import Tracker
+from rasa_sdk.executor import CollectingDispatcher
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "rasa_bot"))
+
+from actions import actions  # noqa: E402
+
+
+def make_tracker(i):
+    pan = f"ABCDE{i % 10000:04d}F"
+    return Tracker(
+        sender_id=f"bench-{i}",
+        slots={},
+        latest_message={"text": pan, "intent": {"name": "provide_pan_number"}, "entities": [{"entity": "pan_number", "value": pan}]},
+        events=[],
+        paused=False,
+        followup_action=None,
+        active_loop={},
+        latest_action_name="action_listen",
+    )
+
+
+# Only replies carrying this text came from the mock backend; anything else is the action's fallback
+MOCK_MESSAGE = "mock backend: in progress"
+
+
+def install_mock_backend(latency):
+    async def handler(request):
+        await asyncio.sleep(latency)
+        return httpx.Response(200, json={"pan_number": "X", "status": "in_progress", "message": MOCK_MESSAGE})
+
+    actions._http_client = httpx.AsyncClient(base_url="http://backend", transport=httpx.MockTransport(handler))
+    actions._backend_slots = None
+
+
+async def run_async_actions(n, latency):
+    install_mock_backend(latency)
+    action = actions.ActionCheckPANStatus()
+    dispatchers = [CollectingDispatcher() for _ in range(n)]
+    began = time.perf_counter()
+    await asyncio.gather(*(action.run(dispatchers[i], make_tracker(i), {}) for i in range(n)))
+    elapsed = time.perf_counter() - began
+    await actions._http_client.aclose()
+    # Backend errors and timeouts (ACTION_BACKEND_TIMEOUT_SECONDS) still utter the fallback message
+    succeeded = sum(1 for d in dispatchers if [m["text"] for m in d.messages if m.get("text")] == [MOCK_MESSAGE])
+    return elapsed, succeeded, n - succeeded
+
+
+async def run_blocking_baseline(n, latency):
+    async def blocking_action():
+        time.sleep(latency)  # what requests.post did to the event loop
+
+    began = time.perf_counter()
+    await asyncio.gather(*(blocking_action() for _ in range(n)))
+    return time.perf_counter() - began, n, 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trackers", type=int, default=200)
+    parser.add_argument("--backend-latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    print(f"{args.trackers} concurrent trackers, backend latency {args.backend_latency * 1000:.0f}ms, "
+          f"concurrency limit {actions.BACKEND_MAX_CONCURRENCY}")
+    for name, bench in (("blocking (requests)", run_blocking_baseline), ("async (httpx pool)", run_async_actions)):
+        elapsed, succeeded, failed = asyncio.run(bench(args.trackers, args.backend_latency))
+        # Throughput counts only actions answered by the backend
+        print(f"{name:22s} {elapsed:7.2f}s  {succeeded / elapsed:8.1f} actions/s  {failed} timed out or failed")
+
+
+if __name__ == "__main__":
+    main()
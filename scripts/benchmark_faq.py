@@ -0,0 +1,102 @@
+"""
+Offline benchmark: FAQ retrieval engine vs. the Rasa DIET classifier.
+
+Every Nth NLU example is held out. The FAQ engine is rebuilt from the remaining
+examples and scored on the held-out ones; the same messages are sent to a running
+Rasa server's /model/parse endpoint for comparison. Note that the served DIET model
+was trained on all examples, so its accuracy here is optimistic.
+
+Usage:
+    python scripts/benchmark_faq.py [--holdout-every 5] [--rasa-url http://127.0.0.1:5005/model/parse]
+    python scripts/benchmark_faq.py --skip-rasa
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from backend.services.faq_service import FAQEngine, load_faq_responses, load_nlu_examples  # noqa: E402
+
+
+def split_examples(examples, every):
+    train, test = {}, []
+    for intent, texts in examples.items():
+        train[intent] = [t for i, t in enumerate(texts) if i % every != every - 1]
+        test.extend((t, intent) for i, t in enumerate(texts) if i % every == every - 1)
+    return train, test
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def report(name, latencies, answered, correct, total):
+    print(f"\n== {name}")
+    print(f"messages:  {total}")
+    print(f"answered:  {answered} ({answered / total:.1%} coverage)")
+    print(f"precision: {correct / answered:.1%}" if answered else "precision: n/a")
+    print(f"latency:   p50 {percentile(latencies, 50) * 1e6:.0f}us  p95 {percentile(latencies, 95) * 1e6:.0f}us  "
+          f"mean {statistics.mean(latencies) * 1e6:.0f}us")
+
+
+def bench_faq(engine, test, batch_size):
+    faq_tests = [(t, i) for t, i in test if i in engine.responses]
+    latencies, answered, correct = [], 0, 0
+    for start in range(0, len(test), batch_size):
+        batch = test[start:start + batch_size]
+        began = time.perf_counter()
+        results = engine.match_batch([t for t, _ in batch])
+        elapsed = time.perf_counter() - began
+        latencies.extend([elapsed / len(batch)] * len(batch))
+        for (_, intent), hit in zip(batch, results):
+            if hit:
+                answered += 1
+                correct += hit["intent"] == intent
+    report(f"FAQ engine (batch size {batch_size})", latencies, answered, correct, len(test))
+    print(f"FAQ-intent messages: {len(faq_tests)} (max reachable coverage {len(faq_tests) / len(test):.1%})")
+
+
+def bench_diet(url, test):
+    latencies, correct = [], 0
+    with httpx.Client(timeout=30) as client:
+        for text, intent in test:
+            began = time.perf_counter()
+            r = client.post(url, json={"text": text})
+            latencies.append(time.perf_counter() - began)
+            r.raise_for_status()
+            correct += (r.json().get("intent") or {}).get("name") == intent
+    report("Rasa /model/parse (DIET)", latencies, len(test), correct, len(test))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--holdout-every", type=int, default=5)
+    parser.add_argument("--batch-sizes", default="1,32,256")
+    parser.add_argument("--rasa-url", default=os.getenv("RASA_PARSE_URL", "http://127.0.0.1:5005/model/parse"))
+    parser.add_argument("--skip-rasa", action="store_true")
+    args = parser.parse_args()
+
+    train, test = split_examples(load_nlu_examples(), args.holdout_every)
+    began = time.perf_counter()
+    engine = FAQEngine(train, load_faq_responses())
+    print(f"index build: {time.perf_counter() - began:.3f}s, "
+          f"{engine.index.matrix.shape[0]} examples x {engine.index.matrix.shape[1]} features, "
+          f"{len(engine.responses)} FAQ intents")
+
+    for batch_size in (int(b) for b in args.batch_sizes.split(",")):
+        bench_faq(engine, test, batch_size)
+    if not args.skip_rasa:
+        try:
+            bench_diet(args.rasa_url, test)
+        except httpx.HTTPError as e:
+            print(f"\nRasa benchmark skipped: {e!s}")
+
+
+if __name__ == "__main__":
+    main()
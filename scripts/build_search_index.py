@@ -0,0 +1,113 @@
+"""
+Backfill: split existing conversation blobs into `conversation_messages` for full-text search.
+
+New messages are indexed as they are saved; this only covers history written before the
+search table existed. Each `conversations.message` blob holds lines of the form
+`user: ...` / `bot: ...`; lines without a role prefix continue the previous message.
+
+Every live save appends one line to the blob and indexes one row, so the last N messages of a
+blob are the N rows already indexed for that phone; only the messages before them are backfilled.
+Finished conversations are recorded in `search_backfill`, so it is safe to re-run (and to run
+while the bot is serving traffic: each conversation row is locked while it is backfilled).
+
+Backfilled messages have no timestamps of their own and get the conversation's `created_at`;
+search orders by (created_at, id), so they rank below live messages and keep their blob order.
+
+On PostgreSQL the table is created with a generated `search_vector` tsvector column and a
+GIN index; no separate indexing step is needed.
+
+Usage:
+    python scripts/build_search_index.py [--batch-size 500]
+"""
+import argparse
+import os
+import sys
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, Table, exists, func
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from backend.db.session import SessionLocal, engine  # noqa: E402
+from backend.models import consent as _consent_models, history as _history_models, otp as _otp_models  # noqa: E402,F401
+from backend.models.conversation import Conversation, ConversationMessage  # noqa: E402
+
+ROLES = ("user", "bot")
+
+# Conversations already backfilled (holds no message content, so erasure can leave it alone)
+backfill_marker = Table(
+    "search_backfill",
+    MetaData(),
+    Column("conversation_id", Integer, primary_key=True),
+    Column("backfilled", Integer, nullable=False),
+    Column("created_at", DateTime, nullable=False, default=datetime.utcnow),
+)
+
+
+def split_blob(blob):
+    """[(role, message)] from a conversation blob."""
+    messages = []
+    for line in (blob or "").splitlines():
+        role, sep, rest = line.partition(": ")
+        if sep and role in ROLES:
+            messages.append([role, rest])
+        elif messages:
+            messages[-1][1] += "\n" + line
+    return [(role, message) for role, message in messages if message.strip()]
+
+
+def backfill_conversation(db, conv):
+    """Index the blob messages that predate live indexing; returns how many were added."""
+    live = (
+        db.query(func.count(ConversationMessage.id))
+        .filter(ConversationMessage.phone_number == conv.phone_number)
+        .scalar()
+    )
+    messages = split_blob(conv.message)
+    older = messages[:max(len(messages) - live, 0)]
+    db.add_all(
+        ConversationMessage(phone_number=conv.phone_number, role=role, message=message, created_at=conv.created_at)
+        for role, message in older
+    )
+    db.execute(backfill_marker.insert().values(conversation_id=conv.id, backfilled=len(older)))
+    return len(older)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=500, help="conversations per transaction")
+    args = parser.parse_args()
+
+    ConversationMessage.__table__.create(bind=engine, checkfirst=True)
+    backfill_marker.create(bind=engine, checkfirst=True)
+    indexed = 0
+    conversations = 0
+    last_id = 0
+    while True:
+        db = SessionLocal()
+        try:
+            # The row lock makes live saves for these phones wait, so the live-row count stays exact
+            rows = (
+                db.query(Conversation)
+                .filter(Conversation.id > last_id)
+                .filter(~exists().where(backfill_marker.c.conversation_id == Conversation.id))
+                .order_by(Conversation.id.asc())
+                .limit(args.batch_size)
+                .with_for_update()
+                .all()
+            )
+            if not rows:
+                break
+            for conv in rows:
+                indexed += backfill_conversation(db, conv)
+            db.commit()
+            conversations += len(rows)
+            last_id = rows[-1].id
+        finally:
+            db.close()
+        print(f"indexed {indexed} messages from {conversations} conversations")
+    print(f"done: {indexed} messages from {conversations} conversations")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Parallel batch NLU evaluation for the English and Hindi datasets.
+
+Every example in data/nlu.yml and data/nlu_hi.yml is parsed by the trained model;
+examples are sharded into batches and spread over a process pool (each worker loads
+the model once and runs the NLU graph on whole batches). For each language this
+writes a confusion matrix (CSV) and a per-intent precision/recall/F1 report (JSON)
+to the output directory and prints the weakest intents.
+
+Usage (from the repository root):
+    python scripts/evaluate_nlu.py
+    python scripts/evaluate_nlu.py --model-hi rasa_bot/models/hi/<model>.tar.gz --workers 4 --batch-size 64
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend.services.faq_service import load_nlu_examples  # noqa: E402
+from train_rasa import RASA_BOT_DIR, latest_model  # noqa: E402
+
+LANGUAGE_FILES = {"en": "data/nlu.yml", "hi": "data/nlu_hi.yml"}
+NO_INTENT = "<none>"
+
+_processors = {}
+
+
+def _init_worker(threads):
+    # One TensorFlow thread per worker: the pool provides the parallelism
+    os.environ["TF_INTRA_OP_PARALLELISM_THREADS"] = str(threads)
+    os.environ["TF_INTER_OP_PARALLELISM_THREADS"] = str(threads)
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+
+
+def _predict_batch(model_path, texts):
+    """Worker: predicted intent per text. Rasa is imported here, after the worker was spawned."""
+    from profile_rasa import run_nlu
+    from rasa.core.agent import Agent
+
+    if model_path not in _processors:
+        _processors[model_path] = Agent.load(model_path).processor
+    processor = _processors[model_path]
+    results = run_nlu(processor, texts)
+    messages = results[processor.model_metadata.nlu_target]
+    return [((message.get("intent") or {}).get("name") or NO_INTENT) for message in messages]
+
+
+def intent_report(pairs):
+    """Confusion matrix and per-intent precision/recall/F1 from (expected, predicted) pairs."""
+    confusion = defaultdict(lambda: defaultdict(int))
+    for expected, predicted in pairs:
+        confusion[expected][predicted] += 1
+    labels = sorted(set(confusion) | {p for row in confusion.values() for p in row})
+
+    per_intent = {}
+    for label in labels:
+        tp = confusion[label][label]
+        support = sum(confusion[label].values())
+        predicted = sum(confusion[other][label] for other in confusion)
+        precision = tp / predicted if predicted else 0.0
+        recall = tp / support if support else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        if support:
+            per_intent[label] = {"precision": precision, "recall": recall, "f1": f1, "support": support}
+
+    total = len(pairs)
+    correct = sum(confusion[label][label] for label in labels)
+    report = {
+        "examples": total,
+        "accuracy": correct / total if total else 0.0,
+        "macro_f1": sum(r["f1"] for r in per_intent.values()) / len(per_intent) if per_intent else 0.0,
+        "weighted_f1": sum(r["f1"] * r["support"] for r in per_intent.values()) / total if total else 0.0,
+        "intents": per_intent,
+    }
+    matrix = [[confusion[expected][predicted] for predicted in labels] for expected in labels]
+    return report, labels, matrix
+
+
+def write_results(out_dir, language, report, labels, matrix):
+    with open(os.path.join(out_dir, f"{language}_intent_report.json"), "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2, ensure_ascii=False)
+    with open(os.path.join(out_dir, f"{language}_confusion.csv"), "w", encoding="utf-8", newline="") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(["expected \\ predicted", *labels])
+        for label, row in zip(labels, matrix):
+            writer.writerow([label, *row])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", help="model archive for both languages (default: newest in rasa_bot/models)")
+    parser.add_argument("--model-en", help="model archive for the English examples")
+    parser.add_argument("--model-hi", help="model archive for the Hindi examples")
+    parser.add_argument("--languages", nargs="+", default=list(LANGUAGE_FILES), choices=list(LANGUAGE_FILES))
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--threads-per-worker", type=int, default=1)
+    parser.add_argument("--out", default=os.path.join(RASA_BOT_DIR, "results", "nlu"))
+    parser.add_argument("--show", type=int, default=10, help="print this many lowest-F1 intents per language")
+    args = parser.parse_args()
+
+    default_model = args.model or latest_model("models")
+    models = {"en": args.model_en or default_model, "hi": args.model_hi or default_model}
+    if not all(models[language] for language in args.languages):
+        sys.exit("No trained model found; run scripts/train_rasa.py first")
+    os.makedirs(args.out, exist_ok=True)
+
+    shards = []
+    for language in args.languages:
+        examples = load_nlu_examples(files=(LANGUAGE_FILES[language],))
+        pairs = [(text, intent) for intent, texts in examples.items() for text in texts]
+        for start in range(0, len(pairs), args.batch_size):
+            shards.append((language, pairs[start:start + args.batch_size]))
+
+    began = time.perf_counter()
+    # spawn, not fork: TensorFlow state does not survive a fork
+    context = multiprocessing.get_context("spawn")
+    results = defaultdict(list)
+    with ProcessPoolExecutor(
+        max_workers=args.workers, mp_context=context, initializer=_init_worker, initargs=(args.threads_per_worker,)
+    ) as pool:
+        futures = [
+            (language, batch, pool.submit(_predict_batch, models[language], [text for text, _ in batch]))
+            for language, batch in shards
+        ]
+        for language, batch, future in futures:
+            results[language].extend((intent, predicted) for (_, intent), predicted in zip(batch, future.result()))
+    elapsed = time.perf_counter() - began
+
+    total = sum(len(pairs) for pairs in results.values())
+    print(f"Evaluated {total} examples in {elapsed:.1f}s ({total / elapsed:.0f}/s, {args.workers} workers)")
+    for language in args.languages:
+        report, labels, matrix = intent_report(results[language])
+        write_results(args.out, language, report, labels, matrix)
+        print(f"\n== {language} ({models[language]})")
+        print(f"examples {report['examples']}  accuracy {report['accuracy']:.1%}  "
+              f"macro F1 {report['macro_f1']:.3f}  weighted F1 {report['weighted_f1']:.3f}")
+        weakest = sorted(report["intents"].items(), key=lambda item: item[1]["f1"])[:args.show]
+        for intent, row in weakest:
+            print(f"  {row['f1']:.3f}  P {row['precision']:.2f}  R {row['recall']:.2f}  n={row['support']:<4d} {intent}")
+    print(f"\nConfusion matrices and reports written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
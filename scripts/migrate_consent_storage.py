@@ -0,0 +1,139 @@
+"""
+Backfill: move consent texts and user agents out of the `consents` table.
+
+Older databases store the full policy text (`consent_text`) and the raw `user_agent`
+on every consent row. This migration
+1. creates the content-hashed `consent_texts` and `user_agents` tables,
+2. adds `consents.consent_text_id` / `consents.user_agent_id`,
+3. creates the `idx_consent_history` index used by history pages (on PostgreSQL
+   concurrently, with `purpose`, `granted` and `revoked_at` as INCLUDE columns),
+4. fills the new columns in batches (resumable: only rows without `consent_text_id` are processed),
+5. verifies that every row's text is reproduced byte-for-byte from `consent_texts`,
+6. drops the legacy columns (skip with --keep-legacy-columns, PostgreSQL only: SQLite cannot relax
+   the NOT NULL on consent_text, which new code no longer writes).
+
+Run it once before deploying the new code; it is safe to re-run. Reclaim the freed
+space afterwards with `VACUUM FULL consents;` (PostgreSQL) or `VACUUM;` (SQLite).
+
+Usage:
+    python scripts/migrate_consent_storage.py [--batch-size 5000] [--keep-legacy-columns]
+"""
+import argparse
+import hashlib
+import os
+import sys
+
+from sqlalchemy import inspect, select, text
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from backend.db.session import engine  # noqa: E402
+from backend.models.consent import ConsentText, UserAgent  # noqa: E402
+
+
+def _intern(conn, cache, model, hash_column, value_column, value):
+    digest = hashlib.sha256(value.encode("utf-8")).hexdigest()
+    if digest not in cache:
+        table = model.__table__
+        found = conn.execute(select(table.c.id).where(table.c[hash_column] == digest)).scalar()
+        if found is None:
+            found = conn.execute(table.insert().values({hash_column: digest, value_column: value})).inserted_primary_key[0]
+        cache[digest] = found
+    return cache[digest]
+
+
+def create_history_index():
+    """idx_consent_history on existing databases; create_all() only adds indexes with new tables."""
+    if engine.dialect.name != "postgresql":
+        with engine.begin() as conn:
+            conn.execute(text("CREATE INDEX IF NOT EXISTS idx_consent_history ON consents (phone_number, created_at, id)"))
+        return
+    # CONCURRENTLY keeps consents writable during the build but cannot run inside a transaction
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        invalid = conn.execute(text(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = 'idx_consent_history' AND NOT i.indisvalid"
+        )).scalar()
+        if invalid:
+            # Left behind by an interrupted concurrent build; IF NOT EXISTS would keep it
+            conn.execute(text("DROP INDEX CONCURRENTLY idx_consent_history"))
+        conn.execute(text(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_consent_history "
+            "ON consents (phone_number, created_at, id) INCLUDE (purpose, granted, revoked_at)"
+        ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--keep-legacy-columns", action="store_true", help="only backfill; keep consent_text/user_agent")
+    args = parser.parse_args()
+    if args.keep_legacy_columns and engine.dialect.name != "postgresql":
+        # The legacy NOT NULL consent_text would make every new consent insert fail
+        sys.exit("--keep-legacy-columns is only supported on PostgreSQL; run without it to drop the legacy columns.")
+
+    ConsentText.__table__.create(bind=engine, checkfirst=True)
+    UserAgent.__table__.create(bind=engine, checkfirst=True)
+    columns = {c["name"] for c in inspect(engine).get_columns("consents")}
+    with engine.begin() as conn:
+        if "consent_text_id" not in columns:
+            conn.execute(text("ALTER TABLE consents ADD COLUMN consent_text_id INTEGER REFERENCES consent_texts(id)"))
+        if "user_agent_id" not in columns:
+            conn.execute(text("ALTER TABLE consents ADD COLUMN user_agent_id INTEGER REFERENCES user_agents(id)"))
+    create_history_index()
+    print("index idx_consent_history is in place")
+    if "consent_text" not in columns:
+        print("consents has no legacy consent_text column; nothing to backfill.")
+        return
+
+    texts, agents = {}, {}
+    migrated = 0
+    while True:
+        # Each batch commits on its own, so an interrupted run resumes where it stopped
+        with engine.begin() as conn:
+            rows = conn.execute(
+                text("SELECT id, consent_text, user_agent FROM consents WHERE consent_text_id IS NULL ORDER BY id LIMIT :n"),
+                {"n": args.batch_size},
+            ).fetchall()
+            if not rows:
+                break
+            updates = [
+                {
+                    "id": row.id,
+                    "t": _intern(conn, texts, ConsentText, "content_hash", "content", row.consent_text or ""),
+                    "u": _intern(conn, agents, UserAgent, "value_hash", "value", row.user_agent) if row.user_agent else None,
+                }
+                for row in rows
+            ]
+            conn.execute(text("UPDATE consents SET consent_text_id = :t, user_agent_id = :u WHERE id = :id"), updates)
+        migrated += len(rows)
+        print(f"migrated {migrated} consents ({len(texts)} distinct texts, {len(agents)} distinct user agents)")
+
+    with engine.connect() as conn:
+        mismatched = conn.execute(text(
+            "SELECT COUNT(*) FROM consents c LEFT JOIN consent_texts t ON t.id = c.consent_text_id "
+            "WHERE t.content IS NULL OR t.content <> COALESCE(c.consent_text, '')"
+        )).scalar()
+        mismatched += conn.execute(text(
+            "SELECT COUNT(*) FROM consents c LEFT JOIN user_agents u ON u.id = c.user_agent_id "
+            "WHERE c.user_agent IS NOT NULL AND c.user_agent <> '' AND (u.value IS NULL OR u.value <> c.user_agent)"
+        )).scalar()
+    if mismatched:
+        sys.exit(f"{mismatched} consents do not reproduce their original text; legacy columns kept.")
+    print("verified: every consent reproduces its original text and user agent")
+
+    if args.keep_legacy_columns:
+        # New code no longer writes these columns
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE consents ALTER COLUMN consent_text DROP NOT NULL"))
+        return
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE consents DROP COLUMN consent_text"))
+        conn.execute(text("ALTER TABLE consents DROP COLUMN user_agent"))
+        if engine.dialect.name == "postgresql":
+            conn.execute(text("ALTER TABLE consents ALTER COLUMN consent_text_id SET NOT NULL"))
+    print("dropped legacy columns consents.consent_text and consents.user_agent")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+Offline latency profiler for the trained Rasa pipeline.
+
+Loads a trained model in-process and times every graph node (tokenizers, featurizers,
+DIETClassifier, ResponseSelector, MemoizationPolicy, RulePolicy, UnexpecTEDIntentPolicy,
+TEDPolicy, ...) while it:
+
+- replays tests/test_stories.yml turn by turn: each user text goes through NLU and each
+  bot action is predicted by the policy ensemble
+- runs NLU over sampled messages (a text file and/or user messages from the backend
+  database) at several batch sizes to show throughput
+
+Reports per-node calls, mean/p50/p95 latency and share of total time, model artifact
+size per component, process RSS after loading and, with --trace-memory, the peak
+Python allocations per node (TensorFlow's own allocator is not visible to tracemalloc).
+Requires Rasa to be installed; run from the repository root.
+
+Usage:
+    python scripts/profile_rasa.py
+    python scripts/profile_rasa.py --messages sample.txt --sample-db 500 --batch-sizes 1 16 64 --json profile.json
+"""
+import argparse
+import asyncio
+import inspect
+import json
+import os
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from train_rasa import RASA_BOT_DIR, component_sizes, latest_model  # noqa: E402
+
+from rasa.core.agent import Agent  # noqa: E402
+from rasa.engine.constants import PLACEHOLDER_MESSAGE, PLACEHOLDER_TRACKER  # noqa: E402
+from rasa.engine.graph import GraphNode  # noqa: E402
+from rasa.shared.core.constants import ACTION_LISTEN_NAME  # noqa: E402
+from rasa.shared.core.events import ActionExecuted, UserUttered  # noqa: E402
+from rasa.shared.core.trackers import DialogueStateTracker  # noqa: E402
+from rasa.shared.core.training_data.story_reader.yaml_story_reader import YAMLStoryReader  # noqa: E402
+from rasa.shared.nlu.constants import TEXT  # noqa: E402
+from rasa.shared.nlu.training_data.message import Message  # noqa: E402
+
+
+class NodeProfiler:
+    """Times every GraphNode call by patching GraphNode.__call__ (Rasa runs nodes synchronously)."""
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.latencies = defaultdict(list)
+        self.peak_bytes = defaultdict(int)
+        self._original = GraphNode.__call__
+
+    def __enter__(self):
+        profiler = self
+        original = self._original
+
+        def timed_call(node, *inputs):
+            if profiler.trace_memory:
+                tracemalloc.reset_peak()
+            began = time.perf_counter()
+            try:
+                return original(node, *inputs)
+            finally:
+                profiler.latencies[node._node_name].append(time.perf_counter() - began)
+                if profiler.trace_memory:
+                    peak = tracemalloc.get_traced_memory()[1]
+                    profiler.peak_bytes[node._node_name] = max(profiler.peak_bytes[node._node_name], peak)
+
+        if self.trace_memory:
+            tracemalloc.start()
+        GraphNode.__call__ = timed_call
+        return self
+
+    def __exit__(self, *exc):
+        GraphNode.__call__ = self._original
+        if self.trace_memory:
+            tracemalloc.stop()
+
+    def reset(self):
+        self.latencies.clear()
+        self.peak_bytes.clear()
+
+    def summary(self):
+        total = sum(sum(v) for v in self.latencies.values()) or 1.0
+        rows = []
+        for node, values in self.latencies.items():
+            ordered = sorted(values)
+            rows.append({
+                "node": node,
+                "calls": len(values),
+                "mean_ms": statistics.mean(values) * 1000,
+                "p50_ms": ordered[len(ordered) // 2] * 1000,
+                "p95_ms": ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))] * 1000,
+                "share": sum(values) / total,
+                "peak_python_bytes": self.peak_bytes.get(node),
+            })
+        return sorted(rows, key=lambda row: -row["share"])
+
+
+def _resolve(value):
+    """Processor methods are sync or async depending on the Rasa 3.x minor version."""
+    if inspect.isawaitable(value):
+        return asyncio.get_event_loop().run_until_complete(value)
+    return value
+
+
+def run_nlu(processor, texts):
+    tracker = DialogueStateTracker("profile", processor.domain.slots)
+    messages = [Message(data={TEXT: text}) for text in texts]
+    return processor.graph_runner.run(
+        inputs={PLACEHOLDER_MESSAGE: messages, PLACEHOLDER_TRACKER: tracker},
+        targets=[processor.model_metadata.nlu_target],
+    )
+
+
+def predicted_action(processor, prediction):
+    """
+    Action with the highest score. predict_next_with_tracker returns {"scores": [{"action", "score"}, ...],
+    "policy", "confidence"}, not the chosen action itself; bare probability lists map onto the domain's actions.
+    """
+    scores = (prediction or {}).get("scores") or []
+    if not scores:
+        return None
+    if isinstance(scores[0], dict):
+        return max(scores, key=lambda entry: entry["score"])["action"]
+    best = max(range(len(scores)), key=scores.__getitem__)
+    return processor.domain.action_names_or_texts[best]
+
+
+def replay_stories(processor, stories_path):
+    """Feed each test story through NLU and policy prediction; returns (turns, predictions, correct)."""
+    steps = YAMLStoryReader(processor.domain).read_from_file(stories_path)
+    turns = predictions = correct = 0
+    for i, step in enumerate(steps):
+        tracker = DialogueStateTracker(f"story-{i}", processor.domain.slots)
+        tracker.update(ActionExecuted(ACTION_LISTEN_NAME))
+        for event in step.events:
+            if isinstance(event, UserUttered) and event.text:
+                run_nlu(processor, [event.text])
+                turns += 1
+            elif isinstance(event, ActionExecuted) and event.action_name != ACTION_LISTEN_NAME:
+                prediction = _resolve(processor.predict_next_with_tracker(tracker))
+                predictions += 1
+                correct += predicted_action(processor, prediction) == event.action_name
+            # Keep the replay on the story's path (labelled intents, expected actions)
+            tracker.update(event)
+    return turns, predictions, correct
+
+
+def sample_messages(path, sample_db):
+    texts = []
+    if path:
+        with open(path, encoding="utf-8") as fh:
+            texts.extend(line.strip() for line in fh if line.strip())
+    if sample_db:
+        from sqlalchemy import func
+
+        from backend.db.session import SessionLocal
+        from backend.models.conversation import Conversation
+
+        db = SessionLocal()
+        try:
+            rows = (
+                db.query(Conversation.message)
+                .filter(Conversation.role == "user")
+                .order_by(func.random())
+                .limit(sample_db)
+                .all()
+            )
+            texts.extend(row.message for row in rows)
+        finally:
+            db.close()
+    return texts
+
+
+def print_table(title, rows):
+    print(f"\n== {title}")
+    print(f"{'node':48s} {'calls':>7s} {'mean ms':>9s} {'p50 ms':>9s} {'p95 ms':>9s} {'share':>7s} {'peak py':>10s}")
+    for row in rows:
+        peak = f"{row['peak_python_bytes'] / 1024:.0f}K" if row["peak_python_bytes"] else "-"
+        print(f"{row['node']:48s} {row['calls']:7d} {row['mean_ms']:9.2f} {row['p50_ms']:9.2f} "
+              f"{row['p95_ms']:9.2f} {row['share']:7.1%} {peak:>10s}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", help="model archive (default: newest in rasa_bot/models)")
+    parser.add_argument("--stories", default=os.path.join(RASA_BOT_DIR, "tests", "test_stories.yml"))
+    parser.add_argument("--messages", help="text file with one sampled user message per line")
+    parser.add_argument("--sample-db", type=int, default=0, help="also sample N user messages from the backend database")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--repeat", type=int, default=3, help="passes over the sampled messages per batch size")
+    parser.add_argument("--trace-memory", action="store_true", help="track peak Python allocations per node (slow)")
+    parser.add_argument("--json", help="write the full report to this file")
+    args = parser.parse_args()
+
+    model = args.model or latest_model("models")
+    if not model:
+        sys.exit("No trained model found; run scripts/train_rasa.py first")
+
+    began = time.perf_counter()
+    agent = Agent.load(model)
+    processor = agent.processor
+    report = {
+        "model": os.path.basename(model),
+        "load_seconds": round(time.perf_counter() - began, 2),
+        # ru_maxrss is KiB on Linux
+        "rss_after_load_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        "component_bytes": component_sizes(model),
+    }
+    print(f"Loaded {report['model']} in {report['load_seconds']}s, RSS {report['rss_after_load_bytes'] / 2**20:.0f} MiB")
+
+    with NodeProfiler(trace_memory=args.trace_memory) as profiler:
+        # Untimed pass so TensorFlow graph tracing does not land in the first measurements
+        run_nlu(processor, ["hello"])
+        profiler.reset()
+
+        turns, predictions, correct = replay_stories(processor, args.stories)
+        report["stories"] = {
+            "user_turns": turns,
+            "action_predictions": predictions,
+            "action_accuracy": correct / predictions if predictions else None,
+            "nodes": profiler.summary(),
+        }
+        print_table(f"test stories: {turns} user turns, {predictions} predictions "
+                    f"({correct}/{predictions} actions as in the story)", report["stories"]["nodes"])
+
+        texts = sample_messages(args.messages, args.sample_db) or [
+            event.text
+            for step in YAMLStoryReader(processor.domain).read_from_file(args.stories)
+            for event in step.events
+            if isinstance(event, UserUttered) and event.text
+        ]
+        report["batches"] = []
+        for batch_size in args.batch_sizes:
+            profiler.reset()
+            began = time.perf_counter()
+            for _ in range(args.repeat):
+                for start in range(0, len(texts), batch_size):
+                    run_nlu(processor, texts[start:start + batch_size])
+            elapsed = time.perf_counter() - began
+            processed = len(texts) * args.repeat
+            entry = {
+                "batch_size": batch_size,
+                "messages": processed,
+                "messages_per_second": processed / elapsed,
+                "nodes": profiler.summary(),
+            }
+            report["batches"].append(entry)
+            print_table(f"NLU batch size {batch_size}: {entry['messages_per_second']:.1f} messages/s", entry["nodes"])
+
+    print("\n== model artifact bytes per component")
+    for component, size in report["component_bytes"].items():
+        print(f"  {size:>12,}  {component}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
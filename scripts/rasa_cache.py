@@ -0,0 +1,270 @@
+"""
+Garbage collection and content-addressed sharing for the Rasa training cache.
+
+Rasa's LocalTrainingCache keys every component output by its fingerprint in cache.db
+(table `cache_entry`) and stores the artifact in an anonymous tmp* directory. It never
+evicts anything. This tool manages that cache:
+
+    stats                  entries, artifact bytes, dangling rows, orphaned and duplicate directories
+    dedupe                 move artifacts to cas/<content sha256>; identical outputs share one directory
+    gc --max-size-mb N     drop dangling rows and orphaned directories, then evict least-recently-used
+                           artifacts until the cache fits the budget
+    export --to FILE       pack the cache (after dedupe) as a .tar.gz, e.g. as a CI artifact
+    seed --from PATH       merge another cache directory or exported .tar.gz into this one (CI pre-seeding)
+
+Usage:
+    python scripts/rasa_cache.py stats
+    python scripts/rasa_cache.py gc --max-size-mb 500 --dry-run
+"""
+import argparse
+import hashlib
+import ntpath
+import os
+import posixpath
+import shutil
+import sqlite3
+import sys
+import tarfile
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "rasa_bot", "cache")
+CACHE_DB = "cache.db"
+CAS_DIR = "cas"
+
+
+def _connect(cache_dir: str) -> sqlite3.Connection:
+    return sqlite3.connect(os.path.join(cache_dir, CACHE_DB))
+
+
+def _artifact_name(location: str) -> str:
+    """Path of an artifact relative to the cache dir; stored locations may use Windows separators."""
+    parts = location.replace("\\", "/").split("/")
+    return "/".join(parts[-2:]) if len(parts) >= 2 and parts[-2] == CAS_DIR else parts[-1]
+
+
+def _rewrite_location(location: str, artifact: str, cache_dir: Optional[str] = None) -> str:
+    """
+    Point a stored location at another artifact. Within one cache the stored prefix and separator
+    style are kept; with `cache_dir` (entries merged from another machine) it is rebased there.
+    """
+    if cache_dir is not None:
+        return os.path.join(cache_dir, *artifact.split("/"))
+    pathmod = ntpath if "\\" in location else posixpath
+    prefix = pathmod.dirname(location)
+    if pathmod.basename(prefix) == CAS_DIR:
+        prefix = pathmod.dirname(prefix)
+    return pathmod.join(prefix, *artifact.split("/"))
+
+
+def _dir_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def _dir_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    for root, dirs, names in os.walk(path):
+        dirs.sort()
+        for name in sorted(names):
+            full = os.path.join(root, name)
+            digest.update(os.path.relpath(full, path).replace(os.sep, "/").encode())
+            with open(full, "rb") as fh:
+                for chunk in iter(lambda: fh.read(1 << 20), b""):
+                    digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _artifact_dirs(cache_dir: str) -> List[str]:
+    names = [n for n in os.listdir(cache_dir) if n.startswith("tmp") and os.path.isdir(os.path.join(cache_dir, n))]
+    cas = os.path.join(cache_dir, CAS_DIR)
+    if os.path.isdir(cas):
+        names += [f"{CAS_DIR}/{n}" for n in os.listdir(cas)]
+    return names
+
+
+def _entries(conn: sqlite3.Connection) -> List[Tuple[str, str, str]]:
+    """(fingerprint_key, last_used, result_location) for entries that own an artifact."""
+    return conn.execute(
+        "SELECT fingerprint_key, last_used, result_location FROM cache_entry WHERE result_location IS NOT NULL"
+    ).fetchall()
+
+
+def stats(cache_dir: str) -> Dict[str, int]:
+    with _connect(cache_dir) as conn:
+        total_rows = conn.execute("SELECT COUNT(*) FROM cache_entry").fetchone()[0]
+        entries = _entries(conn)
+    on_disk = set(_artifact_dirs(cache_dir))
+    referenced = {_artifact_name(loc) for _, _, loc in entries}
+    digests: Dict[str, int] = {}
+    for name in on_disk:
+        digest = _dir_digest(os.path.join(cache_dir, name))
+        digests[digest] = digests.get(digest, 0) + 1
+    return {
+        "entries": total_rows,
+        "entries_with_artifact": len(entries),
+        "dangling_entries": sum(1 for _, _, loc in entries if _artifact_name(loc) not in on_disk),
+        "artifact_dirs": len(on_disk),
+        "orphaned_dirs": len(on_disk - referenced),
+        "duplicate_dirs": sum(count - 1 for count in digests.values()),
+        "artifact_bytes": sum(_dir_size(os.path.join(cache_dir, n)) for n in on_disk),
+        "db_bytes": os.path.getsize(os.path.join(cache_dir, CACHE_DB)),
+    }
+
+
+def dedupe(cache_dir: str, dry_run: bool = False) -> int:
+    """Move every referenced artifact to cas/<digest>; returns the number of directories removed."""
+    removed = 0
+    os.makedirs(os.path.join(cache_dir, CAS_DIR), exist_ok=True)
+    with _connect(cache_dir) as conn:
+        for key, _, location in _entries(conn):
+            name = _artifact_name(location)
+            source = os.path.join(cache_dir, name)
+            if name.startswith(CAS_DIR + "/") or not os.path.isdir(source):
+                continue
+            target_name = f"{CAS_DIR}/{_dir_digest(source)}"
+            target = os.path.join(cache_dir, target_name)
+            if dry_run:
+                removed += os.path.isdir(target)
+                continue
+            if os.path.isdir(target):
+                shutil.rmtree(source)
+                removed += 1
+            else:
+                os.replace(source, target)
+            conn.execute(
+                "UPDATE cache_entry SET result_location = ? WHERE fingerprint_key = ?",
+                (_rewrite_location(location, target_name), key),
+            )
+    return removed
+
+
+def gc(cache_dir: str, max_size_mb: Optional[float] = None, dry_run: bool = False) -> Dict[str, int]:
+    report = {"dangling_entries": 0, "orphaned_dirs": 0, "evicted_entries": 0, "freed_bytes": 0}
+    with _connect(cache_dir) as conn:
+        on_disk = set(_artifact_dirs(cache_dir))
+        entries = _entries(conn)
+
+        # Rows whose artifact is gone can never be served; Rasa would just fail to load them
+        for key, _, location in entries:
+            if _artifact_name(location) not in on_disk:
+                report["dangling_entries"] += 1
+                if not dry_run:
+                    conn.execute("DELETE FROM cache_entry WHERE fingerprint_key = ?", (key,))
+        entries = [e for e in entries if _artifact_name(e[2]) in on_disk]
+
+        referenced = {_artifact_name(loc) for _, _, loc in entries}
+        for name in sorted(on_disk - referenced):
+            report["orphaned_dirs"] += 1
+            report["freed_bytes"] += _dir_size(os.path.join(cache_dir, name))
+            if not dry_run:
+                shutil.rmtree(os.path.join(cache_dir, name))
+
+        if max_size_mb is not None:
+            budget = int(max_size_mb * 1024 * 1024)
+            sizes = {name: _dir_size(os.path.join(cache_dir, name)) for name in referenced}
+            users: Dict[str, int] = {}
+            for _, _, loc in entries:
+                users[_artifact_name(loc)] = users.get(_artifact_name(loc), 0) + 1
+            total = sum(sizes.values())
+            # Least recently used first; a shared (deduplicated) directory is freed with its last user
+            for key, _, location in sorted(entries, key=lambda e: e[1]):
+                if total <= budget:
+                    break
+                name = _artifact_name(location)
+                report["evicted_entries"] += 1
+                users[name] -= 1
+                if not dry_run:
+                    conn.execute("DELETE FROM cache_entry WHERE fingerprint_key = ?", (key,))
+                if users[name] == 0:
+                    total -= sizes[name]
+                    report["freed_bytes"] += sizes[name]
+                    if not dry_run:
+                        shutil.rmtree(os.path.join(cache_dir, name))
+    return report
+
+
+def export(cache_dir: str, target: str) -> None:
+    dedupe(cache_dir)
+    gc(cache_dir)
+    with tarfile.open(target, "w:gz") as archive:
+        archive.add(os.path.join(cache_dir, CACHE_DB), arcname=CACHE_DB)
+        cas = os.path.join(cache_dir, CAS_DIR)
+        if os.path.isdir(cas):
+            archive.add(cas, arcname=CAS_DIR)
+
+
+def seed(cache_dir: str, source: str) -> int:
+    """Merge entries (and their artifacts) that this cache does not have yet; returns entries added."""
+    with tempfile.TemporaryDirectory() as scratch:
+        if os.path.isfile(source):
+            with tarfile.open(source, "r:gz") as archive:
+                archive.extractall(scratch)
+            source = scratch
+        os.makedirs(cache_dir, exist_ok=True)
+        if not os.path.exists(os.path.join(cache_dir, CACHE_DB)):
+            shutil.copy2(os.path.join(source, CACHE_DB), os.path.join(cache_dir, CACHE_DB))
+            with _connect(cache_dir) as conn:
+                conn.execute("DELETE FROM cache_entry")
+        os.makedirs(os.path.join(cache_dir, CAS_DIR), exist_ok=True)
+
+        added = 0
+        with _connect(source) as src, _connect(cache_dir) as dst:
+            known = {row[0] for row in dst.execute("SELECT fingerprint_key FROM cache_entry")}
+            rows = src.execute(
+                "SELECT fingerprint_key, output_fingerprint_key, last_used, rasa_version, result_location, result_type "
+                "FROM cache_entry"
+            ).fetchall()
+            for row in rows:
+                if row[0] in known:
+                    continue
+                location = row[4]
+                if location is not None:
+                    artifact = os.path.join(source, _artifact_name(location))
+                    if not os.path.isdir(artifact):
+                        continue
+                    target_name = f"{CAS_DIR}/{_dir_digest(artifact)}"
+                    if not os.path.isdir(os.path.join(cache_dir, target_name)):
+                        shutil.copytree(artifact, os.path.join(cache_dir, target_name))
+                    # The source location points into the exporting machine's cache dir
+                    row = row[:4] + (_rewrite_location(location, target_name, cache_dir),) + row[5:]
+                dst.execute("INSERT INTO cache_entry VALUES (?, ?, ?, ?, ?, ?)", row)
+                added += 1
+    return added
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats")
+    p_dedupe = sub.add_parser("dedupe")
+    p_dedupe.add_argument("--dry-run", action="store_true")
+    p_gc = sub.add_parser("gc")
+    p_gc.add_argument("--max-size-mb", type=float)
+    p_gc.add_argument("--dry-run", action="store_true")
+    p_export = sub.add_parser("export")
+    p_export.add_argument("--to", required=True)
+    p_seed = sub.add_parser("seed")
+    p_seed.add_argument("--from", dest="source", required=True)
+    args = parser.parse_args()
+
+    cache_dir = os.path.abspath(args.cache_dir)
+    if args.command != "seed" and not os.path.exists(os.path.join(cache_dir, CACHE_DB)):
+        sys.exit(f"No Rasa cache at {cache_dir}")
+    if args.command == "stats":
+        for key, value in stats(cache_dir).items():
+            print(f"{key:22s} {value:,}")
+    elif args.command == "dedupe":
+        print(f"duplicate directories removed: {dedupe(cache_dir, args.dry_run)}")
+    elif args.command == "gc":
+        for key, value in gc(cache_dir, args.max_size_mb, args.dry_run).items():
+            print(f"{key:22s} {value:,}")
+    elif args.command == "export":
+        export(cache_dir, args.to)
+        print(f"exported {cache_dir} to {args.to}")
+    elif args.command == "seed":
+        print(f"entries added: {seed(cache_dir, args.source)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Incremental Rasa training with training benchmarks.
+
+- Nothing changed since the last run: training is skipped
+- Only training data changed (config and domain identical): the previous model is
+  fine-tuned with `rasa train --finetune` for a fraction of the configured epochs
+- Otherwise: full training
+
+Unchanged graph components are always reused from rasa_bot/cache (Rasa fingerprints
+every component), and TensorFlow/BLAS thread counts are configurable. Each run appends
+wall time, model size and per-component artifact sizes to models/training_benchmarks.jsonl.
+After training the cache is deduplicated and trimmed to RASA_MAX_CACHE_SIZE megabytes
+(see scripts/rasa_cache.py).
+
+Usage (from the repository root):
+    python scripts/train_rasa.py
+    python scripts/train_rasa.py --config config_hi.yml --data data/nlu_hi.yml data/regex.yml data/rules.yml data/stories.yml --out models/hi
+    python scripts/train_rasa.py --full --intra-op 4 --inter-op 2
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tarfile
+import time
+from collections import defaultdict
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import rasa_cache  # noqa: E402
+
+RASA_BOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "rasa_bot")
+DEFAULT_DATA = ["data"]
+MANIFEST_NAME = ".train_manifest.json"
+BENCHMARK_NAME = "training_benchmarks.jsonl"
+
+
+def _hash_paths(paths):
+    """Content hash of files (directories are walked in sorted order)."""
+    digest = hashlib.sha256()
+    for path in paths:
+        full = os.path.join(RASA_BOT_DIR, path)
+        files = [full] if os.path.isfile(full) else sorted(
+            os.path.join(root, name) for root, _, names in os.walk(full) for name in names
+        )
+        for name in files:
+            digest.update(os.path.relpath(name, RASA_BOT_DIR).encode())
+            with open(name, "rb") as fh:
+                digest.update(fh.read())
+    return digest.hexdigest()
+
+
+def fingerprint(config, domain, data):
+    return {"config": _hash_paths([config]), "domain": _hash_paths([domain]), "data": _hash_paths(data)}
+
+
+def latest_model(out_dir):
+    models = glob.glob(os.path.join(RASA_BOT_DIR, out_dir, "*.tar.gz"))
+    return max(models, key=os.path.getmtime) if models else None
+
+
+def component_sizes(model_path):
+    """Artifact bytes per graph component stored in a Rasa 3 model archive."""
+    sizes = defaultdict(int)
+    with tarfile.open(model_path, "r:gz") as archive:
+        for member in archive.getmembers():
+            if not member.isfile():
+                continue
+            parts = member.name.split("/")
+            # Components are stored as components/<node name>/...; everything else is metadata
+            key = parts[1] if len(parts) > 2 and parts[0] == "components" else parts[0]
+            sizes[key] += member.size
+    return dict(sorted(sizes.items(), key=lambda item: -item[1]))
+
+
+def load_json(path):
+    try:
+        with open(path, encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--config", default="config.yml")
+    parser.add_argument("--domain", default="domain.yml")
+    parser.add_argument("--data", nargs="+", default=DEFAULT_DATA)
+    parser.add_argument("--out", default="models")
+    parser.add_argument("--full", action="store_true", help="always train from scratch")
+    parser.add_argument("--epoch-fraction", type=float, default=0.2, help="share of configured epochs when fine-tuning")
+    parser.add_argument("--intra-op", type=int, help="TensorFlow threads used inside one op")
+    parser.add_argument("--inter-op", type=int, help="TensorFlow ops run in parallel")
+    parser.add_argument("--cache-dir", default=os.path.join(RASA_BOT_DIR, "cache"))
+    parser.add_argument(
+        "--cache-max-mb",
+        type=float,
+        default=float(os.getenv("RASA_MAX_CACHE_SIZE", "1024")),
+        help="evict least-recently-used cache entries above this size after training",
+    )
+    args = parser.parse_args()
+
+    out_dir = os.path.join(RASA_BOT_DIR, args.out)
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    manifest = load_json(manifest_path)
+    current = fingerprint(args.config, args.domain, args.data)
+    previous_model = latest_model(args.out)
+
+    if not args.full and previous_model and manifest.get("fingerprint") == current:
+        print(f"Nothing changed since {os.path.basename(previous_model)}; skipping training.")
+        return
+
+    command = ["rasa", "train", "--config", args.config, "--domain", args.domain, "--out", args.out, "--data", *args.data]
+    mode = "full"
+    previous = manifest.get("fingerprint") or {}
+    if (
+        not args.full
+        and previous_model
+        and previous.get("config") == current["config"]
+        and previous.get("domain") == current["domain"]
+    ):
+        # Fine-tuning keeps the label set, so it is only valid while config and domain are unchanged
+        mode = "finetune"
+        command += ["--finetune", previous_model, "--epoch-fraction", str(args.epoch_fraction)]
+
+    env = dict(os.environ)
+    env["RASA_CACHE_DIRECTORY"] = os.path.abspath(args.cache_dir)
+    if args.intra_op:
+        env["TF_INTRA_OP_PARALLELISM_THREADS"] = str(args.intra_op)
+        env["OMP_NUM_THREADS"] = str(args.intra_op)
+    if args.inter_op:
+        env["TF_INTER_OP_PARALLELISM_THREADS"] = str(args.inter_op)
+
+    print(f"[{mode}] {' '.join(command)}")
+    began = time.perf_counter()
+    result = subprocess.run(command, cwd=RASA_BOT_DIR, env=env)
+    wall_time = time.perf_counter() - began
+    if result.returncode != 0:
+        sys.exit(result.returncode)
+
+    cache_report = {}
+    if os.path.exists(os.path.join(args.cache_dir, rasa_cache.CACHE_DB)):
+        rasa_cache.dedupe(args.cache_dir)
+        cache_report = rasa_cache.gc(args.cache_dir, args.cache_max_mb)
+
+    model = latest_model(args.out)
+    record = {
+        "finished_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "mode": mode,
+        "config": args.config,
+        "data": args.data,
+        "wall_time_seconds": round(wall_time, 2),
+        "intra_op_threads": args.intra_op,
+        "inter_op_threads": args.inter_op,
+        "model": os.path.basename(model) if model else None,
+        "model_bytes": os.path.getsize(model) if model else None,
+        "component_bytes": component_sizes(model) if model else {},
+        "cache_gc": cache_report,
+    }
+    with open(os.path.join(out_dir, BENCHMARK_NAME), "a", encoding="utf-8") as fh:
+        fh.write(json.dumps(record) + "\n")
+    with open(manifest_path, "w", encoding="utf-8") as fh:
+        json.dump({"fingerprint": current, "model": record["model"]}, fh, indent=2)
+
+    print(f"Trained in {wall_time:.1f}s ({mode}); model {record['model_bytes'] or 0:,} bytes")
+    for component, size in record["component_bytes"].items():
+        print(f"  {size:>12,}  {component}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# Settings are read at import time: point the app at a throwaway SQLite database and skip the Rasa warm-up
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}")
+os.environ.setdefault("WARMUP_ENABLED", "0")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
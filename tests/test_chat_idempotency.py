@@ -0,0 +1,20 @@
+from fastapi.testclient import TestClient
+
+import app
+
+
+def test_anonymous_clients_do_not_share_message_ids():
+    with TestClient(app.app) as client:
+        first = client.post("/chat", json={"text": "hi", "message_id": "1"}).json()
+        second = client.post("/chat", json={"text": "hi", "message_id": "1"}).json()
+    assert first["session_id"] != second["session_id"]
+    assert first["sender_id"] != second["sender_id"]
+
+
+def test_retry_from_the_same_sender_is_deduplicated():
+    with TestClient(app.app) as client:
+        first = client.post("/chat", json={"text": "hi", "sender_id": "retry-sender", "message_id": "1"}).json()
+        retry = client.post("/chat", json={"text": "hi", "sender_id": "retry-sender", "message_id": "1"}).json()
+        other = client.post("/chat", json={"text": "hi", "sender_id": "other-sender", "message_id": "1"}).json()
+    assert retry == first
+    assert other["session_id"] != first["session_id"]
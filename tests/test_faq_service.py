@@ -0,0 +1,14 @@
+from backend.services.faq_service import answer_faq, load_faq_responses
+
+
+def test_informational_question_is_answered():
+    replies = answer_faq("what is pan")
+    assert replies and replies[0]["metadata"]["intent"] == "pan_what"
+
+
+def test_dialogue_intents_go_to_rasa():
+    faq = load_faq_responses()
+    for intent in ("check_tan_status", "check_pan_status_hindi", "select_pan_assistance", "select_language_hindi", "provide_dob"):
+        assert intent not in faq
+    # The TAN status flow needs utter_ask_tan_number in the tracker
+    assert answer_faq("check tan status") is None
@@ -0,0 +1,89 @@
+import importlib.util
+import os
+import sys
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import sessionmaker
+
+from backend.models import consent, conversation, history, otp  # noqa: F401  (resolve mappers)
+from backend.models.consent import Consent, ConsentText
+from backend.models.conversation import PhoneNumber
+
+SCRIPT = os.path.join(os.path.dirname(__file__), "..", "scripts", "migrate_consent_storage.py")
+
+LEGACY_CONSENTS = """
+CREATE TABLE consents (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    phone_number VARCHAR(20) NOT NULL REFERENCES phone_numbers(phone_number),
+    consent_version VARCHAR(10) NOT NULL,
+    purpose VARCHAR(100) NOT NULL,
+    granted BOOLEAN NOT NULL,
+    granted_at DATETIME,
+    revoked_at DATETIME,
+    ip_address VARCHAR(45),
+    user_agent TEXT,
+    consent_text TEXT NOT NULL,
+    created_at DATETIME NOT NULL,
+    updated_at DATETIME NOT NULL,
+    created_by VARCHAR(50),
+    updated_by VARCHAR(50)
+)
+"""
+
+
+@pytest.fixture
+def migration(tmp_path, monkeypatch):
+    """The migration script bound to a fresh SQLite database with the legacy consents table."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    PhoneNumber.__table__.create(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text(LEGACY_CONSENTS))
+        conn.execute(text("INSERT INTO phone_numbers (phone_number, created_at) VALUES ('9876543210', :now)"), {"now": datetime.utcnow()})
+        conn.execute(
+            text(
+                "INSERT INTO consents (phone_number, consent_version, purpose, granted, user_agent, consent_text, created_at, updated_at) "
+                "VALUES ('9876543210', '1.0', 'PAN_TAN_ASSISTANCE', 1, 'Mozilla/5.0', 'I agree', :now, :now)"
+            ),
+            {"now": datetime.utcnow()},
+        )
+    spec = importlib.util.spec_from_file_location("migrate_consent_storage", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    monkeypatch.setattr(module, "engine", engine)
+    return module, engine
+
+
+def _run(module, monkeypatch, *args):
+    monkeypatch.setattr(sys, "argv", ["migrate_consent_storage.py", *args])
+    module.main()
+
+
+def test_keep_legacy_columns_is_refused_on_sqlite(migration, monkeypatch):
+    module, engine = migration
+    with pytest.raises(SystemExit):
+        _run(module, monkeypatch, "--keep-legacy-columns")
+    # Refused before touching the schema
+    assert "consent_text_id" not in {c["name"] for c in inspect(engine).get_columns("consents")}
+
+
+def test_new_consents_can_be_written_after_migration(migration, monkeypatch):
+    module, engine = migration
+    _run(module, monkeypatch)
+    columns = {c["name"] for c in inspect(engine).get_columns("consents")}
+    assert "consent_text" not in columns and "user_agent" not in columns
+
+    db = sessionmaker(bind=engine)()
+    try:
+        migrated = db.query(Consent).one()
+        assert migrated.consent_text == "I agree" and migrated.user_agent == "Mozilla/5.0"
+        db.add(Consent(
+            phone_number="9876543210", purpose="DATA_ANALYTICS", granted=True,
+            consent_text_id=migrated.consent_text_id,
+        ))
+        db.commit()
+        assert db.query(Consent).count() == 2
+        assert db.query(ConsentText).count() == 1
+    finally:
+        db.close()